@@ -1,6 +1,6 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
-from .models import User
+from .models import TokenSession, User
 
 class UserAdmin(BaseUserAdmin):
     list_display = ['username', 'email', 'first_name', 'last_name', 'is_admin', 'is_active', 'date_joined']
@@ -22,4 +22,13 @@ class UserAdmin(BaseUserAdmin):
     filter_horizontal = ('groups', 'user_permissions')
     readonly_fields = ['date_joined', 'last_login']
 
-admin.site.register(User, UserAdmin)
\ No newline at end of file
+admin.site.register(User, UserAdmin)
+
+
+@admin.register(TokenSession)
+class TokenSessionAdmin(admin.ModelAdmin):
+    list_display = ['user', 'created_at', 'expires_at', 'revoked_at']
+    list_filter = ['revoked_at']
+    search_fields = ['user__username']
+    readonly_fields = ['id', 'user', 'jti', 'created_at', 'expires_at', 'revoked_at']
+    list_select_related = ['user']
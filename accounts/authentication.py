@@ -0,0 +1,15 @@
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+from .tokens import is_revoked
+
+
+class SessionJWTAuthentication(JWTAuthentication):
+    """
+    JWTAuthentication that also refuses tokens of revoked sessions
+    """
+
+    def get_validated_token(self, raw_token):
+        token = super().get_validated_token(raw_token)
+        if is_revoked(token):
+            raise InvalidToken('Session has been revoked')
+        return token
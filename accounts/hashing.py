@@ -0,0 +1,76 @@
+"""
+Password hashing in a bounded pool.
+
+PBKDF2 is meant to be slow: each hash is hundreds of milliseconds of CPU.
+During a registration burst, every thread of a gthread worker can end up
+hashing at once and starve the cheap requests the worker also serves.
+Registrations therefore hash in a per-process pool of
+PASSWORD_HASH_WORKERS threads (hashlib releases the GIL while it works).
+At most PASSWORD_HASH_BACKLOG more may wait. Past that they are turned
+away with a 503 and Retry-After before any database work, instead of
+queueing more CPU.
+"""
+
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+from contextlib import contextmanager
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+
+class PasswordHashingBusy(APIException):
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = 'Too many registrations right now, please try again shortly.'
+    default_code = 'password_hashing_busy'
+    # Sent as Retry-After by DRF's exception handler
+    wait = 1
+
+
+class PasswordHashPool:
+    def __init__(self, workers, backlog):
+        self.workers = workers
+        self.slots = threading.BoundedSemaphore(workers + backlog)
+        self.lock = threading.Lock()
+        self.executor = None
+        self.hashed = 0
+
+    def get_executor(self):
+        # Created on first use, so preloaded gunicorn masters fork before
+        # any pool thread exists
+        with self.lock:
+            if self.executor is None:
+                self.executor = ThreadPoolExecutor(self.workers, thread_name_prefix='password-hash')
+            return self.executor
+
+    @contextmanager
+    def reserve(self):
+        """
+        Take a place in the pool or raise PasswordHashingBusy. Yields a
+        function hashing one password there; the place is freed when that
+        hash finishes, or on exit if nothing was hashed.
+        """
+        if not self.slots.acquire(blocking=False):
+            raise PasswordHashingBusy()
+        futures = []
+
+        def hash_password(password):
+            with self.lock:
+                self.hashed += 1
+            future = self.get_executor().submit(make_password, password)
+            future.add_done_callback(lambda _: self.slots.release())
+            futures.append(future)
+            try:
+                return future.result(timeout=settings.PASSWORD_HASH_TIMEOUT)
+            except TimeoutError:
+                raise PasswordHashingBusy()
+
+        try:
+            yield hash_password
+        finally:
+            if not futures:
+                self.slots.release()
+
+
+password_hash_pool = PasswordHashPool(settings.PASSWORD_HASH_WORKERS, settings.PASSWORD_HASH_BACKLOG)
@@ -0,0 +1,100 @@
+import statistics
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import IntegrityError, connections
+from rest_framework.exceptions import APIException, ValidationError
+from accounts.hashing import password_hash_pool
+from accounts.serializers import RegisterSerializer
+
+User = get_user_model()
+
+PASSWORD = "Benchmark-pass-1"
+
+
+def legacy_register(username, email):
+    """
+    The old flow: look both fields up, hash in the request thread, insert
+    """
+    if User.objects.filter(email=email).exists() or User.objects.filter(username=username).exists():
+        raise ValidationError("duplicate")
+    return User.objects.create_user(username=username, email=email, password=PASSWORD)
+
+
+def register(username, email):
+    serializer = RegisterSerializer(
+        data={"username": username, "email": email, "password": PASSWORD, "confirm_password": PASSWORD}
+    )
+    serializer.is_valid(raise_exception=True)
+    return serializer.save()
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark concurrent registrations, old flow vs. constraint-checked inserts hashed afterwards in the pool. "
+        "Creates real users (benchmark-reg-*) in the configured database and deletes them afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=40, help="Registrations per flow")
+        parser.add_argument("--concurrency", type=int, default=8, help="Simultaneous registrations (request threads)")
+        parser.add_argument("--duplicates", type=float, default=0.25, help="Share of registrations reusing a taken username")
+
+    def handle(self, *args, **options):
+        run = uuid.uuid4().hex[:8]
+        try:
+            for name, flow in [("old (exists + inline hash)", legacy_register), ("insert first + pooled hash", register)]:
+                self.bench(name, flow, f"benchmark-reg-{run}-{flow.__name__}", options)
+        finally:
+            User.objects.filter(username__startswith=f"benchmark-reg-{run}").delete()
+
+    def bench(self, name, flow, prefix, options):
+        users, concurrency = options["users"], options["concurrency"]
+        duplicates = int(users * options["duplicates"])
+        # Each duplicate right after its original, so the two often run at
+        # the same time
+        names = []
+        for i in range(users - duplicates):
+            names += [f"{prefix}-{i}"] * (2 if i < duplicates else 1)
+        outcomes = {"created": 0, "duplicate": 0, "busy": 0, "error": 0}
+        latencies = []
+
+        def attempt(index, username):
+            started = time.perf_counter()
+            try:
+                flow(username, f"{username}-{index}@example.com")
+                outcome = "created"
+            except ValidationError:
+                outcome = "duplicate"
+            except APIException:
+                outcome = "busy"
+            except IntegrityError:
+                # A duplicate that slipped past the exists() checks: a 500
+                outcome = "error"
+            finally:
+                connections.close_all()
+            latencies.append(time.perf_counter() - started)
+            outcomes[outcome] += 1
+
+        hashed = password_hash_pool.hashed
+        started = time.perf_counter()
+        with ThreadPoolExecutor(concurrency) as executor:
+            list(executor.map(attempt, range(users), names))
+        elapsed = time.perf_counter() - started
+
+        latencies.sort()
+        if flow is legacy_register:
+            hashes = outcomes["created"] + outcomes["error"]
+        else:
+            hashes = password_hash_pool.hashed - hashed
+        self.stdout.write(name)
+        self.stdout.write(
+            f"  {users / elapsed:8.1f} registrations/s  p50 {statistics.median(latencies) * 1000:.0f} ms"
+            f"  p95 {latencies[max(0, int(len(latencies) * 0.95) - 1)] * 1000:.0f} ms"
+        )
+        self.stdout.write(
+            f"  created {outcomes['created']}, duplicates rejected {outcomes['duplicate']}, "
+            f"duplicate 500s {outcomes['error']}, busy {outcomes['busy']}, passwords hashed {hashes}"
+        )
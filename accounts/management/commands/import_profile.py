@@ -0,0 +1,78 @@
+import json
+import re
+import subprocess
+import sys
+from collections import defaultdict
+from django.core.management.base import BaseCommand, CommandError
+
+# What a worker imports before serving its first request
+BOOT = (
+    "import django; django.setup(); "
+    "from django.core.wsgi import get_wsgi_application; get_wsgi_application(); "
+    "from django.urls import get_resolver; get_resolver().url_patterns"
+)
+
+LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \| (\s*)(\S+)$")
+
+
+def parse_importtime(output):
+    """
+    (module, self us, cumulative us, depth) for every line of -X importtime
+    output
+    """
+    for line in output.splitlines():
+        match = LINE.match(line)
+        if match:
+            own, cumulative, indent, module = match.groups()
+            yield module, int(own), int(cumulative), len(indent) // 2
+
+
+class Command(BaseCommand):
+    help = "Summarize python -X importtime for a worker boot (settings, apps, WSGI handler, URLconf)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--top", type=int, default=15, help="Rows per table")
+        parser.add_argument("--json", action="store_true", help="Print the summary as JSON (for tracking over time)")
+        parser.add_argument("--max-total-ms", type=float, help="Exit with an error when the total import time is above this")
+
+    def summarize(self, output):
+        packages = defaultdict(int)
+        modules = []
+        total = 0
+        for module, own, cumulative, depth in parse_importtime(output):
+            packages[module.split(".")[0]] += own
+            modules.append((module, own, cumulative))
+            if depth == 0:
+                total += cumulative
+        top = self.options["top"]
+        return {
+            "total_ms": total / 1000,
+            "modules": len(modules),
+            # Self time summed per top-level package: what each dependency costs
+            "packages_ms": {
+                name: own / 1000 for name, own in sorted(packages.items(), key=lambda item: -item[1])[:top]
+            },
+            "slowest_modules_ms": {
+                module: own / 1000 for module, own, _ in sorted(modules, key=lambda row: -row[1])[:top]
+            },
+        }
+
+    def handle(self, *args, **options):
+        self.options = options
+        result = subprocess.run([sys.executable, "-X", "importtime", "-c", BOOT], capture_output=True, text=True)
+        if result.returncode:
+            raise CommandError(f"Boot failed:\n{result.stderr}")
+        summary = self.summarize(result.stderr)
+
+        if options["json"]:
+            self.stdout.write(json.dumps(summary, indent=2))
+        else:
+            self.stdout.write(f"Total import time {summary['total_ms']:.1f} ms over {summary['modules']} modules\n")
+            for title, key in [("Packages (self time)", "packages_ms"), ("Slowest modules (self time)", "slowest_modules_ms")]:
+                self.stdout.write(title)
+                for name, ms in summary[key].items():
+                    self.stdout.write(f"  {ms:8.1f} ms  {name}")
+
+        budget = options["max_total_ms"]
+        if budget is not None and summary["total_ms"] > budget:
+            raise CommandError(f"Import time {summary['total_ms']:.1f} ms is over the {budget:.1f} ms budget")
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from ecommerce_backend.db import delete_in_batches
+from accounts.models import TokenSession
+
+
+class Command(BaseCommand):
+    help = "Delete token sessions whose refresh token has expired (revoked or not), in batches. Run daily."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        expired = TokenSession.objects.filter(expires_at__lt=timezone.now())
+        deleted = delete_in_batches(expired, options["batch_size"])
+        self.stdout.write(self.style.SUCCESS(f"Deleted {deleted} expired token sessions"))
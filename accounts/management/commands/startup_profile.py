@@ -0,0 +1,59 @@
+import json
+import statistics
+import subprocess
+import sys
+import time
+from django.core.management.base import BaseCommand, CommandError
+
+# Runs in a fresh interpreter, since this process has already paid for all
+# of it. Each phase is timed from the end of the previous one.
+PROBE = """
+import json, time
+marks = [("start", time.perf_counter())]
+import django
+from django.conf import settings
+settings.INSTALLED_APPS
+marks.append(("settings", time.perf_counter()))
+django.setup()
+marks.append(("apps_ready", time.perf_counter()))
+from django.core.wsgi import get_wsgi_application
+get_wsgi_application()
+marks.append(("wsgi_app", time.perf_counter()))
+from django.urls import get_resolver
+get_resolver().url_patterns
+marks.append(("urlconf", time.perf_counter()))
+print(json.dumps({name: (at - previous) * 1000 for (_, previous), (name, at) in zip(marks, marks[1:])}))
+"""
+
+PHASES = {
+    "settings": "import Django and the settings module",
+    "apps_ready": "django.setup(): app registry, models, signals",
+    "wsgi_app": "WSGI handler and middleware",
+    "urlconf": "URLconf, views and serializers (first request)",
+}
+
+
+class Command(BaseCommand):
+    help = "Measure cold start: interpreter, settings, app loading, WSGI handler and URLconf import times"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--repeat", type=int, default=5, help="Fresh processes to time; medians are reported")
+
+    def probe(self):
+        started = time.perf_counter()
+        result = subprocess.run([sys.executable, "-c", PROBE], capture_output=True, text=True)
+        total = (time.perf_counter() - started) * 1000
+        if result.returncode:
+            raise CommandError(f"Startup probe failed:\n{result.stderr}")
+        timings = json.loads(result.stdout.strip().splitlines()[-1])
+        # Whatever the phases do not account for is the interpreter itself
+        timings["interpreter"] = total - sum(timings.values())
+        timings["total"] = total
+        return timings
+
+    def handle(self, *args, **options):
+        runs = [self.probe() for _ in range(options["repeat"])]
+        rows = [("interpreter", "Python start-up and site imports"), *PHASES.items(), ("total", "")]
+        for name, description in rows:
+            median = statistics.median(run[name] for run in runs)
+            self.stdout.write(f"{name:<12} {median:8.1f} ms  {description}")
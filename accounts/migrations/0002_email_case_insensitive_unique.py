@@ -0,0 +1,30 @@
+# Generated by Django 6.0 on 2026-10-19 07:02
+
+import django.db.models.functions.text
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("accounts", "0001_initial"),
+        ("auth", "0012_alter_user_first_name_max_length"),
+    ]
+
+    operations = [
+        # Before dropping the case-sensitive unique index, so emails are
+        # never left unconstrained
+        migrations.AddConstraint(
+            model_name="user",
+            constraint=models.UniqueConstraint(
+                django.db.models.functions.text.Lower("email"),
+                name="users_email_ci_uniq",
+                violation_error_message="A user with this email already exists.",
+            ),
+        ),
+        migrations.AlterField(
+            model_name="user",
+            name="email",
+            field=models.EmailField(max_length=191),
+        ),
+    ]
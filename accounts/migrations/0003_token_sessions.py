@@ -0,0 +1,52 @@
+# Generated by Django 6.0 on 2026-10-19 07:05
+
+import django.db.models.deletion
+import uuid
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("accounts", "0002_email_case_insensitive_unique"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="TokenSession",
+            fields=[
+                (
+                    "id",
+                    models.UUIDField(
+                        default=uuid.uuid4,
+                        editable=False,
+                        primary_key=True,
+                        serialize=False,
+                    ),
+                ),
+                ("jti", models.UUIDField()),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("expires_at", models.DateTimeField(db_index=True)),
+                ("revoked_at", models.DateTimeField(blank=True, null=True)),
+                (
+                    "user",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="token_sessions",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+            options={
+                "db_table": "token_sessions",
+                "indexes": [
+                    models.Index(
+                        condition=models.Q(("revoked_at__isnull", False)),
+                        fields=["expires_at"],
+                        name="token_sessions_revoked_idx",
+                    )
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 6.0 on 2026-10-19 07:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("accounts", "0003_token_sessions"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="user",
+            name="summary_version",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+    ]
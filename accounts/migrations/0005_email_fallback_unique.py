@@ -0,0 +1,34 @@
+from django.db import migrations
+
+# users_email_ci_uniq is an expression index, which backends without
+# supports_expression_indexes (MariaDB, MySQL before 8.0.13) skip, and
+# 0002 dropped the plain unique index on email, leaving emails there
+# unconstrained. Those backends get a plain unique index back (their
+# default collations compare case-insensitively anyway), created as a bare
+# index outside the model state.
+FALLBACK_INDEX = "users_email_uniq"
+
+
+def add_fallback_unique(apps, schema_editor):
+    if schema_editor.connection.features.supports_expression_indexes:
+        return
+    quote = schema_editor.quote_name
+    schema_editor.execute(f"CREATE UNIQUE INDEX {quote(FALLBACK_INDEX)} ON {quote('users')} ({quote('email')})")
+
+
+def remove_fallback_unique(apps, schema_editor):
+    if schema_editor.connection.features.supports_expression_indexes:
+        return
+    quote = schema_editor.quote_name
+    schema_editor.execute(schema_editor.sql_delete_index % {"name": quote(FALLBACK_INDEX), "table": quote("users")})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("accounts", "0004_user_summary_version"),
+    ]
+
+    operations = [
+        migrations.RunPython(add_fallback_unique, remove_fallback_unique),
+    ]
@@ -1,5 +1,7 @@
+import uuid
 from django.contrib.auth.models import AbstractBaseUser, BaseUserManager, PermissionsMixin
 from django.db import models
+from django.db.models.functions import Lower
 
 class UserManager(BaseUserManager):
     def create_user(self, username, email, password=None, **extra_fields):
@@ -28,7 +30,9 @@ class UserManager(BaseUserManager):
 
 class User(AbstractBaseUser, PermissionsMixin):
     username = models.CharField(max_length=150, unique=True)
-    email = models.EmailField(max_length=191, unique=True)  # FIXED HERE
+    # Unique regardless of case, see users_email_ci_uniq (and migration
+    # 0005 for backends without expression indexes)
+    email = models.EmailField(max_length=191)
     first_name = models.CharField(max_length=100, blank=True)
     last_name = models.CharField(max_length=100, blank=True)
     phone = models.CharField(max_length=15, blank=True)
@@ -39,6 +43,8 @@ class User(AbstractBaseUser, PermissionsMixin):
 
     date_joined = models.DateTimeField(auto_now_add=True)
     last_login = models.DateTimeField(auto_now=True)
+    # Part of the "me" summary's cache key (see summary.py)
+    summary_version = models.PositiveIntegerField(default=0, editable=False)
 
     objects = UserManager()
 
@@ -49,12 +55,62 @@ class User(AbstractBaseUser, PermissionsMixin):
         db_table = 'users'
         verbose_name = 'User'
         verbose_name_plural = 'Users'
+        constraints = [
+            models.UniqueConstraint(
+                Lower('email'),
+                name='users_email_ci_uniq',
+                violation_error_message='A user with this email already exists.',
+            ),
+        ]
 
     def __str__(self):
         return self.username
 
+    def save(self, *args, **kwargs):
+        # A profile save is a summary change too. The version is bumped in
+        # SQL, so a stale copy of the user never writes an older one back.
+        update_fields = kwargs.get('update_fields')
+        bump = not self._state.adding and (update_fields is None or 'summary_version' in update_fields)
+        if bump:
+            self.summary_version = models.F('summary_version') + 1
+        super().save(*args, **kwargs)
+        if bump:
+            # Reloaded on next access
+            del self.summary_version
+
     def get_full_name(self):
         return f"{self.first_name} {self.last_name}".strip()
 
     def get_short_name(self):
         return self.username
+
+
+class TokenSession(models.Model):
+    """
+    One login: every refresh token of the session carries its id as the
+    "sid" claim, and so do the access tokens made from them. Only the
+    current refresh token's jti is kept, so a session is one small row
+    however often it refreshes, and a rotated-out token presented again
+    is recognised as reuse.
+    """
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='token_sessions')
+    jti = models.UUIDField()
+    created_at = models.DateTimeField(auto_now_add=True)
+    # Of the current refresh token; purge_token_sessions deletes past it
+    expires_at = models.DateTimeField(db_index=True)
+    revoked_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        db_table = 'token_sessions'
+        indexes = [
+            # The revocation set: revoked sessions that have not expired
+            models.Index(
+                fields=['expires_at'],
+                name='token_sessions_revoked_idx',
+                condition=models.Q(revoked_at__isnull=False),
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.user} {self.id}"
@@ -1,6 +1,11 @@
 from rest_framework import serializers
 from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
 from django.contrib.auth.password_validation import validate_password
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from orders.serializers import OrderSerializer
+from .hashing import password_hash_pool
 
 User = get_user_model()
 
@@ -11,35 +16,57 @@ class UserSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'date_joined']
 
 class RegisterSerializer(serializers.ModelSerializer):
+    """
+    Duplicate usernames and emails are caught by the unique constraints
+    rather than looked up first, which left a race window between the
+    check and the insert. The user is inserted with an unusable password
+    first, so a duplicate fails before any hashing; the password is then
+    hashed in the bounded pool (see hashing.py) and written in the same
+    transaction. A place in the pool is taken before the insert, so a
+    full pool still turns the request away before any database work.
+    """
     password = serializers.CharField(write_only=True, required=True, validators=[validate_password])
     confirm_password = serializers.CharField(write_only=True, required=True)
     
     class Meta:
         model = User
         fields = ['username', 'email', 'password', 'confirm_password']
+        # No UniqueValidator query for username; the constraint decides
+        extra_kwargs = {'username': {'validators': []}}
     
     def validate(self, attrs):
         if attrs['password'] != attrs['confirm_password']:
             raise serializers.ValidationError({"password": "Password fields didn't match."})
         return attrs
     
-    def validate_email(self, value):
-        if User.objects.filter(email=value).exists():
-            raise serializers.ValidationError("A user with this email already exists.")
-        return value
-    
-    def validate_username(self, value):
-        if User.objects.filter(username=value).exists():
-            raise serializers.ValidationError("A user with this username already exists.")
-        return value
+    def duplicate_errors(self, username, email):
+        """
+        Field errors for an insert that hit a unique constraint; only runs
+        on that failure path
+        """
+        errors = {}
+        taken = User.objects.filter(Q(username=username) | Q(email__iexact=email)).values_list('username', 'email')
+        for existing_username, existing_email in taken:
+            if existing_username == username:
+                errors['username'] = ["A user with this username already exists."]
+            if existing_email.lower() == email.lower():
+                errors['email'] = ["A user with this email already exists."]
+        return errors
     
     def create(self, validated_data):
-        validated_data.pop('confirm_password')
-        user = User.objects.create_user(
-            username=validated_data['username'],
-            email=validated_data['email'],
-            password=validated_data['password']
-        )
+        username = validated_data['username']
+        email = User.objects.normalize_email(validated_data['email'])
+        with password_hash_pool.reserve() as hash_password:
+            try:
+                with transaction.atomic():
+                    user = User.objects.create(username=username, email=email, password=make_password(None))
+                    user.password = hash_password(validated_data['password'])
+                    User.objects.filter(pk=user.pk).update(password=user.password)
+            except IntegrityError:
+                errors = self.duplicate_errors(username, email)
+                if not errors:
+                    raise
+                raise serializers.ValidationError(errors)
         return user
 
 class LoginSerializer(serializers.Serializer):
@@ -54,4 +81,16 @@ class ChangePasswordSerializer(serializers.Serializer):
     def validate(self, attrs):
         if attrs['new_password'] != attrs['confirm_password']:
             raise serializers.ValidationError({"new_password": "Password fields didn't match."})
-        return attrs
\ No newline at end of file
+        return attrs
+
+class SummaryCartSerializer(serializers.Serializer):
+    count = serializers.IntegerField()
+    total = serializers.DecimalField(max_digits=10, decimal_places=2)
+
+class SummaryOrderSerializer(OrderSerializer):
+    """
+    The latest order in the "me" summary, rendered as the orders endpoints
+    render it
+    """
+    class Meta(OrderSerializer.Meta):
+        fields = ['id', 'order_number', 'order_status', 'total_amount', 'created_at']
@@ -0,0 +1,31 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from orders.models import Cart, Order
+from products.models import Favorite, Product
+from . import summary
+
+
+@receiver(post_save, sender=Cart)
+@receiver(post_delete, sender=Cart)
+@receiver(post_save, sender=Favorite)
+@receiver(post_delete, sender=Favorite)
+@receiver(post_save, sender=Order)
+def invalidate_owner_summary(sender, instance, raw=False, **kwargs):
+    """
+    Cart, favorite and order writes change their owner's summary; order
+    status transitions are queryset updates and invalidate themselves, and
+    profile saves bump the version in User.save()
+    """
+    if raw:
+        return
+    summary.invalidate([instance.user_id])
+
+
+@receiver(post_save, sender=Product)
+def invalidate_cart_summaries(sender, instance, raw=False, created=False, **kwargs):
+    """
+    The cart totals of everyone holding the product follow its price
+    """
+    if raw or created:
+        return
+    summary.invalidate(Cart.objects.filter(product=instance).values_list('user_id', flat=True))
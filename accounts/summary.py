@@ -0,0 +1,64 @@
+"""
+The "me" summary behind the frontend header: profile, cart count and
+total, favorites count and latest order, read as one cached blob per user.
+
+The blob's key embeds the user's summary_version column, which the
+authenticating request has already loaded with the user. Cart, favorite,
+order and product price writes increment it in SQL, in the writing
+transaction (signals.py, plus the order state machine's queryset
+updates), and profile saves do in User.save(). Every worker therefore
+moves to the new key at once, whatever cache each one has; stale blobs
+simply age out after SUMMARY_CACHE_TIMEOUT.
+"""
+
+from django.db.models import Count, DecimalField, F, Sum
+from django.db.models.functions import Coalesce
+from django.core.cache import cache
+from orders.models import Cart, Order
+from products.models import Favorite
+from .models import User
+from .serializers import SummaryCartSerializer, SummaryOrderSerializer, UserSerializer
+
+SUMMARY_CACHE_TIMEOUT = 10 * 60
+
+
+def cache_key(user):
+    return f"me_summary:{user.pk}:{user.summary_version}"
+
+
+def invalidate(user_ids):
+    """
+    Move ``user_ids`` (ids or a values_list queryset) to a new summary
+    version
+    """
+    User.objects.filter(pk__in=user_ids).update(summary_version=F('summary_version') + 1)
+
+
+def build(user):
+    cart = Cart.objects.filter(user=user).aggregate(
+        count=Count('pk'),
+        total=Coalesce(Sum(F('product__price') * F('quantity'), output_field=DecimalField()), 0, output_field=DecimalField()),
+    )
+    latest_order = (
+        Order.objects.filter(user=user)
+        .order_by('-created_at', '-pk')
+        .values('id', 'order_number', 'order_status', 'total_amount', 'created_at')
+        .first()
+    )
+    # Through the same DRF fields as the cart and order endpoints, so
+    # amounts and local times render alike
+    return {
+        'user': UserSerializer(user).data,
+        'cart': SummaryCartSerializer(cart).data,
+        'favorites': {'count': Favorite.objects.filter(user=user).count()},
+        'latest_order': latest_order and SummaryOrderSerializer(latest_order).data,
+    }
+
+
+def get_summary(user):
+    key = cache_key(user)
+    summary = cache.get(key)
+    if summary is None:
+        summary = build(user)
+        cache.set(key, summary, SUMMARY_CACHE_TIMEOUT)
+    return summary
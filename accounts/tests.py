@@ -1,3 +1,308 @@
-from django.test import TestCase
+import json
+import threading
+from datetime import timedelta
+from unittest import mock
+from django.core.management import call_command
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken, RefreshToken
+from ecommerce_backend.ratelimit import TokenBucket
+from orders.state_machine import transition
+from products.models import Category
+from products.tests import make_products
+from . import summary as me_summary
+from .hashing import password_hash_pool
+from .models import TokenSession
+from .serializers import RegisterSerializer
+from .summary import get_summary
 
-# Create your tests here.
+User = get_user_model()
+
+
+class TokenBucketTest(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_burst_then_refill(self):
+        bucket = TokenBucket('2/minute', burst=3)
+        self.assertEqual([bucket.take('bucket', now=0) for _ in range(3)], [0, 0, 0])
+        self.assertEqual(bucket.take('bucket', now=0), 30)
+        self.assertAlmostEqual(bucket.take('bucket', now=10), 20)
+        self.assertEqual(bucket.take('bucket', now=30), 0)
+        self.assertEqual(bucket.take('bucket', now=30), 30)
+
+
+@override_settings(
+    RATE_LIMIT_ENABLED=True,
+    RATE_LIMIT_GROUPS={
+        'auth': {'rate': '2/minute', 'key': 'ip'},
+        'catalog': {'rate': '3/minute', 'key': 'user'},
+        'search': {'rate': '1/minute', 'key': 'user', 'param': 'search'},
+    },
+    RATE_LIMIT_VIEWS={'register': ['auth'], 'product-list': ['search', 'catalog']},
+)
+class RateLimitMiddlewareTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+
+    def test_throttled_before_database_work(self):
+        for _ in range(2):
+            self.assertEqual(self.client.post(reverse('register'), {}, format='json').status_code, 400)
+        with self.assertNumQueries(0):
+            response = self.client.post(reverse('register'), {}, format='json')
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response['Retry-After'], '30')
+        # Buckets are per client address
+        other = self.client.post(reverse('register'), {}, format='json', REMOTE_ADDR='10.0.0.2')
+        self.assertEqual(other.status_code, 400)
+
+    def test_search_has_its_own_bucket(self):
+        url = reverse('product-list')
+        self.assertEqual(self.client.get(url, {'search': 'shirt'}).status_code, 200)
+        self.assertEqual(self.client.get(url, {'search': 'polo'}).status_code, 429)
+        self.assertEqual(self.client.get(url).status_code, 200)
+
+    def test_users_are_limited_separately(self):
+        url = reverse('product-list')
+        for _ in range(3):
+            self.assertEqual(self.client.get(url).status_code, 200)
+        self.assertEqual(self.client.get(url).status_code, 429)
+
+        user = User.objects.create_user('shopper', 'shopper@example.com', 'pass12345')
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(user)}')
+        self.assertEqual(self.client.get(url).status_code, 200)
+        # An invalid token counts against the address
+        self.client.credentials(HTTP_AUTHORIZATION='Bearer not-a-token')
+        self.assertEqual(self.client.get(url).status_code, 429)
+
+
+@override_settings(RATE_LIMIT_ENABLED=False)
+class RegistrationTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+
+    def register(self, username, email):
+        return self.client.post(reverse('register'), {
+            'username': username, 'email': email, 'password': 'Tr1cky-pass', 'confirm_password': 'Tr1cky-pass',
+        }, format='json')
+
+    def test_registers_with_hashed_password(self):
+        response = self.register('shopper', 'shopper@example.com')
+        self.assertEqual(response.status_code, 201)
+        user = User.objects.get(username='shopper')
+        self.assertTrue(user.check_password('Tr1cky-pass'))
+
+    def test_inserts_then_hashes_once(self):
+        hashed = password_hash_pool.hashed
+        with CaptureQueriesContext(connection) as queries:
+            user = RegisterSerializer().create({
+                'username': 'shopper', 'email': 'shopper@example.com', 'password': 'Tr1cky-pass',
+            })
+        # The insert with an unusable password, then the hash written over it
+        statements = [query['sql'].split()[0] for query in queries if 'SAVEPOINT' not in query['sql']]
+        self.assertEqual(statements, ['INSERT', 'UPDATE'])
+        self.assertEqual(password_hash_pool.hashed, hashed + 1)
+        self.assertTrue(user.check_password('Tr1cky-pass'))
+        self.assertTrue(User.objects.get(pk=user.pk).check_password('Tr1cky-pass'))
+
+    def test_duplicates_are_field_errors(self):
+        self.register('shopper', 'shopper@example.com')
+        hashed = password_hash_pool.hashed
+
+        response = self.register('shopper', 'other@example.com')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(list(response.data), ['username'])
+
+        # Emails are unique regardless of case
+        response = self.register('other', 'Shopper@Example.com')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(list(response.data), ['email'])
+
+        # Duplicates fail at the insert, before any hashing
+        self.assertEqual(password_hash_pool.hashed, hashed)
+        self.assertEqual(User.objects.count(), 1)
+
+    def test_full_pool_turns_registrations_away(self):
+        with mock.patch.object(password_hash_pool, 'slots', threading.Semaphore(0)):
+            response = self.register('shopper', 'shopper@example.com')
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response['Retry-After'], '1')
+        self.assertFalse(User.objects.exists())
+
+
+@override_settings(RATE_LIMIT_ENABLED=False)
+class TokenSessionTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = User.objects.create_user('shopper', 'shopper@example.com', 'Tr1cky-pass')
+
+    def login(self):
+        response = self.client.post(reverse('login'), {'username': 'shopper', 'password': 'Tr1cky-pass'}, format='json')
+        return response.data['tokens']
+
+    def profile(self, access):
+        return self.client.get(reverse('user-profile'), HTTP_AUTHORIZATION=f'Bearer {access}')
+
+    def refresh(self, refresh):
+        return self.client.post(reverse('token-refresh'), {'refresh': refresh}, format='json')
+
+    def test_rotation_keeps_one_row_and_detects_reuse(self):
+        tokens = self.login()
+        rotated = self.refresh(tokens['refresh'])
+        self.assertEqual(rotated.status_code, 200)
+        self.assertEqual(TokenSession.objects.count(), 1)
+        self.assertEqual(self.profile(rotated.data['tokens']['access']).status_code, 200)
+
+        # The rotated-out token comes back: the whole session is revoked
+        self.assertEqual(self.refresh(tokens['refresh']).status_code, 401)
+        self.assertEqual(self.refresh(rotated.data['tokens']['refresh']).status_code, 401)
+        self.assertEqual(self.profile(rotated.data['tokens']['access']).status_code, 401)
+
+    def test_token_from_before_sessions_rotates_once(self):
+        legacy = str(RefreshToken.for_user(self.user))
+        rotated = self.refresh(legacy)
+        self.assertEqual(rotated.status_code, 200)
+        session = TokenSession.objects.get()
+        self.assertEqual(session.user, self.user)
+        self.assertEqual(self.profile(rotated.data['tokens']['access']).status_code, 200)
+        self.assertEqual(self.refresh(rotated.data['tokens']['refresh']).status_code, 200)
+
+        # Presented again, it is reuse like any rotated-out token
+        self.assertEqual(self.refresh(legacy).status_code, 401)
+        self.assertIsNotNone(TokenSession.objects.get().revoked_at)
+
+    def test_logout_revokes_only_that_session(self):
+        phone, laptop = self.login(), self.login()
+        response = self.client.post(
+            reverse('logout'), {'refresh_token': phone['refresh']}, format='json',
+            HTTP_AUTHORIZATION=f"Bearer {phone['access']}",
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.profile(phone['access']).status_code, 401)
+        self.assertEqual(self.refresh(phone['refresh']).status_code, 401)
+        self.assertEqual(self.profile(laptop['access']).status_code, 200)
+
+    def test_revocation_check_is_cached(self):
+        access = self.login()['access']
+        self.profile(access)
+        # The user lookup; the revoked set comes from the cache
+        with self.assertNumQueries(1):
+            self.assertEqual(self.profile(access).status_code, 200)
+
+    def test_purge_deletes_expired_sessions(self):
+        self.login()
+        self.login()
+        TokenSession.objects.filter(pk=TokenSession.objects.first().pk).update(
+            expires_at=timezone.now() - timedelta(seconds=1),
+        )
+        call_command('purge_token_sessions', batch_size=1, stdout=mock.MagicMock())
+        self.assertEqual(TokenSession.objects.count(), 1)
+
+
+@override_settings(RATE_LIMIT_ENABLED=False)
+class MeSummaryTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user('shopper', 'shopper@example.com', 'Tr1cky-pass')
+        self.client = APIClient()
+        self.product = make_products(Category.objects.create(name='party'), 1)[0]
+        variant = self.product.variants.get()
+        variant.stock = 5
+        variant.save()
+
+    def fresh_user(self):
+        # As token authentication loads it on every request
+        return User.objects.get(pk=self.user.pk)
+
+    def summary(self):
+        self.client.force_authenticate(self.fresh_user())
+        response = self.client.get(reverse('me-summary'))
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def mutate(self, method, name, *args, **data):
+        self.client.force_authenticate(self.fresh_user())
+        with self.captureOnCommitCallbacks(execute=True):
+            response = getattr(self.client, method)(reverse(name, args=args), data, format='json')
+        self.assertLess(response.status_code, 300, response.data)
+        return response
+
+    def test_cached_until_a_mutation(self):
+        self.assertEqual(self.summary()['cart'], {'count': 0, 'total': '0.00'})
+        user = self.fresh_user()
+        with self.assertNumQueries(0):
+            get_summary(user)
+
+        self.mutate('post', 'add-to-cart', product_id=self.product.pk, quantity=2)
+        self.assertEqual(self.summary()['cart'], {'count': 1, 'total': str(self.product.price * 2)})
+
+        self.mutate('post', 'add-favorite', self.product.pk)
+        self.assertEqual(self.summary()['favorites'], {'count': 1})
+
+        self.mutate('post', 'create-order', **{
+            'full_name': 'Test Shopper', 'email': 'shopper@example.com', 'phone': '9999999999',
+            'address': '1 Main Road', 'city': 'Chennai', 'state': 'Tamil Nadu',
+            'pincode': '600001', 'payment_method': 'cod',
+        })
+        summary = self.summary()
+        self.assertEqual(summary['cart']['count'], 0)
+        self.assertEqual(summary['latest_order']['order_status'], 'pending')
+
+        transition(summary['latest_order']['id'], 'cancelled')
+        self.assertEqual(self.summary()['latest_order']['order_status'], 'cancelled')
+
+    def test_renders_like_the_order_endpoints(self):
+        self.mutate('post', 'add-to-cart', product_id=self.product.pk, quantity=2)
+        self.client.force_authenticate(self.fresh_user())
+        cart = json.loads(self.client.get(reverse('me-summary')).content)['cart']
+        self.assertEqual(cart, {'count': 1, 'total': str(self.product.price * 2)})
+
+        self.mutate('post', 'create-order', **{
+            'full_name': 'Test Shopper', 'email': 'shopper@example.com', 'phone': '9999999999',
+            'address': '1 Main Road', 'city': 'Chennai', 'state': 'Tamil Nadu',
+            'pincode': '600001', 'payment_method': 'cod',
+        })
+        self.client.force_authenticate(self.fresh_user())
+        latest = json.loads(self.client.get(reverse('me-summary')).content)['latest_order']
+        order = json.loads(self.client.get(reverse('order-detail', args=[latest['id']])).content)
+        self.assertEqual(latest['total_amount'], order['total_amount'])
+        self.assertEqual(latest['total_amount'], str(self.product.price * 2))
+        self.assertEqual(latest['created_at'], order['created_at'])
+        self.assertTrue(latest['created_at'].endswith('+05:30'), latest['created_at'])
+
+    def test_price_change_updates_cart_total(self):
+        self.mutate('post', 'add-to-cart', product_id=self.product.pk)
+        self.summary()
+        self.product.price = 100
+        self.product.save()
+        self.assertEqual(self.summary()['cart']['total'], '100.00')
+
+    def test_profile_save_bumps_version(self):
+        self.summary()
+        user = self.fresh_user()
+        user.first_name = 'Asha'
+        user.save()
+        self.assertEqual(self.summary()['user']['first_name'], 'Asha')
+
+    def test_invalidation_reaches_every_worker(self):
+        # Each gunicorn worker has its own LocMemCache
+        workers = [LocMemCache('worker-1', {}), LocMemCache('worker-2', {})]
+
+        def favorites_on(worker):
+            with mock.patch.object(me_summary, 'cache', worker):
+                return get_summary(self.fresh_user())['favorites']['count']
+
+        self.assertEqual([favorites_on(worker) for worker in workers], [0, 0])
+        with mock.patch.object(me_summary, 'cache', workers[0]):
+            self.mutate('post', 'add-favorite', self.product.pk)
+        self.assertEqual([favorites_on(worker) for worker in workers], [1, 1])
@@ -0,0 +1,133 @@
+"""
+JWT sessions.
+
+simplejwt's blacklist app keeps every refresh token ever issued in one
+table and every revoked one in another, and reads them on each refresh.
+Here a login is a TokenSession row instead (see models.py): tokens carry
+its id as the "sid" claim, refreshing rotates the row's jti in place, and
+logging out revokes the whole session, access tokens included.
+Refresh tokens issued before sessions existed have no "sid"; the first
+refresh of one starts a session for it, so nobody is logged out by the
+switch.
+
+Revocation is checked on every authenticated request against the set of
+revoked, unexpired session ids, kept in the cache for
+REVOKED_SESSIONS_CACHE_SECONDS and dropped whenever a session is revoked.
+With a per-process cache, other workers notice a revocation once their
+copy expires.
+"""
+
+import uuid
+from datetime import datetime, timezone as dt_timezone
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+from .models import TokenSession, User
+
+SESSION_CLAIM = 'sid'
+REVOKED_CACHE_KEY = 'token_sessions:revoked'
+# Sessions of tokens issued before sessions are named after the token's
+# jti, so a second refresh of the same token finds the first one's session
+LEGACY_SESSION_NAMESPACE = uuid.UUID('6f1c1d3e-2b8a-4e0c-9a57-1f3f0d9e8b21')
+
+
+def expiry(token):
+    return datetime.fromtimestamp(token['exp'], tz=dt_timezone.utc)
+
+
+def issue_tokens(user):
+    """
+    Start a session for ``user``; returns its refresh and access tokens
+    """
+    refresh = RefreshToken.for_user(user)
+    session = TokenSession.objects.create(
+        user=user, jti=uuid.UUID(refresh['jti']), expires_at=expiry(refresh),
+    )
+    refresh[SESSION_CLAIM] = str(session.pk)
+    return {'refresh': str(refresh), 'access': str(refresh.access_token)}
+
+
+def rotate(raw_token):
+    """
+    Swap a refresh token for a new pair. Raises TokenError for invalid or
+    revoked tokens; presenting a rotated-out token again revokes its
+    session, since one of the two holders is not the user.
+    """
+    refresh = RefreshToken(raw_token)
+    session_id = refresh.get(SESSION_CLAIM) or legacy_session(refresh)
+    session = TokenSession.objects.filter(pk=session_id, revoked_at__isnull=True).select_related('user').first()
+    if session is None or not session.user.is_active:
+        raise TokenError('Session is revoked')
+
+    new_refresh = RefreshToken.for_user(session.user)
+    new_refresh[SESSION_CLAIM] = session_id
+    # Conditional on the old jti, so two concurrent refreshes of one token
+    # cannot both succeed
+    rotated = TokenSession.objects.filter(pk=session_id, jti=refresh['jti'], revoked_at__isnull=True).update(
+        jti=uuid.UUID(new_refresh['jti']), expires_at=expiry(new_refresh),
+    )
+    if not rotated:
+        revoke(TokenSession.objects.filter(pk=session_id))
+        raise TokenError('Token was already used')
+    return {'refresh': str(new_refresh), 'access': str(new_refresh.access_token)}
+
+
+def legacy_session(refresh):
+    """
+    The session id for a refresh token from before sessions, started on
+    its first refresh. Later refreshes of the same token find the session
+    rotated past its jti and are treated as reuse.
+    """
+    session_id = uuid.uuid5(LEGACY_SESSION_NAMESPACE, refresh['jti'])
+    if not TokenSession.objects.filter(pk=session_id).exists():
+        user = User.objects.filter(**{api_settings.USER_ID_FIELD: refresh.get(api_settings.USER_ID_CLAIM)}).first()
+        if user is None:
+            raise TokenError('Token has no session')
+        TokenSession.objects.get_or_create(
+            pk=session_id, defaults={'user': user, 'jti': uuid.UUID(refresh['jti']), 'expires_at': expiry(refresh)},
+        )
+    return str(session_id)
+
+
+def revoke(sessions):
+    """
+    Revoke the ``sessions`` queryset; returns how many were live
+    """
+    revoked = sessions.filter(revoked_at__isnull=True).update(revoked_at=timezone.now())
+    cache.delete(REVOKED_CACHE_KEY)
+    return revoked
+
+
+def session_id(token):
+    """
+    The session of a refresh or access token (None for tokens issued
+    before sessions, which stay valid until they expire)
+    """
+    return token.get(SESSION_CLAIM)
+
+
+def revoked_session_ids():
+    revoked = cache.get(REVOKED_CACHE_KEY)
+    if revoked is None:
+        revoked = {
+            str(pk) for pk in TokenSession.objects.filter(
+                revoked_at__isnull=False, expires_at__gt=timezone.now(),
+            ).values_list('pk', flat=True)
+        }
+        cache.set(REVOKED_CACHE_KEY, revoked, settings.REVOKED_SESSIONS_CACHE_SECONDS)
+    return revoked
+
+
+def is_revoked(token):
+    sid = session_id(token)
+    return sid is not None and sid in revoked_session_ids()
+
+
+def user_sessions(user, keep=None):
+    """
+    The sessions of ``user``, except ``keep``
+    """
+    return TokenSession.objects.filter(user=user).exclude(pk=keep)
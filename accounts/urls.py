@@ -5,7 +5,9 @@ urlpatterns = [
     path('register/', views.register_view, name='register'),
     path('login/', views.login_view, name='login'),
     path('logout/', views.logout_view, name='logout'),
+    path('token/refresh/', views.token_refresh_view, name='token-refresh'),
     path('profile/', views.user_profile_view, name='user-profile'),
+    path('me/summary/', views.me_summary_view, name='me-summary'),
     path('profile/update/', views.update_profile_view, name='update-profile'),
     path('change-password/', views.change_password_view, name='change-password'),
 ]
\ No newline at end of file
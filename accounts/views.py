@@ -2,9 +2,13 @@ from rest_framework import status, generics
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
 from rest_framework.permissions import AllowAny, IsAuthenticated
+from rest_framework_simplejwt.exceptions import TokenError
 from rest_framework_simplejwt.tokens import RefreshToken
 from django.contrib.auth import authenticate, get_user_model
+from .models import TokenSession
 from .serializers import RegisterSerializer, LoginSerializer, UserSerializer, ChangePasswordSerializer
+from .summary import get_summary
+from .tokens import issue_tokens, revoke, rotate, session_id, user_sessions
 
 User = get_user_model()
 
@@ -18,16 +22,10 @@ def register_view(request):
     if serializer.is_valid():
         user = serializer.save()
         
-        # Generate JWT tokens
-        refresh = RefreshToken.for_user(user)
-        
         return Response({
             'message': 'User registered successfully',
             'user': UserSerializer(user).data,
-            'tokens': {
-                'refresh': str(refresh),
-                'access': str(refresh.access_token),
-            }
+            'tokens': issue_tokens(user),
         }, status=status.HTTP_201_CREATED)
     
     return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
@@ -47,16 +45,10 @@ def login_view(request):
         
         if user is not None:
             if user.is_active:
-                # Generate JWT tokens
-                refresh = RefreshToken.for_user(user)
-                
                 return Response({
                     'message': 'Login successful',
                     'user': UserSerializer(user).data,
-                    'tokens': {
-                        'refresh': str(refresh),
-                        'access': str(refresh.access_token),
-                    }
+                    'tokens': issue_tokens(user),
                 }, status=status.HTTP_200_OK)
             else:
                 return Response({
@@ -73,16 +65,34 @@ def login_view(request):
 @permission_classes([IsAuthenticated])
 def logout_view(request):
     """
-    User Logout Endpoint
+    User Logout Endpoint: revokes the session of the refresh token sent,
+    or else of the access token used, along with all its tokens
     """
+    refresh_token = request.data.get('refresh_token')
     try:
-        refresh_token = request.data.get('refresh_token')
-        if refresh_token:
-            token = RefreshToken(refresh_token)
-            token.blacklist()
-        return Response({'message': 'Logout successful'}, status=status.HTTP_200_OK)
-    except Exception as e:
+        token = RefreshToken(refresh_token) if refresh_token else request.auth
+    except TokenError as e:
         return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    sid = session_id(token)
+    if sid is not None:
+        revoke(TokenSession.objects.filter(pk=sid, user=request.user))
+    return Response({'message': 'Logout successful'}, status=status.HTTP_200_OK)
+
+@api_view(['POST'])
+@permission_classes([AllowAny])
+def token_refresh_view(request):
+    """
+    Swap a refresh token for a new access and refresh token; the old
+    refresh token stops working
+    """
+    refresh_token = request.data.get('refresh')
+    if not refresh_token:
+        return Response({'refresh': ['This field is required.']}, status=status.HTTP_400_BAD_REQUEST)
+    try:
+        tokens = rotate(refresh_token)
+    except TokenError as e:
+        return Response({'error': str(e)}, status=status.HTTP_401_UNAUTHORIZED)
+    return Response({'tokens': tokens}, status=status.HTTP_200_OK)
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
@@ -93,6 +103,15 @@ def user_profile_view(request):
     serializer = UserSerializer(request.user)
     return Response(serializer.data, status=status.HTTP_200_OK)
 
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def me_summary_view(request):
+    """
+    Profile, cart count and total, favorites count and latest order for
+    the header badges, from the user's cached summary (see summary.py)
+    """
+    return Response(get_summary(request.user), status=status.HTTP_200_OK)
+
 @api_view(['PUT'])
 @permission_classes([IsAuthenticated])
 def update_profile_view(request):
@@ -132,6 +151,9 @@ def change_password_view(request):
         user.set_password(serializer.validated_data['new_password'])
         user.save()
         
+        # Sign out every other device
+        revoke(user_sessions(user, keep=session_id(request.auth)))
+        
         return Response({
             'message': 'Password changed successfully'
         }, status=status.HTTP_200_OK)
@@ -0,0 +1,99 @@
+"""
+Database helpers shared by the apps.
+"""
+
+import threading
+from collections import Counter
+from django.core.signals import request_started
+from django.db import connections, router
+from django.db.backends.signals import connection_created
+
+
+def bulk_upsert(model, objs, unique_fields, update_fields, batch_size=None):
+    """
+    Insert ``objs``, updating ``update_fields`` of rows that already exist
+    (INSERT ... ON CONFLICT DO UPDATE / ON DUPLICATE KEY UPDATE).
+
+    MySQL takes no conflict target and Django refuses ``unique_fields``
+    there, so they are only passed where the backend supports them.
+    """
+    connection = connections[router.db_for_write(model)]
+    if not connection.features.supports_update_conflicts_with_target:
+        unique_fields = None
+    return model.objects.bulk_create(
+        objs,
+        batch_size=batch_size,
+        update_conflicts=True,
+        unique_fields=unique_fields,
+        update_fields=update_fields,
+    )
+
+
+def delete_in_batches(queryset, batch_size):
+    """
+    Delete the rows of ``queryset`` ``batch_size`` at a time; returns how
+    many were deleted. Short batches keep each DELETE's locks small, so
+    filter on an indexed column.
+    """
+    model = queryset.model
+    deleted = 0
+    while True:
+        pks = list(queryset.values_list('pk', flat=True)[:batch_size])
+        if not pks:
+            return deleted
+        deleted += model.objects.filter(pk__in=pks).delete()[0]
+
+
+class ConnectionMetrics:
+    """
+    Process-wide counters of requests and database connects per alias, to
+    see whether connections are being reused: with persistent connections
+    or a pool, connects stay near the number of worker threads (or pool
+    size) however many requests are served. A connect is a new server
+    connection, or a checkout when the alias uses the PostgreSQL pool.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.connects = Counter()
+
+    def count_request(self, sender, **kwargs):
+        with self.lock:
+            self.requests += 1
+
+    def count_connect(self, sender, connection, **kwargs):
+        with self.lock:
+            self.connects[connection.alias] += 1
+
+    def reset(self):
+        with self.lock:
+            self.requests = 0
+            self.connects.clear()
+
+    def snapshot(self):
+        with self.lock:
+            requests, connects = self.requests, dict(self.connects)
+        databases = {}
+        for alias in connections:
+            config = connections.settings[alias]
+            pool_options = config.get('OPTIONS', {}).get('pool')
+            database = {
+                'vendor': connections[alias].vendor,
+                'connects': connects.get(alias, 0),
+                'conn_max_age': config.get('CONN_MAX_AGE'),
+                'health_checks': config.get('CONN_HEALTH_CHECKS'),
+                'pooled': bool(pool_options),
+            }
+            # Only report a pool this process already opened; the pool
+            # property would create one
+            pool = getattr(connections[alias], '_connection_pools', {}).get(alias)
+            if pool is not None:
+                database['pool'] = pool.get_stats()
+            databases[alias] = database
+        return {'requests': requests, 'databases': databases}
+
+
+connection_metrics = ConnectionMetrics()
+request_started.connect(connection_metrics.count_request, dispatch_uid='connection_metrics_requests')
+connection_created.connect(connection_metrics.count_connect, dispatch_uid='connection_metrics_connects')
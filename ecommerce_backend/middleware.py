@@ -0,0 +1,183 @@
+import hashlib
+import math
+import random
+from django.conf import settings
+from django.core.cache import cache
+from django.http import JsonResponse
+from django.utils.cache import patch_vary_headers
+from django.utils.deprecation import MiddlewareMixin
+from django.utils.text import compress_string
+from .ratelimit import retry_after
+from .routers import read_replica
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - optional dependency
+    brotli = None
+
+
+def parse_accept_encoding(header):
+    """
+    Map each coding in an Accept-Encoding header to its q-value
+    """
+    accepted = {}
+    for part in header.split(','):
+        coding, _, params = part.partition(';')
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        quality = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[coding] = quality
+    return accepted
+
+
+class ApiCompressionMiddleware(MiddlewareMixin):
+    """
+    Compress API responses above API_COMPRESSION_MIN_SIZE bytes, using
+    brotli when the client accepts it (and the package is installed) and
+    gzip otherwise. Static files are left to WhiteNoise.
+
+    Compressing secrets next to attacker-influenced input leaks them
+    through the response size (BREACH), so views returning tokens
+    (API_COMPRESSION_EXCLUDE_VIEWS, by URL name) are never compressed and
+    gzip output is padded with up to 100 random bytes, as Django's
+    GZipMiddleware does.
+    """
+
+    def __init__(self, get_response):
+        super().__init__(get_response)
+        self.path_prefix = getattr(settings, 'API_COMPRESSION_PATH_PREFIX', '/api/')
+        self.min_size = getattr(settings, 'API_COMPRESSION_MIN_SIZE', 1024)
+        self.brotli_quality = getattr(settings, 'API_COMPRESSION_BROTLI_QUALITY', 5)
+        self.exclude_views = set(getattr(settings, 'API_COMPRESSION_EXCLUDE_VIEWS', ()))
+
+    def select_encoding(self, header):
+        accepted = parse_accept_encoding(header)
+        wildcard = accepted.get('*', 0)
+        if brotli is not None and accepted.get('br', wildcard) > 0:
+            return 'br'
+        if accepted.get('gzip', wildcard) > 0:
+            return 'gzip'
+        return None
+
+    def compress(self, encoding, content):
+        if encoding == 'br':
+            return brotli.compress(content, quality=self.brotli_quality)
+        return compress_string(content, max_random_bytes=100)
+
+    def process_response(self, request, response):
+        if response.streaming or response.has_header('Content-Encoding'):
+            return response
+        if not request.path.startswith(self.path_prefix):
+            return response
+        match = request.resolver_match
+        if match is not None and match.view_name in self.exclude_views:
+            return response
+        if len(response.content) < self.min_size:
+            return response
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+
+        encoding = self.select_encoding(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+        if encoding is None:
+            return response
+
+        compressed = self.compress(encoding, response.content)
+        if len(compressed) >= len(response.content):
+            return response
+
+        response.content = compressed
+        response.headers['Content-Length'] = str(len(compressed))
+
+        # The body changed, so a strong ETag no longer matches it
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response.headers['ETag'] = 'W/' + etag
+
+        response.headers['Content-Encoding'] = encoding
+        return response
+
+
+class ReadReplicaMiddleware:
+    """
+    Route safe-method requests under READ_REPLICA_PATH_PREFIXES to a read
+    replica (see routers.py), except for clients that wrote something in
+    the last READ_REPLICA_STICKY_SECONDS: every unsafe request marks its
+    client with a short-lived cookie and, for token-authenticated API
+    clients that drop cookies, a cache flag keyed on the Authorization
+    header, so they read their own writes from the primary while the
+    replicas catch up. The cache flag needs a cache shared by all workers.
+    """
+
+    SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+    COOKIE_NAME = 'read_primary'
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    @staticmethod
+    def sticky_key(request):
+        authorization = request.META.get('HTTP_AUTHORIZATION')
+        if not authorization:
+            return None
+        return 'read_primary:' + hashlib.sha256(authorization.encode()).hexdigest()
+
+    def is_sticky(self, request):
+        if request.COOKIES.get(self.COOKIE_NAME):
+            return True
+        key = self.sticky_key(request)
+        return key is not None and cache.get(key) is not None
+
+    def stick(self, request, response):
+        seconds = settings.READ_REPLICA_STICKY_SECONDS
+        response.set_cookie(self.COOKIE_NAME, '1', max_age=seconds, httponly=True, samesite='Lax')
+        key = self.sticky_key(request)
+        if key is not None:
+            cache.set(key, 1, seconds)
+
+    def __call__(self, request):
+        replicas = settings.DATABASE_REPLICAS
+        if not replicas:
+            return self.get_response(request)
+
+        if request.method not in self.SAFE_METHODS:
+            response = self.get_response(request)
+            self.stick(request, response)
+            return response
+
+        if not request.path.startswith(tuple(settings.READ_REPLICA_PATH_PREFIXES)) or self.is_sticky(request):
+            return self.get_response(request)
+        token = read_replica.set(random.choice(replicas))
+        try:
+            return self.get_response(request)
+        finally:
+            read_replica.reset(token)
+
+
+class RateLimitMiddleware(MiddlewareMixin):
+    """
+    Answer requests over their RATE_LIMIT_VIEWS limits (see ratelimit.py)
+    with 429 and Retry-After. It runs once the URL is resolved but before
+    the view, so a throttled request costs cache lookups and no database
+    work (the user is taken from the access token without loading it).
+    """
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if not settings.RATE_LIMIT_ENABLED or request.method == 'OPTIONS':
+            return None
+        wait = retry_after(request, request.resolver_match.view_name)
+        if not wait:
+            return None
+        seconds = math.ceil(wait)
+        response = JsonResponse(
+            {'detail': f'Request was throttled. Expected available in {seconds} seconds.'},
+            status=429,
+        )
+        response.headers['Retry-After'] = str(seconds)
+        return response
@@ -0,0 +1,90 @@
+"""
+EXPLAIN helpers for tests: find the tables a query reads with a full
+sequential scan on the current database backend.
+"""
+
+import json
+import re
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+SQLITE_FULL_SCAN = re.compile(r'\bSCAN (?:TABLE )?"?(\w+)"?(?! USING)')
+POSTGRES_FULL_SCAN = re.compile(r'Seq Scan on "?(\w+)"?')
+
+
+def explain(sql):
+    """
+    Query plan of ``sql`` as text
+    """
+    with connection.cursor() as cursor:
+        if connection.vendor == 'sqlite':
+            cursor.execute('EXPLAIN QUERY PLAN ' + sql)
+            return '\n'.join(row[-1] for row in cursor.fetchall())
+        if connection.vendor == 'mysql':
+            cursor.execute('EXPLAIN FORMAT=JSON ' + sql)
+            return cursor.fetchone()[0]
+        cursor.execute('EXPLAIN ' + sql)
+        return '\n'.join(row[0] for row in cursor.fetchall())
+
+
+def full_scans(sql):
+    """
+    Tables read with a sequential scan by ``sql``
+    """
+    plan = explain(sql)
+    if connection.vendor == 'sqlite':
+        return SQLITE_FULL_SCAN.findall(plan)
+    if connection.vendor == 'mysql':
+        return [
+            node['table_name']
+            for node in find_tables(json.loads(plan))
+            if node.get('access_type') == 'ALL'
+        ]
+    return POSTGRES_FULL_SCAN.findall(plan)
+
+
+def find_tables(node):
+    if isinstance(node, dict):
+        if 'table_name' in node:
+            yield node
+        for value in node.values():
+            yield from find_tables(value)
+    elif isinstance(node, list):
+        for value in node:
+            yield from find_tables(value)
+
+
+def analyze():
+    """
+    Refresh planner statistics after seeding, so plans match production
+    """
+    with connection.cursor() as cursor:
+        if connection.vendor == 'mysql':
+            return
+        cursor.execute('ANALYZE')
+
+
+class QueryPlanMixin:
+    """
+    TestCase mixin asserting that a request only reads tables through indexes
+    """
+
+    def assertNoFullScans(self, request, *args, tables=None, counts=False, **kwargs):
+        """
+        Run ``request(*args, **kwargs)`` and check every SELECT it issued.
+        Only ``tables`` are checked if given. COUNT(*) queries are skipped
+        unless ``counts`` is set: counting most of a table is a full pass
+        whatever the indexes.
+        """
+        with CaptureQueriesContext(connection) as queries:
+            response = request(*args, **kwargs)
+        for query in queries.captured_queries:
+            sql = query['sql'].lstrip().upper()
+            if not sql.startswith('SELECT') or (not counts and sql.startswith('SELECT COUNT(*)')):
+                continue
+            scanned = [table for table in full_scans(query['sql']) if tables is None or table in tables]
+            self.assertEqual(
+                scanned, [],
+                f"Sequential scan of {', '.join(scanned)} in:\n{query['sql']}\n\n{explain(query['sql'])}"
+            )
+        return response
@@ -0,0 +1,108 @@
+"""
+Token-bucket rate limiting, applied by RateLimitMiddleware.
+
+RATE_LIMIT_VIEWS maps URL names to endpoint groups and RATE_LIMIT_GROUPS
+configures each group: ``rate`` ("<tokens>/<second|minute|hour|day>") is
+the refill rate, ``burst`` the bucket size (the rate's count by default),
+``key`` whether clients are told apart by "ip" or by "user" (the JWT's
+user id, falling back to the IP for anonymous requests), and an optional
+``param`` only applies the group when that query parameter is present
+(e.g. ?search=). Each client gets one bucket per group.
+
+A bucket is one cache entry, (tokens, updated_at), refilled lazily on
+read. It is not compare-and-set, so concurrent requests of one client can
+spend the same token; the limits are approximate, which is fine for
+shedding abusive traffic. Buckets need a cache shared by all workers
+(the default LocMemCache is per process).
+"""
+
+import math
+import time
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+
+PERIODS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+
+def parse_rate(rate):
+    """
+    "10/min" -> (10, 60)
+    """
+    count, period = rate.split('/')
+    return int(count), PERIODS[period.strip()[0]]
+
+
+class TokenBucket:
+    def __init__(self, rate, burst=None, **options):
+        count, period = parse_rate(rate)
+        self.capacity = burst or count
+        self.refill = count / period  # tokens per second
+        # An entry untouched this long is a full bucket again
+        self.timeout = math.ceil(self.capacity / self.refill)
+
+    def take(self, key, now=None):
+        """
+        Spend a token of bucket ``key``. Returns 0 when one was available,
+        otherwise the seconds until one will be.
+        """
+        now = time.time() if now is None else now
+        tokens, updated_at = cache.get(key) or (self.capacity, now)
+        tokens = min(self.capacity, tokens + (now - updated_at) * self.refill)
+        if tokens < 1:
+            return (1 - tokens) / self.refill
+        cache.set(key, (tokens - 1, now), self.timeout)
+        return 0
+
+
+def client_ip(request):
+    """
+    The client address, taken from X-Forwarded-For when the app runs
+    behind RATE_LIMIT_NUM_PROXIES proxies (each appends the address it saw)
+    """
+    proxies = settings.RATE_LIMIT_NUM_PROXIES
+    forwarded = request.META.get('HTTP_X_FORWARDED_FOR')
+    if proxies and forwarded:
+        addresses = [address.strip() for address in forwarded.split(',')]
+        return addresses[-min(proxies, len(addresses))]
+    return request.META.get('REMOTE_ADDR', '')
+
+
+def token_user_id(request):
+    """
+    The user id of a valid access token, checked without a database query
+    """
+    authentication = JWTAuthentication()
+    header = authentication.get_header(request)
+    raw_token = header and authentication.get_raw_token(header)
+    if not raw_token:
+        return None
+    try:
+        return authentication.get_validated_token(raw_token).get(jwt_settings.USER_ID_CLAIM)
+    except (InvalidToken, TokenError):
+        return None
+
+
+def client_key(request, group, config):
+    if config.get('key') == 'user':
+        user_id = token_user_id(request)
+        if user_id is not None:
+            return f'ratelimit:{group}:user:{user_id}'
+    return f'ratelimit:{group}:ip:{client_ip(request)}'
+
+
+def retry_after(request, url_name):
+    """
+    Spend a token in every group of ``url_name`` that applies to the
+    request. Returns 0 when allowed, otherwise the seconds to wait.
+    """
+    for group in settings.RATE_LIMIT_VIEWS.get(url_name, ()):
+        config = settings.RATE_LIMIT_GROUPS[group]
+        if config.get('param') and config['param'] not in request.GET:
+            continue
+        wait = TokenBucket(**config).take(client_key(request, group, config))
+        if wait:
+            return wait
+    return 0
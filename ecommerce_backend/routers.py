@@ -0,0 +1,33 @@
+"""
+Read-replica routing.
+
+ReadReplicaMiddleware picks a replica for each safe-method request under
+READ_REPLICA_PATH_PREFIXES and stores it in a context variable for the
+duration of the request; ReadReplicaRouter then sends reads of the
+READ_REPLICA_APPS models there. Everything else (writes, other apps such
+as auth and orders, background jobs, the shell) uses the default
+database.
+"""
+
+from contextvars import ContextVar
+from django.conf import settings
+
+read_replica = ContextVar('read_replica', default=None)
+
+
+class ReadReplicaRouter:
+    def db_for_read(self, model, **hints):
+        alias = read_replica.get()
+        if alias is not None and model._meta.app_label in settings.READ_REPLICA_APPS:
+            return alias
+        return None
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same rows as the primary
+        databases = {'default', *settings.DATABASE_REPLICAS}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
@@ -1,7 +1,3 @@
-import cloudinary
-import cloudinary.uploader
-import cloudinary.api
-
 from pathlib import Path
 from datetime import timedelta
 import os
@@ -38,8 +34,8 @@ INSTALLED_APPS = [
     "accounts",
     "products",
     "orders",
-    # Cloudinary
-    "cloudinary",
+    # Cloudinary media storage. The SDK itself is imported on first use (by
+    # the storage backend or migrate_images_to_cloudinary), not at start-up
     "cloudinary_storage",
 ]
 
@@ -53,6 +49,8 @@ CLOUDINARY_STORAGE = {
 MIDDLEWARE = [
     "django.middleware.security.SecurityMiddleware",
     "whitenoise.middleware.WhiteNoiseMiddleware",
+    "ecommerce_backend.middleware.ReadReplicaMiddleware",
+    "ecommerce_backend.middleware.ApiCompressionMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "corsheaders.middleware.CorsMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -60,6 +58,7 @@ MIDDLEWARE = [
     "django.contrib.auth.middleware.AuthenticationMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
+    "ecommerce_backend.middleware.RateLimitMiddleware",
 ]
 
 ROOT_URLCONF = "ecommerce_backend.urls"
@@ -88,7 +87,7 @@ WSGI_APPLICATION = "ecommerce_backend.wsgi.application"
 # =========================
 if os.environ.get("DATABASE_URL"):
     # Render / Production
-    DATABASES = {"default": dj_database_url.config(conn_max_age=600, ssl_require=True)}
+    DATABASES = {"default": dj_database_url.config(ssl_require=True)}
 else:
     # Local (WAMP MySQL)
     DATABASES = {
@@ -106,6 +105,48 @@ else:
         }
     }
 
+# Read replicas (ecommerce_backend/routers.py): comma-separated database URLs.
+# Safe-method catalog requests read from a random replica unless the client
+# wrote something in the last READ_REPLICA_STICKY_SECONDS. Leave unset when
+# running the test suite, except to run ReadReplicaDatabaseTest against a
+# second database, e.g. DATABASE_REPLICA_URLS=sqlite:///replica.sqlite3
+DATABASE_REPLICAS = []
+for index, url in enumerate(filter(None, map(str.strip, os.environ.get("DATABASE_REPLICA_URLS", "").split(",")))):
+    DATABASES[f"replica_{index}"] = dj_database_url.parse(url, ssl_require=not url.startswith("sqlite"))
+    DATABASE_REPLICAS.append(f"replica_{index}")
+
+# Connection reuse. DATABASE_POOL=True switches PostgreSQL databases to
+# Django's native connection pool (psycopg 3 with the pool extra), which
+# replaces persistent connections; everything else keeps its connection
+# open for DATABASE_CONN_MAX_AGE seconds. CONN_HEALTH_CHECKS pings a reused
+# connection before the first query of a request, so one the server timed
+# out is replaced instead of failing the request. Usage per worker:
+# /api/admin/db-connections/
+DATABASE_CONN_MAX_AGE = int(os.environ.get("DATABASE_CONN_MAX_AGE", 600))
+DATABASE_POOL = os.environ.get("DATABASE_POOL", "False") == "True"
+DATABASE_POOL_OPTIONS = {
+    "min_size": int(os.environ.get("DATABASE_POOL_MIN_SIZE", 2)),
+    "max_size": int(os.environ.get("DATABASE_POOL_MAX_SIZE", 10)),
+    # Seconds to wait for a free connection before raising
+    "timeout": float(os.environ.get("DATABASE_POOL_TIMEOUT", 10)),
+    # Close idle connections above min_size, and recycle all of them, before
+    # the server or a proxy drops them
+    "max_idle": float(os.environ.get("DATABASE_POOL_MAX_IDLE", 300)),
+    "max_lifetime": float(os.environ.get("DATABASE_POOL_MAX_LIFETIME", 1800)),
+}
+for database in DATABASES.values():
+    database["CONN_HEALTH_CHECKS"] = True
+    if DATABASE_POOL and database["ENGINE"] == "django.db.backends.postgresql":
+        database["CONN_MAX_AGE"] = 0
+        database.setdefault("OPTIONS", {})["pool"] = dict(DATABASE_POOL_OPTIONS)
+    else:
+        database["CONN_MAX_AGE"] = DATABASE_CONN_MAX_AGE
+
+DATABASE_ROUTERS = ["ecommerce_backend.routers.ReadReplicaRouter"]
+READ_REPLICA_APPS = ["products"]
+READ_REPLICA_PATH_PREFIXES = ["/api/products/"]
+READ_REPLICA_STICKY_SECONDS = int(os.environ.get("READ_REPLICA_STICKY_SECONDS", 10))
+
 
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
@@ -155,21 +196,89 @@ AUTH_USER_MODEL = "accounts.User"
 # REST Framework Configuration
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": (
-        "rest_framework_simplejwt.authentication.JWTAuthentication",
+        # simplejwt plus session revocation (accounts/tokens.py)
+        "accounts.authentication.SessionJWTAuthentication",
     ),
     "DEFAULT_PERMISSION_CLASSES": ("rest_framework.permissions.IsAuthenticated",),
+    # orjson-backed, falls back to stdlib json when orjson is not installed
+    "DEFAULT_RENDERER_CLASSES": (
+        "ecommerce_backend.renderers.FastJSONRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ),
     "DEFAULT_PAGINATION_CLASS": "rest_framework.pagination.PageNumberPagination",
     "PAGE_SIZE": 12,
 }
 
+# API response compression (ecommerce_backend.middleware.ApiCompressionMiddleware)
+API_COMPRESSION_PATH_PREFIX = "/api/"
+API_COMPRESSION_MIN_SIZE = int(os.environ.get("API_COMPRESSION_MIN_SIZE", 1024))
+API_COMPRESSION_BROTLI_QUALITY = int(os.environ.get("API_COMPRESSION_BROTLI_QUALITY", 5))
+# Views whose responses carry tokens, never compressed (BREACH)
+API_COMPRESSION_EXCLUDE_VIEWS = ["register", "login", "logout", "token-refresh", "change-password"]
+
+# Order numbers (orders/order_numbers.py): "snowflake" or "daily".
+# Snowflake worker ids must be unique per running process (0-1023). Under
+# gunicorn they are ORDER_NUMBER_INSTANCE_ID * 32 + the worker's slot, so
+# give each instance its own ORDER_NUMBER_INSTANCE_ID (0-31) when running
+# more than one; ORDER_NUMBER_WORKER_ID pins the id of a single process.
+ORDER_NUMBER_GENERATOR = os.environ.get("ORDER_NUMBER_GENERATOR", "snowflake")
+ORDER_NUMBER_INSTANCE_ID = int(os.environ.get("ORDER_NUMBER_INSTANCE_ID", 0))
+ORDER_NUMBER_WORKER_ID = os.environ.get("ORDER_NUMBER_WORKER_ID")
+
+# Cart stock holds (orders/reservations.py); expire_reservations reaps them
+CART_RESERVATION_TTL = timedelta(minutes=int(os.environ.get("CART_RESERVATION_TTL_MINUTES", 15)))
+
+# Idempotency-Key responses are kept this long (purge_idempotency_keys)
+IDEMPOTENCY_KEY_TTL = timedelta(hours=int(os.environ.get("IDEMPOTENCY_KEY_TTL_HOURS", 24)))
+
+# Registration password hashing (accounts/hashing.py): pool threads per
+# process, how many more may queue before registrations get 503, and the
+# longest a registration waits for its hash
+PASSWORD_HASH_WORKERS = int(os.environ.get("PASSWORD_HASH_WORKERS", 2))
+PASSWORD_HASH_BACKLOG = int(os.environ.get("PASSWORD_HASH_BACKLOG", 8))
+PASSWORD_HASH_TIMEOUT = int(os.environ.get("PASSWORD_HASH_TIMEOUT_SECONDS", 10))
+
+# Rate limits (ecommerce_backend/ratelimit.py): views by URL name, grouped
+# into token buckets per client. Buckets live in the default cache. No
+# CACHES is configured, so that is a LocMemCache per process and every
+# gunicorn worker keeps its own buckets: a client effectively gets the
+# rates below times the gunicorn worker count (gunicorn.conf.py). Configure
+# a shared cache (e.g. Redis) for the limits to hold across workers.
+RATE_LIMIT_ENABLED = os.environ.get("RATE_LIMIT_ENABLED", "True") == "True"
+# Proxies in front of the app that append to X-Forwarded-For (1 on Render)
+RATE_LIMIT_NUM_PROXIES = int(os.environ.get("RATE_LIMIT_NUM_PROXIES", 0))
+RATE_LIMIT_GROUPS = {
+    "auth": {"rate": "10/minute", "key": "ip"},
+    "reviews": {"rate": "20/hour", "burst": 5, "key": "user"},
+    "cart": {"rate": "120/minute", "burst": 30, "key": "user"},
+    "catalog": {"rate": "300/minute", "burst": 60, "key": "user"},
+    # Searches are the expensive catalog reads, so they get a bucket of their own
+    "search": {"rate": "30/minute", "burst": 10, "key": "user", "param": "search"},
+}
+RATE_LIMIT_VIEWS = {
+    "register": ["auth"],
+    "login": ["auth"],
+    "token-refresh": ["auth"],
+    "create-review": ["reviews"],
+    "add-to-cart": ["cart"],
+    "category-list": ["catalog"],
+    "product-list": ["search", "catalog"],
+    "product-detail": ["catalog"],
+    "product-reviews": ["catalog"],
+    "product-recommendations": ["catalog"],
+    "product-rankings": ["catalog"],
+}
+
 # JWT Settings
 SIMPLE_JWT = {
     "ACCESS_TOKEN_LIFETIME": timedelta(days=1),
     "REFRESH_TOKEN_LIFETIME": timedelta(days=7),
-    "ROTATE_REFRESH_TOKENS": True,
-    "BLACKLIST_AFTER_ROTATION": True,
     "AUTH_HEADER_TYPES": ("Bearer",),
 }
+# Refresh rotation and revocation are done by accounts/tokens.py sessions
+# rather than the token_blacklist app. Revoked session ids are cached this
+# long per worker when the cache is not shared.
+REVOKED_SESSIONS_CACHE_SECONDS = int(os.environ.get("REVOKED_SESSIONS_CACHE_SECONDS", 60))
 
 # CORS Settings
 CORS_ALLOWED_ORIGINS = [
@@ -198,4 +307,10 @@ CORS_ALLOW_HEADERS = [
     "user-agent",
     "x-csrftoken",
     "x-requested-with",
+    "idempotency-key",
+]
+
+CORS_EXPOSE_HEADERS = [
+    "idempotent-replayed",
+    "retry-after",
 ]
@@ -0,0 +1,15 @@
+from rest_framework import status
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import IsAdminUser
+from rest_framework.response import Response
+from .db import connection_metrics
+
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def db_connections_view(request):
+    """
+    Requests served and database connects of this worker process, per
+    alias, with pool statistics where pooling is on (Admin only)
+    """
+    return Response(connection_metrics.snapshot(), status=status.HTTP_200_OK)
@@ -0,0 +1,85 @@
+"""
+Gunicorn settings, sized from the CPUs and memory the container actually
+gets. Every value can be overridden from the environment.
+
+Workers are gthread workers: each serves GUNICORN_THREADS requests at a
+time, so a worker waiting on the database or Cloudinary does not block the
+others, at the memory cost of one process. The worker count is the usual
+2 x CPUs + 1, capped by how many GUNICORN_WORKER_MEMORY_MB sized workers
+fit in memory. With DATABASE_POOL on, keep DATABASE_POOL_MAX_SIZE at or
+above GUNICORN_THREADS.
+"""
+
+import itertools
+import multiprocessing
+import os
+
+
+def cpu_count():
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return multiprocessing.cpu_count()
+
+
+def memory_limit_mb():
+    """
+    The cgroup (v2, then v1) memory limit, else the machine's memory
+    """
+    for path in ("/sys/fs/cgroup/memory.max", "/sys/fs/cgroup/memory/memory.limit_in_bytes"):
+        try:
+            with open(path) as limit:
+                value = limit.read().strip()
+        except OSError:
+            continue
+        # "max", or v1's huge number, means no limit
+        if value.isdigit() and int(value) < 1 << 60:
+            return int(value) // (1024 * 1024)
+    return os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES") // (1024 * 1024)
+
+
+worker_memory_mb = int(os.environ.get("GUNICORN_WORKER_MEMORY_MB", 150))
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '8000')}"
+worker_class = "gthread"
+workers = int(
+    os.environ.get("WEB_CONCURRENCY")
+    or max(1, min(2 * cpu_count() + 1, memory_limit_mb() // worker_memory_mb))
+)
+threads = int(os.environ.get("GUNICORN_THREADS", 4))
+
+# Import Django once in the master and fork the workers from it: workers
+# start faster and share the imported code pages
+preload_app = os.environ.get("GUNICORN_PRELOAD", "True") == "True"
+
+# Recycle workers to cap slow memory growth; the jitter keeps them from all
+# restarting at the same moment
+max_requests = int(os.environ.get("GUNICORN_MAX_REQUESTS", 1000))
+max_requests_jitter = int(os.environ.get("GUNICORN_MAX_REQUESTS_JITTER", max_requests // 10))
+
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", 30))
+graceful_timeout = int(os.environ.get("GUNICORN_GRACEFUL_TIMEOUT", 30))
+keepalive = int(os.environ.get("GUNICORN_KEEPALIVE", 5))
+
+accesslog = "-"
+errorlog = "-"
+
+
+def pre_fork(server, worker):
+    # The lowest slot no live worker holds; ORDER_NUMBER_INSTANCE_ID and the
+    # slot make the worker's order number id (orders/order_numbers.py)
+    taken = {getattr(live, "slot", None) for live in server.WORKERS.values()}
+    worker.slot = next(slot for slot in itertools.count() if slot not in taken)
+
+
+def post_fork(server, worker):
+    os.environ["GUNICORN_WORKER_SLOT"] = str(worker.slot)
+
+
+def when_ready(server):
+    if preload_app:
+        # Django loads the URLconf, and with it every view, serializer and
+        # model module, on the first request; do it before forking instead
+        from django.urls import get_resolver
+
+        get_resolver().url_patterns
+    server.log.info("Serving with %s %s workers x %s threads", workers, worker_class, threads)
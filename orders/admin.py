@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Cart, Order, OrderItem
+from .models import Cart, Order, OrderItem, OrderStatusEvent
 
 @admin.register(Cart)
 class CartAdmin(admin.ModelAdmin):
@@ -41,4 +41,11 @@ class OrderAdmin(admin.ModelAdmin):
 class OrderItemAdmin(admin.ModelAdmin):
     list_display = ['order', 'product_name', 'product_price', 'quantity', 'subtotal']
     list_filter = ['order__created_at']
-    search_fields = ['order__order_number', 'product_name']
\ No newline at end of file
+    search_fields = ['order__order_number', 'product_name']
+
+@admin.register(OrderStatusEvent)
+class OrderStatusEventAdmin(admin.ModelAdmin):
+    list_display = ['order', 'from_status', 'to_status', 'changed_by', 'created_at']
+    list_filter = ['to_status', 'created_at']
+    search_fields = ['order__order_number']
+    readonly_fields = ['order', 'from_status', 'to_status', 'changed_by', 'created_at']
@@ -0,0 +1,106 @@
+from products.fast_serializers import (
+    ValuesSerializer, Column, Computed, Nested, FastProductListSerializer,
+    price_field, datetime_field,
+)
+from .models import Order, OrderItem
+
+PAYMENT_STATUS_DISPLAY = dict(Order.PAYMENT_STATUS)
+PAYMENT_METHOD_DISPLAY = dict(Order.PAYMENT_METHOD)
+ORDER_STATUS_DISPLAY = dict(Order.ORDER_STATUS)
+
+
+def choice_display(choices):
+    def display(value):
+        return str(choices.get(value, value))
+    return display
+
+
+def no_items(order_id):
+    # Filled in by FastOrderSerializer.data with one query for the whole page
+    return []
+
+
+def cart_subtotal(price, quantity):
+    return price_field.to_representation(price * quantity)
+
+
+class FastCartSerializer(ValuesSerializer):
+    """
+    Fast equivalent of CartSerializer
+    """
+
+    fields = [
+        ('id', Column('id')),
+        ('user', Column('user_id')),
+        ('product', Column('product_id')),
+        ('product_details', Nested(FastProductListSerializer, 'product')),
+        ('variant', Column('variant_id')),
+        ('size', Column('variant__size')),
+        ('color', Column('variant__color')),
+        ('quantity', Column('quantity')),
+        ('subtotal', Computed(cart_subtotal, 'product__price', 'quantity')),
+        ('created_at', Column('created_at', datetime_field.to_representation)),
+        ('updated_at', Column('updated_at', datetime_field.to_representation)),
+    ]
+
+
+class FastOrderItemSerializer(ValuesSerializer):
+    """
+    Fast equivalent of OrderItemSerializer
+    """
+
+    fields = [
+        ('id', Column('id')),
+        ('product', Column('product_id')),
+        ('variant', Column('variant_id')),
+        ('product_name', Column('product_name')),
+        ('size', Column('size')),
+        ('color', Column('color')),
+        ('product_price', Column('product_price', price_field.to_representation)),
+        ('quantity', Column('quantity')),
+        ('subtotal', Column('subtotal', price_field.to_representation)),
+    ]
+
+
+class FastOrderSerializer(ValuesSerializer):
+    """
+    Fast equivalent of OrderSerializer; the nested items of every order on
+    the page are loaded with a single extra query.
+    """
+
+    fields = [
+        ('id', Column('id')),
+        ('order_number', Column('order_number')),
+        ('user', Column('user_id')),
+        ('full_name', Column('full_name')),
+        ('email', Column('email')),
+        ('phone', Column('phone')),
+        ('address', Column('address')),
+        ('city', Column('city')),
+        ('state', Column('state')),
+        ('pincode', Column('pincode')),
+        ('total_amount', Column('total_amount', price_field.to_representation)),
+        ('payment_method', Column('payment_method')),
+        ('payment_method_display', Computed(choice_display(PAYMENT_METHOD_DISPLAY), 'payment_method')),
+        ('payment_status', Column('payment_status')),
+        ('payment_status_display', Computed(choice_display(PAYMENT_STATUS_DISPLAY), 'payment_status')),
+        ('order_status', Column('order_status')),
+        ('order_status_display', Computed(choice_display(ORDER_STATUS_DISPLAY), 'order_status')),
+        ('transaction_id', Column('transaction_id')),
+        ('items', Computed(no_items, 'id')),
+        ('created_at', Column('created_at', datetime_field.to_representation)),
+        ('updated_at', Column('updated_at', datetime_field.to_representation)),
+    ]
+
+    @property
+    def data(self):
+        data = super().data
+        orders = {order['id']: order for order in data}
+        item_rows = (
+            OrderItem.objects.filter(order_id__in=list(orders))
+            .order_by('pk')
+            .values('order_id', *FastOrderItemSerializer.lookups)
+        )
+        for row in item_rows:
+            orders[row['order_id']]['items'].append(FastOrderItemSerializer.render(row))
+        return data
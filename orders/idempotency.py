@@ -0,0 +1,122 @@
+import hashlib
+import json
+from datetime import timedelta
+from functools import wraps
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
+from .models import IdempotencyKey
+
+IDEMPOTENCY_HEADER = 'Idempotency-Key'
+REPLAYED_HEADER = 'Idempotent-Replayed'
+MAX_KEY_LENGTH = 255
+# A claim still without a response after this long belongs to a request
+# whose worker died or timed out; a retry of the same request takes it over
+IN_FLIGHT_LEASE = timedelta(seconds=30)
+
+
+def request_fingerprint(request):
+    """
+    Hash of what the client asked for, so a key cannot be reused for a
+    different request
+    """
+    body = json.dumps(request.data, sort_keys=True, default=str)
+    payload = f'{request.method}\n{request.path}\n{body}'
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def idempotent(view):
+    """
+    Make a mutating function view safe to retry.
+
+    When the request carries an Idempotency-Key header, the first request
+    claims the key and its response is stored; a retry with the same key and
+    body gets the stored response back without running the view again (so
+    stock is never touched twice). Requests without the header run as usual.
+    Keys expire after IDEMPOTENCY_KEY_TTL, and an in-flight claim older
+    than IN_FLIGHT_LEASE is taken over by the next retry (see claim()).
+    Must be applied below @api_view so the user is authenticated.
+    """
+
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        key = request.headers.get(IDEMPOTENCY_HEADER)
+        if not key:
+            return view(request, *args, **kwargs)
+        if len(key) > MAX_KEY_LENGTH:
+            return Response({
+                'error': f'{IDEMPOTENCY_HEADER} must be at most {MAX_KEY_LENGTH} characters'
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        fingerprint = request_fingerprint(request)
+        record = claim(request, key, fingerprint)
+        if record is None:
+            return replay(request, key, fingerprint)
+
+        try:
+            response = view(request, *args, **kwargs)
+        except Exception:
+            record.delete()
+            raise
+
+        if response.status_code >= 500:
+            # Let the client retry a server error for real
+            record.delete()
+            return response
+
+        record.status_code = response.status_code
+        record.response_body = json.loads(JSONRenderer().render(response.data) or 'null')
+        record.save(update_fields=['status_code', 'response_body'])
+        return response
+
+    return wrapper
+
+
+def claim(request, key, fingerprint):
+    """
+    Claim ``key`` for this request; returns the claimed record, or None when
+    another request holds it.
+
+    A held key is taken over when it is past IDEMPOTENCY_KEY_TTL (whatever
+    it stored), or still in flight past IN_FLIGHT_LEASE for the same
+    request. The takeover is one conditional UPDATE that also moves
+    created_at, so of several concurrent retries only one wins.
+    """
+    try:
+        # Own (auto-committed) transaction so concurrent retries see the claim
+        with transaction.atomic():
+            return IdempotencyKey.objects.create(
+                user=request.user, key=key, request_fingerprint=fingerprint
+            )
+    except IntegrityError:
+        pass
+
+    now = timezone.now()
+    takeover = Q(created_at__lt=now - settings.IDEMPOTENCY_KEY_TTL) | Q(
+        status_code__isnull=True, request_fingerprint=fingerprint, created_at__lt=now - IN_FLIGHT_LEASE,
+    )
+    records = IdempotencyKey.objects.filter(user=request.user, key=key)
+    taken = records.filter(takeover).update(
+        request_fingerprint=fingerprint, status_code=None, response_body=None, created_at=now,
+    )
+    return records.first() if taken else None
+
+
+def replay(request, key, fingerprint):
+    record = IdempotencyKey.objects.filter(user=request.user, key=key).first()
+    if record is None or record.created_at < timezone.now() - settings.IDEMPOTENCY_KEY_TTL:
+        # Purged or expired between the claim attempt and now
+        return Response({'error': 'Idempotency key expired, please retry'}, status=status.HTTP_409_CONFLICT)
+    if record.request_fingerprint != fingerprint:
+        return Response({
+            'error': f'{IDEMPOTENCY_HEADER} was already used for a different request'
+        }, status=status.HTTP_422_UNPROCESSABLE_ENTITY)
+    if record.status_code is None:
+        return Response({
+            'error': 'A request with this Idempotency-Key is still being processed'
+        }, status=status.HTTP_409_CONFLICT, headers={'Retry-After': '1'})
+    return Response(record.response_body, status=record.status_code, headers={REPLAYED_HEADER: 'true'})
@@ -0,0 +1,95 @@
+from decimal import Decimal
+from timeit import timeit
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import F
+from rest_framework.renderers import JSONRenderer
+from products.models import Category, Product, ProductListing, ProductVariant
+from products.serializers import ProductListingSerializer, ProductListSerializer
+from products.fast_serializers import FastProductListingSerializer, FastProductListSerializer
+from orders.models import Cart, Order, OrderItem
+from orders.serializers import CartSerializer, OrderSerializer
+from orders.fast_serializers import FastCartSerializer, FastOrderSerializer
+
+User = get_user_model()
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = "Compare ModelSerializer and fast serializer render times on seeded rows (rolled back afterwards)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=100)
+        parser.add_argument("--repeat", type=int, default=20)
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                self.run(options["rows"], options["repeat"])
+                raise Rollback
+        except Rollback:
+            pass
+
+    def seed(self, rows):
+        user = User.objects.create_user("benchmark", "benchmark@example.com", "benchmark-pass")
+        category, _ = Category.objects.get_or_create(name="daily")
+        products = [
+            Product.objects.create(
+                name=f"Benchmark {i}", description="Benchmark product", price=Decimal("999.00"),
+                category=category, material="Cotton",
+                brand="Bench", image="https://img.example.com/bench.jpg",
+            )
+            for i in range(rows)
+        ]
+        variants = [
+            ProductVariant.objects.create(product=product, size="M", color="Black", stock=10)
+            for product in products
+        ]
+        Cart.objects.bulk_create([
+            Cart(user=user, product=variant.product, variant=variant, quantity=1) for variant in variants
+        ])
+        for i in range(rows):
+            order = Order.objects.create(
+                user=user, full_name="Bench", email="benchmark@example.com", phone="9999999999",
+                address="1 Main Road", city="Chennai", state="Tamil Nadu", pincode="600001",
+                total_amount=Decimal("1998.00"), payment_method="cod",
+            )
+            OrderItem.objects.bulk_create([
+                OrderItem(order=order, product=variant.product, variant=variant,
+                          product_name=variant.product.name, size=variant.size, color=variant.color,
+                          product_price=variant.product.price, quantity=1, subtotal=variant.product.price)
+                for variant in variants[i % rows:i % rows + 2]
+            ])
+        return user
+
+    def run(self, rows, repeat):
+        user = self.seed(rows)
+        renderer = JSONRenderer()
+        cases = [
+            ("products", Product.objects.filter(name__startswith="Benchmark"),
+             lambda qs: ProductListSerializer(qs, many=True).data, lambda qs: FastProductListSerializer(qs).data),
+            # ProductListView: a page of product_listings rows fetched once
+            ("listings", list(
+                ProductListing.objects.filter(name__startswith="Benchmark")
+                .values(*ProductListingSerializer.VALUES_FIELDS, id=F("product_id"))
+             ),
+             lambda rows: ProductListingSerializer(rows, many=True).data,
+             lambda rows: FastProductListingSerializer(rows).data),
+            ("cart", Cart.objects.filter(user=user),
+             lambda qs: CartSerializer(qs, many=True).data, lambda qs: FastCartSerializer(qs).data),
+            ("orders", Order.objects.filter(user=user).prefetch_related("items"),
+             lambda qs: OrderSerializer(qs, many=True).data, lambda qs: FastOrderSerializer(qs).data),
+        ]
+        for name, queryset, slow, fast in cases:
+            # Querysets are re-run on every repeat; fetched rows are reused
+            fresh = queryset.all if hasattr(queryset, "all") else lambda: queryset
+            slow_time = timeit(lambda: renderer.render(slow(fresh())), number=repeat) / repeat
+            fast_time = timeit(lambda: renderer.render(fast(fresh())), number=repeat) / repeat
+            self.stdout.write(
+                f"{name:<10} {rows} rows  serializer {slow_time * 1000:8.2f} ms"
+                f"  fast {fast_time * 1000:8.2f} ms  speedup {slow_time / fast_time:5.1f}x"
+            )
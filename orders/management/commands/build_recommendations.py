@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+from orders.recommendations import rebuild
+
+
+class Command(BaseCommand):
+    help = "Rebuild the product co-occurrence matrix and top-K recommendations from orders and favorites"
+
+    def handle(self, *args, **options):
+        pairs = rebuild()
+        self.stdout.write(self.style.SUCCESS(f"Ranked recommendations from {pairs} product pairs"))
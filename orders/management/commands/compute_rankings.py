@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+from orders.rankings import SCORES, compute
+
+
+class Command(BaseCommand):
+    help = "Recompute the best-seller, trending and top-rated product rankings"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--kind", choices=sorted(SCORES), action="append", help="Only these rankings (repeatable)")
+
+    def handle(self, *args, **options):
+        for kind in options["kind"] or SCORES:
+            rows = compute(kind)
+            self.stdout.write(self.style.SUCCESS(f"Ranked {kind}: {rows} rows"))
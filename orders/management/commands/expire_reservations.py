@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from ecommerce_backend.db import delete_in_batches
+from orders.models import StockReservation
+
+
+class Command(BaseCommand):
+    help = "Delete expired cart stock reservations in batches"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        expired = StockReservation.objects.filter(expires_at__lte=timezone.now())
+        deleted = delete_in_batches(expired, options["batch_size"])
+        self.stdout.write(self.style.SUCCESS(f"Expired {deleted} stock reservations"))
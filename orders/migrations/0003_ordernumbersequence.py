@@ -0,0 +1,23 @@
+# Generated by Django 6.0 on 2026-10-19 06:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("orders", "0002_orderstatusevent"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="OrderNumberSequence",
+            fields=[
+                ("day", models.DateField(primary_key=True, serialize=False)),
+                ("last_value", models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                "db_table": "order_number_sequences",
+            },
+        ),
+    ]
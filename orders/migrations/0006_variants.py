@@ -0,0 +1,57 @@
+# Generated by Django 6.0 on 2026-10-19 06:39
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("orders", "0005_stockreservation"),
+        ("products", "0009_product_variants"),
+    ]
+
+    operations = [
+        migrations.AlterUniqueTogether(
+            name="cart",
+            unique_together=set(),
+        ),
+        migrations.AddField(
+            model_name="cart",
+            name="variant",
+            field=models.ForeignKey(
+                null=True,
+                on_delete=django.db.models.deletion.CASCADE,
+                to="products.productvariant",
+            ),
+        ),
+        migrations.AddField(
+            model_name="orderitem",
+            name="color",
+            field=models.CharField(blank=True, default="", max_length=50),
+        ),
+        migrations.AddField(
+            model_name="orderitem",
+            name="size",
+            field=models.CharField(blank=True, default="", max_length=10),
+        ),
+        migrations.AddField(
+            model_name="orderitem",
+            name="variant",
+            field=models.ForeignKey(
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                to="products.productvariant",
+            ),
+        ),
+        migrations.AddField(
+            model_name="stockreservation",
+            name="variant",
+            field=models.ForeignKey(
+                null=True,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="reservations",
+                to="products.productvariant",
+            ),
+        ),
+    ]
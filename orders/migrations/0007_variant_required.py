@@ -0,0 +1,52 @@
+# Generated by Django 6.0 on 2026-10-19 06:40
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("orders", "0006_variants"),
+        ("products", "0011_remove_product_size_color"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name="stockreservation",
+            name="reservations_product_idx",
+        ),
+        migrations.RemoveField(
+            model_name="stockreservation",
+            name="product",
+        ),
+        migrations.AlterField(
+            model_name="cart",
+            name="variant",
+            field=models.ForeignKey(
+                on_delete=django.db.models.deletion.CASCADE,
+                to="products.productvariant",
+            ),
+        ),
+        migrations.AlterField(
+            model_name="stockreservation",
+            name="variant",
+            field=models.ForeignKey(
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="reservations",
+                to="products.productvariant",
+            ),
+        ),
+        migrations.AlterUniqueTogether(
+            name="cart",
+            unique_together={("user", "variant")},
+        ),
+        migrations.AddIndex(
+            model_name="stockreservation",
+            index=models.Index(
+                fields=["variant", "expires_at"], name="reservations_variant_idx"
+            ),
+        ),
+    ]
@@ -1,19 +1,23 @@
-from django.db import models
+from django.db import IntegrityError, models, transaction
+from django.utils import timezone
 from django.contrib.auth import get_user_model
-from products.models import Product
+from products.models import Product, ProductVariant
+from .order_numbers import generate_order_number
 
 User = get_user_model()
 
 class Cart(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='cart_items')
+    # The variant's product, kept for the price and list-card joins
     product = models.ForeignKey(Product, on_delete=models.CASCADE)
+    variant = models.ForeignKey(ProductVariant, on_delete=models.CASCADE)
     quantity = models.PositiveIntegerField(default=1)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
     class Meta:
         db_table = 'cart'
-        unique_together = ['user', 'product']
+        unique_together = ['user', 'variant']
     
     def __str__(self):
         return f"{self.user.username} - {self.product.name} x {self.quantity}"
@@ -22,6 +26,31 @@ class Cart(models.Model):
     def subtotal(self):
         return self.product.price * self.quantity
 
+class StockReservation(models.Model):
+    """
+    Time-limited hold on stock for a cart item. Available stock is
+    ``variant.stock`` minus the active holds (see reservations.py); expired
+    holds are deleted by the expire_reservations command.
+    """
+    cart = models.OneToOneField(Cart, on_delete=models.CASCADE, related_name='reservation')
+    variant = models.ForeignKey(ProductVariant, on_delete=models.CASCADE, related_name='reservations')
+    quantity = models.PositiveIntegerField()
+    expires_at = models.DateTimeField()
+    
+    class Meta:
+        db_table = 'stock_reservations'
+        indexes = [
+            models.Index(fields=['variant', 'expires_at'], name='reservations_variant_idx'),
+            models.Index(fields=['expires_at'], name='reservations_expires_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.variant_id} x {self.quantity} until {self.expires_at}"
+    
+    @property
+    def is_active(self):
+        return self.expires_at > timezone.now()
+
 class Order(models.Model):
     PAYMENT_STATUS = [
         ('pending', 'Pending'),
@@ -71,20 +100,71 @@ class Order(models.Model):
     class Meta:
         db_table = 'orders'
         ordering = ['-created_at']
+        indexes = [
+            # Recent-orders window of the trending ranking and admin lists
+            models.Index(fields=['created_at'], name='orders_created_idx'),
+        ]
     
     def __str__(self):
         return f"Order #{self.order_number} - {self.user.username}"
     
     def save(self, *args, **kwargs):
-        if not self.order_number:
-            import uuid
-            self.order_number = f"ORD-{uuid.uuid4().hex[:10].upper()}"
-        super().save(*args, **kwargs)
+        if self.order_number:
+            return super().save(*args, **kwargs)
+        self.order_number = generate_order_number()
+        try:
+            with transaction.atomic():
+                return super().save(*args, **kwargs)
+        except IntegrityError:
+            # Another process issued the same number (duplicate worker id);
+            # the next one from this generator differs
+            if not Order.objects.filter(order_number=self.order_number).exists():
+                raise
+        self.order_number = generate_order_number()
+        return super().save(*args, **kwargs)
+
+class OrderNumberSequence(models.Model):
+    """
+    Per-day counter used by the ``daily`` order number generator
+    """
+    day = models.DateField(primary_key=True)
+    last_value = models.PositiveIntegerField(default=0)
+    
+    class Meta:
+        db_table = 'order_number_sequences'
+    
+    def __str__(self):
+        return f"{self.day}: {self.last_value}"
+
+class IdempotencyKey(models.Model):
+    """
+    Response stored for a client supplied Idempotency-Key, replayed when the
+    same request is retried (see idempotency.py). Purged after
+    IDEMPOTENCY_KEY_TTL by the purge_idempotency_keys command.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='idempotency_keys')
+    key = models.CharField(max_length=255)
+    request_fingerprint = models.CharField(max_length=64)
+    # Null while the first request is still being processed
+    status_code = models.PositiveSmallIntegerField(null=True, blank=True)
+    response_body = models.JSONField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+    
+    class Meta:
+        db_table = 'idempotency_keys'
+        unique_together = ['user', 'key']
+    
+    def __str__(self):
+        return f"{self.user_id}: {self.key}"
 
 class OrderItem(models.Model):
     order = models.ForeignKey(Order, on_delete=models.CASCADE, related_name='items')
     product = models.ForeignKey(Product, on_delete=models.SET_NULL, null=True)
+    variant = models.ForeignKey(ProductVariant, on_delete=models.SET_NULL, null=True)
     product_name = models.CharField(max_length=255)
+    # Snapshot of the variant bought, like product_name
+    size = models.CharField(max_length=10, blank=True, default='')
+    color = models.CharField(max_length=50, blank=True, default='')
     product_price = models.DecimalField(max_digits=10, decimal_places=2)
     quantity = models.PositiveIntegerField()
     subtotal = models.DecimalField(max_digits=10, decimal_places=2)
@@ -93,4 +173,21 @@ class OrderItem(models.Model):
         db_table = 'order_items'
     
     def __str__(self):
-        return f"{self.order.order_number} - {self.product_name} x {self.quantity}"
\ No newline at end of file
+        return f"{self.order.order_number} - {self.product_name} x {self.quantity}"
+
+class OrderStatusEvent(models.Model):
+    """
+    Append-only audit log of order status transitions (see state_machine.py)
+    """
+    order = models.ForeignKey(Order, on_delete=models.CASCADE, related_name='status_events')
+    from_status = models.CharField(max_length=20, choices=Order.ORDER_STATUS)
+    to_status = models.CharField(max_length=20, choices=Order.ORDER_STATUS)
+    changed_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        db_table = 'order_status_events'
+        ordering = ['id']
+    
+    def __str__(self):
+        return f"{self.order_id}: {self.from_status} -> {self.to_status}"
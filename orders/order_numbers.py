@@ -0,0 +1,161 @@
+"""
+Order number generation.
+
+Two time-ordered, collision-free schemes, picked with the
+ORDER_NUMBER_GENERATOR setting:
+
+``snowflake`` (default)
+    ORD-<13 base36 chars> built from a 63-bit Snowflake-style id:
+    41 bits of milliseconds since 2025-01-01 UTC, 10 bits of worker id
+    and a 12-bit per-ms sequence. No database round trip; numbers sort by
+    creation time, so the unique index on order_number only ever appends.
+    Numbers are only unique if worker ids are, see default_worker_id();
+    Order.save() retries once should two processes still collide.
+
+``daily``
+    ORD-YYYYMMDD-000001 from a per-day counter row in the database. Human
+    friendly, but the counter row stays locked until the order transaction
+    commits, which serializes concurrent checkouts.
+"""
+
+import os
+import socket
+import threading
+import time
+import zlib
+from datetime import datetime, timezone as dt_timezone
+from django.apps import apps
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+
+BASE36 = '0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ'
+
+WORKER_BITS = 10
+SEQUENCE_BITS = 12
+MAX_WORKER_ID = (1 << WORKER_BITS) - 1
+MAX_SEQUENCE = (1 << SEQUENCE_BITS) - 1
+
+# Worker ids per instance: 32 instances of up to 32 gunicorn workers
+WORKER_SLOTS = 32
+
+# 63-bit ids need at most 13 base36 digits; padding keeps string order = id order
+SNOWFLAKE_WIDTH = 13
+
+DEFAULT_EPOCH = datetime(2025, 1, 1, tzinfo=dt_timezone.utc)
+
+
+def to_base36(value, width):
+    digits = []
+    while value:
+        value, remainder = divmod(value, 36)
+        digits.append(BASE36[remainder])
+    return ''.join(reversed(digits)).rjust(width, '0')
+
+
+def default_worker_id():
+    """
+    ORDER_NUMBER_WORKER_ID when set. Under gunicorn, the instance's
+    ORDER_NUMBER_INSTANCE_ID combined with the worker's slot, which the
+    master hands out so no two live workers share one (gunicorn.conf.py).
+    Elsewhere (runserver, management commands) a hash of host and pid,
+    which is not guaranteed unique.
+    """
+    worker_id = getattr(settings, 'ORDER_NUMBER_WORKER_ID', None)
+    if worker_id is not None:
+        return int(worker_id)
+    slot = os.environ.get('GUNICORN_WORKER_SLOT')
+    if slot is not None:
+        instance_id = int(getattr(settings, 'ORDER_NUMBER_INSTANCE_ID', 0))
+        if not 0 <= int(slot) < WORKER_SLOTS:
+            raise ValueError(f'At most {WORKER_SLOTS} gunicorn workers get unique order number worker ids')
+        return instance_id * WORKER_SLOTS + int(slot)
+    return zlib.crc32(f'{socket.gethostname()}:{os.getpid()}'.encode()) & MAX_WORKER_ID
+
+
+class SnowflakeGenerator:
+    """
+    Thread-safe generator of time-ordered 63-bit ids
+    """
+
+    def __init__(self, worker_id, epoch=DEFAULT_EPOCH, clock=time.time):
+        if not 0 <= worker_id <= MAX_WORKER_ID:
+            raise ValueError(f'worker_id must be between 0 and {MAX_WORKER_ID}')
+        self.worker_id = worker_id
+        self.epoch_ms = int(epoch.timestamp() * 1000)
+        self.clock = clock
+        self.lock = threading.Lock()
+        self.last_ms = -1
+        self.sequence = 0
+
+    def now_ms(self):
+        return int(self.clock() * 1000) - self.epoch_ms
+
+    def next_id(self):
+        with self.lock:
+            now = self.now_ms()
+            # Never go back in time, even if the wall clock does
+            if now <= self.last_ms:
+                now = self.last_ms
+                self.sequence = (self.sequence + 1) & MAX_SEQUENCE
+                if self.sequence == 0:
+                    # 4096 ids this millisecond already; borrow the next one
+                    now = self.last_ms + 1
+            else:
+                self.sequence = 0
+            self.last_ms = now
+            return (now << (WORKER_BITS + SEQUENCE_BITS)) | (self.worker_id << SEQUENCE_BITS) | self.sequence
+
+    def __call__(self):
+        return f'ORD-{to_base36(self.next_id(), SNOWFLAKE_WIDTH)}'
+
+
+class DailySequenceGenerator:
+    """
+    ORD-YYYYMMDD-NNNNNN numbers from the OrderNumberSequence table
+    """
+
+    def next_value(self, day):
+        Sequence = apps.get_model('orders', 'OrderNumberSequence')
+        with transaction.atomic():
+            if not Sequence.objects.filter(day=day).update(last_value=F('last_value') + 1):
+                try:
+                    with transaction.atomic():
+                        Sequence.objects.create(day=day, last_value=1)
+                        return 1
+                except IntegrityError:
+                    # Another process created today's row first
+                    Sequence.objects.filter(day=day).update(last_value=F('last_value') + 1)
+            # The UPDATE holds the row lock, so this read sees our own increment
+            return Sequence.objects.filter(day=day).values_list('last_value', flat=True).get()
+
+    def __call__(self):
+        day = timezone.localdate()
+        return f'ORD-{day:%Y%m%d}-{self.next_value(day):06d}'
+
+
+GENERATORS = {
+    'snowflake': lambda: SnowflakeGenerator(default_worker_id()),
+    'daily': DailySequenceGenerator,
+}
+
+_generator = None
+_generator_lock = threading.Lock()
+
+
+def get_generator():
+    global _generator
+    if _generator is None:
+        with _generator_lock:
+            if _generator is None:
+                name = getattr(settings, 'ORDER_NUMBER_GENERATOR', 'snowflake')
+                try:
+                    _generator = GENERATORS[name]()
+                except KeyError:
+                    raise ValueError(f'Unknown ORDER_NUMBER_GENERATOR {name!r}') from None
+    return _generator
+
+
+def generate_order_number():
+    return get_generator()()
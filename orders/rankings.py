@@ -0,0 +1,108 @@
+"""
+Best-seller, trending and top-rated rankings.
+
+Each kind is scored and ranked in a single SELECT over the active
+products: the score is a per-product expression (or correlated subquery),
+and two ROW_NUMBER() windows rank it overall and within the category, so
+the TOP_N of every list comes back in one pass. The rows then replace
+that kind's ProductRanking rows; their new computed_at moves the cached
+ranking responses to a new key (ProductRanking.cache_key).
+
+- best_sellers: units sold (Product.sold)
+- trending: units ordered over the last TRENDING_WINDOW_DAYS, each day's
+  orders weighted by half every TRENDING_HALF_LIFE_DAYS
+- top_rated: Bayesian average rating, i.e. the product's reviews plus
+  RATING_PRIOR_WEIGHT virtual reviews at the shop-wide mean, so a single
+  5-star review does not outrank hundreds of 4.8s
+"""
+
+from datetime import timedelta
+from django.db import transaction
+from django.db.models import Avg, Case, Count, ExpressionWrapper, F, FloatField, OuterRef, Q, Subquery, Sum, Value, When, Window
+from django.db.models.functions import Cast, Coalesce, RowNumber
+from django.utils import timezone
+from products.models import Product, ProductRanking, Review
+from .models import OrderItem
+
+TOP_N = 50
+TRENDING_WINDOW_DAYS = 14
+TRENDING_HALF_LIFE_DAYS = 3
+RATING_PRIOR_WEIGHT = 10
+
+
+def product_total(queryset, total):
+    """
+    Correlated subquery of ``total`` over the ``queryset`` rows of each
+    product (0 when there are none)
+    """
+    totals = queryset.filter(product=OuterRef('pk')).order_by().values('product').annotate(total=total)
+    return Coalesce(Subquery(totals.values('total')), Value(0.0), output_field=FloatField())
+
+
+def best_seller_score():
+    return Cast('sold', FloatField())
+
+
+def trending_score(now=None):
+    now = now or timezone.now()
+    decay = Case(
+        *[
+            When(order__created_at__gte=now - timedelta(days=day + 1), then=Value(0.5 ** (day / TRENDING_HALF_LIFE_DAYS)))
+            for day in range(TRENDING_WINDOW_DAYS)
+        ],
+        default=Value(0.0),
+        output_field=FloatField(),
+    )
+    recent = OrderItem.objects.filter(
+        order__created_at__gte=now - timedelta(days=TRENDING_WINDOW_DAYS),
+    ).exclude(order__order_status='cancelled')
+    return product_total(recent, Sum(ExpressionWrapper(F('quantity') * decay, output_field=FloatField())))
+
+
+def top_rated_score():
+    mean = Review.objects.aggregate(mean=Avg('rating'))['mean'] or 0
+    ratings = product_total(Review.objects.all(), Sum('rating'))
+    reviews = product_total(Review.objects.all(), Count('pk'))
+    return ExpressionWrapper(
+        (ratings + Value(RATING_PRIOR_WEIGHT * mean)) / (reviews + Value(float(RATING_PRIOR_WEIGHT))),
+        output_field=FloatField(),
+    )
+
+
+SCORES = {
+    'best_sellers': best_seller_score,
+    'trending': trending_score,
+    'top_rated': top_rated_score,
+}
+
+
+def compute(kind):
+    """
+    Replace the ``kind`` rankings, overall and per category. Returns the
+    number of rows stored.
+    """
+    order = [F('score').desc(), F('pk')]
+    ranked = (
+        Product.objects.filter(is_active=True)
+        .annotate(score=SCORES[kind]())
+        .filter(score__gt=0)
+        .annotate(
+            overall=Window(RowNumber(), order_by=order),
+            in_category=Window(RowNumber(), partition_by=[F('category')], order_by=order),
+        )
+        .filter(Q(overall__lte=TOP_N) | Q(in_category__lte=TOP_N))
+        .values_list('pk', 'category_id', 'score', 'overall', 'in_category')
+    )
+    now = timezone.now()
+    rows = []
+    for product_id, category_id, score, overall, in_category in ranked:
+        if overall <= TOP_N:
+            rows.append(ProductRanking(kind=kind, product_id=product_id, rank=overall, score=score, computed_at=now))
+        if in_category <= TOP_N:
+            rows.append(ProductRanking(
+                kind=kind, category_id=category_id, product_id=product_id, rank=in_category, score=score, computed_at=now,
+            ))
+    with transaction.atomic():
+        ProductRanking.objects.filter(kind=kind).delete()
+        ProductRanking.objects.bulk_create(rows, batch_size=1000)
+    return len(rows)
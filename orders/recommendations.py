@@ -0,0 +1,172 @@
+"""
+"Customers also bought" recommendations.
+
+Every order is a basket of products, and so is every user's favorites
+list. Each pair of products sharing a basket adds the basket's weight to
+their cell of the ProductCooccurrence matrix; the TOP_K highest-scoring
+neighbours of each product are then copied into ProductRecommendation,
+which is what the product detail page reads.
+
+rebuild() recounts the whole matrix in one streaming pass over the order
+items (cancelled orders left out) and favorites; record_basket() adds a
+new order to it incrementally and forget_orders() takes cancelled ones
+back out. The counting is plain Python (a Counter of pairs) and SQL
+increments; the matrix is far too sparse to gain from a dense array.
+"""
+
+from collections import Counter, defaultdict
+from itertools import combinations, groupby, islice
+from operator import itemgetter
+from django.db import transaction
+from django.db.models import F, Value, Window
+from django.db.models.functions import Greatest, RowNumber
+from ecommerce_backend.db import bulk_upsert
+from products.models import Favorite, ProductCooccurrence, ProductRecommendation
+from .models import OrderItem
+
+TOP_K = 12
+ORDER_WEIGHT = 2
+FAVORITE_WEIGHT = 1
+# Larger baskets (wholesale orders, users favoriting half the shop) say
+# little about what goes together and cost O(n^2) pairs
+MAX_BASKET = 50
+BATCH_SIZE = 1000
+
+
+def batched(objs, size=BATCH_SIZE):
+    objs = iter(objs)
+    while batch := list(islice(objs, size)):
+        yield batch
+
+
+def basket_pairs(product_ids):
+    """
+    Every (a, b) pair, a < b, of a basket's distinct products
+    """
+    basket = sorted(set(product_ids))
+    if len(basket) > MAX_BASKET:
+        return []
+    return combinations(basket, 2)
+
+
+def count_pairs():
+    """
+    The weighted co-occurrence counts {(a, b): score}, a < b, as a sparse
+    dict built from order items and favorites streamed basket by basket
+    """
+    counts = Counter()
+    sources = [
+        (
+            OrderItem.objects.filter(product__isnull=False).exclude(order__order_status='cancelled')
+            .values_list('order_id', 'product_id').order_by('order_id'),
+            ORDER_WEIGHT,
+        ),
+        (Favorite.objects.values_list('user_id', 'product_id').order_by('user_id'), FAVORITE_WEIGHT),
+    ]
+    for rows, weight in sources:
+        for _, basket in groupby(rows.iterator(chunk_size=2000), key=itemgetter(0)):
+            for pair in basket_pairs(product_id for _, product_id in basket):
+                counts[pair] += weight
+    return counts
+
+
+def rank_neighbors(product_ids=None):
+    """
+    Replace the stored top-K neighbours of ``product_ids`` (all products by
+    default) with the best-scoring active ones from the matrix, ranked in
+    the database with ROW_NUMBER() over each product's rows.
+
+    The new ranks are upserted on (product, rank) and only the ranks past
+    each product's new list are deleted. Deleting and reinserting them
+    instead let two overlapping orders, re-ranking the same product at
+    once, both insert rank 1 and fail on the unique constraint.
+    """
+    cells = ProductCooccurrence.objects.filter(score__gt=0, other__is_active=True)
+    recommendations = ProductRecommendation.objects.all()
+    if product_ids is not None:
+        cells = cells.filter(product__in=product_ids)
+        recommendations = recommendations.filter(product__in=product_ids)
+    ranked = (
+        cells.annotate(rank=Window(RowNumber(), partition_by=[F('product')], order_by=[F('score').desc(), F('other')]))
+        .filter(rank__lte=TOP_K)
+        .values_list('product_id', 'other_id', 'rank', 'score')
+        # Every writer upserts a product's rows in the same order
+        .order_by('product', 'rank')
+    )
+    lengths = Counter()
+
+    def rows():
+        for product_id, other_id, rank, score in ranked.iterator(chunk_size=BATCH_SIZE):
+            lengths[product_id] += 1
+            yield ProductRecommendation(product_id=product_id, recommended_id=other_id, rank=rank, score=score)
+
+    with transaction.atomic():
+        for batch in batched(rows()):
+            bulk_upsert(ProductRecommendation, batch, unique_fields=['product', 'rank'], update_fields=['recommended', 'score'])
+        # Lists that got shorter, and products left with no neighbours
+        by_length = defaultdict(list)
+        for product_id, length in lengths.items():
+            by_length[length].append(product_id)
+        for length, ids in by_length.items():
+            for batch in batched(ids):
+                ProductRecommendation.objects.filter(product__in=batch, rank__gt=length).delete()
+        recommendations.exclude(product__in=cells.values('product')).delete()
+
+
+def rebuild():
+    """
+    Recount the whole matrix and re-rank every product. Returns the number
+    of product pairs found.
+    """
+    counts = count_pairs()
+    cells = (
+        ProductCooccurrence(product_id=product_id, other_id=other_id, score=score)
+        for (a, b), score in counts.items()
+        for product_id, other_id in ((a, b), (b, a))
+    )
+    with transaction.atomic():
+        ProductCooccurrence.objects.all().delete()
+        for batch in batched(cells):
+            ProductCooccurrence.objects.bulk_create(batch)
+        rank_neighbors()
+    return len(counts)
+
+
+def record_basket(product_ids, weight=ORDER_WEIGHT):
+    """
+    Add one new basket (a placed order) to the matrix and re-rank only its
+    products: missing cells are inserted at zero, then every cell among the
+    basket's products is incremented in a single UPDATE, so concurrent
+    orders never lose a count. A negative ``weight`` takes a basket back
+    out, never below zero.
+    """
+    product_ids = sorted(set(product_ids))
+    pairs = list(basket_pairs(product_ids))
+    if not pairs:
+        return
+    with transaction.atomic():
+        ProductCooccurrence.objects.bulk_create(
+            [
+                ProductCooccurrence(product_id=product_id, other_id=other_id)
+                for a, b in pairs
+                for product_id, other_id in ((a, b), (b, a))
+            ],
+            ignore_conflicts=True,
+        )
+        ProductCooccurrence.objects.filter(product__in=product_ids, other__in=product_ids).exclude(
+            product=F('other')
+        ).update(score=Greatest(F('score') + weight, Value(0)))
+        rank_neighbors(product_ids)
+
+
+def forget_orders(order_ids):
+    """
+    Take the baskets of cancelled orders back out of the matrix
+    """
+    rows = (
+        OrderItem.objects.filter(order_id__in=list(order_ids), product__isnull=False)
+        .values_list('order_id', 'product_id')
+        .order_by('order_id')
+    )
+    for _, basket in groupby(rows, key=itemgetter(0)):
+        record_basket([product_id for _, product_id in basket], weight=-ORDER_WEIGHT)
@@ -0,0 +1,58 @@
+"""
+Cart stock reservations.
+
+Adding to (or updating) the cart places a hold for the cart quantity that
+lasts CART_RESERVATION_TTL; available stock is ``stock - active holds``
+per product variant. Callers must hold a row lock on the variant
+(select_for_update) so two carts cannot both claim the last units.
+"""
+
+from datetime import timedelta
+from django.conf import settings
+from django.db.models import Sum
+from django.utils import timezone
+from .models import StockReservation
+
+
+def reservation_ttl():
+    return getattr(settings, 'CART_RESERVATION_TTL', timedelta(minutes=15))
+
+
+def held_quantity(variant, exclude_user=None):
+    """
+    Units of ``variant`` held by active reservations, other than the
+    ``exclude_user``'s own
+    """
+    holds = StockReservation.objects.filter(variant=variant, expires_at__gt=timezone.now())
+    if exclude_user is not None:
+        holds = holds.exclude(cart__user=exclude_user)
+    return holds.aggregate(total=Sum('quantity'))['total'] or 0
+
+
+def available_stock(variant, exclude_user=None):
+    return max(variant.stock - held_quantity(variant, exclude_user), 0)
+
+
+def reserve(cart_item):
+    """
+    Hold the cart item's full quantity for another TTL period
+    """
+    StockReservation.objects.update_or_create(
+        cart=cart_item,
+        defaults={
+            'variant_id': cart_item.variant_id,
+            'quantity': cart_item.quantity,
+            'expires_at': timezone.now() + reservation_ttl(),
+        }
+    )
+
+
+def covers(cart_item):
+    """
+    Whether the cart item still has an active hold for its whole quantity
+    """
+    try:
+        reservation = cart_item.reservation
+    except StockReservation.DoesNotExist:
+        return False
+    return reservation.is_active and reservation.quantity >= cart_item.quantity
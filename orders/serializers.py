@@ -4,11 +4,16 @@ from products.serializers import ProductListSerializer
 
 class CartSerializer(serializers.ModelSerializer):
     product_details = ProductListSerializer(source='product', read_only=True)
+    size = serializers.CharField(source='variant.size', read_only=True)
+    color = serializers.CharField(source='variant.color', read_only=True)
     subtotal = serializers.DecimalField(max_digits=10, decimal_places=2, read_only=True)
     
     class Meta:
         model = Cart
-        fields = ['id', 'user', 'product', 'product_details', 'quantity', 'subtotal', 'created_at', 'updated_at']
+        fields = [
+            'id', 'user', 'product', 'product_details', 'variant', 'size', 'color',
+            'quantity', 'subtotal', 'created_at', 'updated_at'
+        ]
         read_only_fields = ['id', 'user', 'created_at', 'updated_at']
     
     def validate_quantity(self, value):
@@ -19,7 +24,7 @@ class CartSerializer(serializers.ModelSerializer):
 class OrderItemSerializer(serializers.ModelSerializer):
     class Meta:
         model = OrderItem
-        fields = ['id', 'product', 'product_name', 'product_price', 'quantity', 'subtotal']
+        fields = ['id', 'product', 'variant', 'product_name', 'size', 'color', 'product_price', 'quantity', 'subtotal']
         read_only_fields = ['id']
 
 class OrderSerializer(serializers.ModelSerializer):
@@ -0,0 +1,146 @@
+"""
+Order status state machine.
+
+Every status change goes through a compare-and-set UPDATE
+(``... WHERE order_status = <old>``), so two concurrent edits can never
+both apply, and is recorded in the append-only OrderStatusEvent table.
+Moving an order to ``cancelled`` puts its items back into stock in the
+same transaction and, once committed, takes its basket out of the
+"customers also bought" counts.
+"""
+
+from collections import defaultdict
+from django.db import transaction
+from django.db.models import Sum
+from django.utils import timezone
+from accounts import summary
+from products.stock import restore_stock
+from .models import Order, OrderItem, OrderStatusEvent
+from .recommendations import forget_orders
+
+# Allowed target statuses for each status
+TRANSITIONS = {
+    'pending': {'processing', 'cancelled'},
+    'processing': {'shipped', 'cancelled'},
+    'shipped': {'delivered', 'cancelled'},
+    'delivered': set(),
+    'cancelled': set(),
+}
+
+# Compare-and-set attempts before giving up on a contended order
+MAX_ATTEMPTS = 3
+
+
+class InvalidTransition(Exception):
+    def __init__(self, from_status, to_status):
+        self.from_status = from_status
+        self.to_status = to_status
+        super().__init__(f'Cannot change order status from {from_status} to {to_status}')
+
+
+def can_transition(from_status, to_status):
+    return to_status in TRANSITIONS.get(from_status, ())
+
+
+def restore_order_stock(order_ids):
+    """
+    Return the items of the given orders to stock in one batched update
+    """
+    quantities = (
+        OrderItem.objects.filter(order_id__in=list(order_ids), variant__isnull=False)
+        .values('variant_id')
+        .annotate(quantity=Sum('quantity'))
+    )
+    restore_stock({row['variant_id']: row['quantity'] for row in quantities})
+
+
+def transition(order_id, to_status, changed_by=None, queryset=None):
+    """
+    Move one order to ``to_status`` and return its previous status.
+
+    ``queryset`` narrows the orders that may be touched (e.g. to the
+    requesting user's). Raises Order.DoesNotExist or InvalidTransition.
+    """
+    if to_status not in TRANSITIONS:
+        raise InvalidTransition(None, to_status)
+
+    orders = (Order.objects.all() if queryset is None else queryset).filter(pk=order_id)
+
+    with transaction.atomic():
+        for _ in range(MAX_ATTEMPTS):
+            from_status = orders.values_list('order_status', flat=True).first()
+            if from_status is None:
+                raise Order.DoesNotExist
+            if not can_transition(from_status, to_status):
+                raise InvalidTransition(from_status, to_status)
+
+            if orders.filter(order_status=from_status).update(order_status=to_status, updated_at=timezone.now()):
+                break
+        else:
+            # Lost the race every time; report the status that beat us
+            raise InvalidTransition(orders.values_list('order_status', flat=True).first(), to_status)
+
+        OrderStatusEvent.objects.create(
+            order_id=order_id, from_status=from_status, to_status=to_status, changed_by=changed_by
+        )
+        # update() sends no post_save for the owner's "me" summary
+        summary.invalidate(orders.values_list('user_id', flat=True))
+        if to_status == 'cancelled':
+            restore_order_stock([order_id])
+            transaction.on_commit(lambda: forget_orders([order_id]), robust=True)
+
+    return from_status
+
+
+def bulk_transition(order_ids, to_status, changed_by=None):
+    """
+    Move many orders to ``to_status`` with one UPDATE per distinct current
+    status. Returns ``(updated_ids, skipped)`` where ``skipped`` maps an
+    order id to the reason it was left alone.
+    """
+    if to_status not in TRANSITIONS:
+        raise InvalidTransition(None, to_status)
+
+    order_ids = set(order_ids)
+    skipped = {}
+
+    with transaction.atomic():
+        # Lock the rows so every grouped compare-and-set below matches
+        current = dict(
+            Order.objects.select_for_update()
+            .filter(pk__in=order_ids)
+            .order_by('pk')
+            .values_list('pk', 'order_status')
+        )
+
+        by_status = defaultdict(list)
+        for order_id in order_ids:
+            from_status = current.get(order_id)
+            if from_status is None:
+                skipped[order_id] = 'Order not found'
+            elif not can_transition(from_status, to_status):
+                skipped[order_id] = str(InvalidTransition(from_status, to_status))
+            else:
+                by_status[from_status].append(order_id)
+
+        now = timezone.now()
+        updated_ids = []
+        events = []
+        for from_status, ids in by_status.items():
+            Order.objects.filter(pk__in=ids, order_status=from_status).update(
+                order_status=to_status, updated_at=now
+            )
+            updated_ids.extend(ids)
+            events.extend(
+                OrderStatusEvent(order_id=order_id, from_status=from_status,
+                                 to_status=to_status, changed_by=changed_by)
+                for order_id in ids
+            )
+        OrderStatusEvent.objects.bulk_create(events)
+        summary.invalidate(Order.objects.filter(pk__in=updated_ids).values_list('user_id', flat=True))
+
+        if to_status == 'cancelled' and updated_ids:
+            restore_order_stock(updated_ids)
+            transaction.on_commit(lambda: forget_orders(updated_ids), robust=True)
+
+    return sorted(updated_ids), skipped
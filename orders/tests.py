@@ -1,3 +1,617 @@
-from django.test import TestCase
+import os
+from io import StringIO
+from datetime import timedelta
+from decimal import Decimal
+from threading import Thread
+from unittest import mock
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.cache.backends.locmem import LocMemCache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+from products.models import Category, Favorite, ProductCooccurrence, ProductRanking, ProductRecommendation, ProductVariant, Review, StockEvent
+from ecommerce_backend.query_plans import QueryPlanMixin
+from products import views as product_views
+from products.tests import make_products
+from .idempotency import IN_FLIGHT_LEASE, REPLAYED_HEADER
+from .models import Cart, IdempotencyKey, Order, OrderItem, OrderStatusEvent, StockReservation
+from .serializers import CartSerializer, OrderSerializer
+from .fast_serializers import FastCartSerializer, FastOrderSerializer
+from .order_numbers import WORKER_SLOTS, SnowflakeGenerator, DailySequenceGenerator, default_worker_id
+from .rankings import compute
+from .recommendations import rebuild, record_basket
+from .reservations import available_stock
+from .state_machine import InvalidTransition, transition, bulk_transition
 
-# Create your tests here.
+User = get_user_model()
+
+
+class FastSerializerEquivalenceTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('shopper', 'shopper@example.com', 'pass12345')
+        self.products = make_products(Category.objects.create(name='daily'), 6)
+
+    def assertSameJSON(self, slow, fast):
+        renderer = JSONRenderer()
+        self.assertEqual(renderer.render(slow), renderer.render(fast))
+
+    def test_cart_matches_model_serializer(self):
+        for quantity, product in enumerate(self.products, start=1):
+            Cart.objects.create(user=self.user, product=product, variant=product.variants.get(), quantity=quantity)
+        queryset = Cart.objects.filter(user=self.user).order_by('pk')
+        self.assertSameJSON(
+            CartSerializer(queryset, many=True).data,
+            FastCartSerializer(queryset).data,
+        )
+
+    def test_orders_match_model_serializer(self):
+        for payment_method in ['cod', 'upi', 'card']:
+            order = Order.objects.create(
+                user=self.user, full_name='Test Shopper', email='shopper@example.com',
+                phone='9999999999', address='1 Main Road', city='Chennai',
+                state='Tamil Nadu', pincode='600001', total_amount=Decimal('1998.00'),
+                payment_method=payment_method,
+                transaction_id=None if payment_method == 'cod' else 'TXN-1',
+            )
+            for product in self.products[:3]:
+                OrderItem.objects.create(
+                    order=order, product=product, variant=product.variants.get(),
+                    product_name=product.name, size='M', color='Blue',
+                    product_price=product.price, quantity=2, subtotal=product.price * 2,
+                )
+        # An order whose product was deleted keeps its item with product=None
+        OrderItem.objects.filter(order=order).update(product=None, variant=None)
+        Order.objects.create(
+            user=self.user, full_name='Test Shopper', email='shopper@example.com',
+            phone='9999999999', address='1 Main Road', city='Chennai',
+            state='Tamil Nadu', pincode='600001', total_amount=Decimal('0'),
+            payment_method='cod', order_status='cancelled',
+        )
+        queryset = Order.objects.filter(user=self.user)
+        slow = OrderSerializer(queryset, many=True).data
+        for order in slow:
+            order['items'] = sorted(order['items'], key=lambda item: item['id'])
+        self.assertSameJSON(slow, FastOrderSerializer(queryset).data)
+
+
+class OrderStateMachineTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('shopper', 'shopper@example.com', 'pass12345')
+        self.product = make_products(Category.objects.create(name='street'), 1)[0]
+        self.variant = self.product.variants.get()
+        self.variant.stock = 10
+        self.variant.sold = 20
+        self.variant.save()
+
+    def create_order(self, order_status='pending', quantity=2):
+        order = Order.objects.create(
+            user=self.user, full_name='Test Shopper', email='shopper@example.com',
+            phone='9999999999', address='1 Main Road', city='Chennai',
+            state='Tamil Nadu', pincode='600001', total_amount=Decimal('999.00'),
+            payment_method='cod', order_status=order_status,
+        )
+        OrderItem.objects.create(
+            order=order, product=self.product, variant=self.variant,
+            product_name=self.product.name, size=self.variant.size, color=self.variant.color,
+            product_price=self.product.price, quantity=quantity,
+            subtotal=self.product.price * quantity,
+        )
+        return order
+
+    def test_transition_records_event(self):
+        order = self.create_order()
+        self.assertEqual(transition(order.pk, 'processing', changed_by=self.user), 'pending')
+        order.refresh_from_db()
+        self.assertEqual(order.order_status, 'processing')
+        event = OrderStatusEvent.objects.get(order=order)
+        self.assertEqual((event.from_status, event.to_status), ('pending', 'processing'))
+
+    def test_illegal_transition_is_rejected(self):
+        order = self.create_order('delivered')
+        with self.assertRaises(InvalidTransition):
+            transition(order.pk, 'pending')
+        self.assertFalse(OrderStatusEvent.objects.exists())
+
+    def test_cancel_restores_stock_once(self):
+        order = self.create_order(quantity=3)
+        transition(order.pk, 'cancelled')
+        with self.assertRaises(InvalidTransition):
+            transition(order.pk, 'cancelled')
+        self.product.refresh_from_db()
+        self.variant.refresh_from_db()
+        self.assertEqual(self.product.stock, 13)
+        self.assertEqual((self.variant.stock, self.variant.sold), (13, 17))
+
+    def test_bulk_transition(self):
+        pending = [self.create_order() for _ in range(3)]
+        processing = self.create_order('processing')
+        delivered = self.create_order('delivered')
+        updated, skipped = bulk_transition(
+            [order.pk for order in pending] + [processing.pk, delivered.pk, 999999], 'cancelled'
+        )
+        self.assertEqual(updated, sorted([order.pk for order in pending] + [processing.pk]))
+        self.assertEqual(set(skipped), {delivered.pk, 999999})
+        self.assertEqual(OrderStatusEvent.objects.filter(to_status='cancelled').count(), 4)
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.stock, 18)
+
+
+@override_settings(RATE_LIMIT_ENABLED=False)
+class VariantCheckoutTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('shopper', 'shopper@example.com', 'pass12345')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.product = make_products(Category.objects.create(name='party'), 1)[0]
+        self.medium = self.product.variants.get()
+        self.medium.stock = 5
+        self.medium.save()
+        self.large = ProductVariant.objects.create(product=self.product, size='L', color='Blue', stock=1)
+
+    def add(self, **data):
+        return self.client.post(reverse('add-to-cart'), data, format='json')
+
+    def test_cart_holds_are_per_variant(self):
+        self.assertEqual(self.add(product_id=self.product.pk).status_code, 400)
+        self.assertEqual(self.add(variant_id=self.large.pk, quantity=2).status_code, 400)
+        self.assertEqual(self.add(variant_id=self.large.pk).status_code, 201)
+
+        other = User.objects.create_user('other', 'other@example.com', 'pass12345')
+        self.client.force_authenticate(other)
+        self.assertEqual(self.add(variant_id=self.large.pk).status_code, 400)
+        self.assertEqual(self.add(variant_id=self.medium.pk, quantity=5).status_code, 201)
+
+    def test_checkout_takes_variant_stock(self):
+        self.add(variant_id=self.medium.pk, quantity=2)
+        self.add(variant_id=self.large.pk)
+        response = self.client.post(reverse('create-order'), {
+            'full_name': 'Test Shopper', 'email': 'shopper@example.com', 'phone': '9999999999',
+            'address': '1 Main Road', 'city': 'Chennai', 'state': 'Tamil Nadu',
+            'pincode': '600001', 'payment_method': 'cod',
+        }, format='json')
+        self.assertEqual(response.status_code, 201, response.data)
+        self.assertEqual(
+            sorted((item['size'], item['quantity']) for item in response.data['order']['items']),
+            [('L', 1), ('M', 2)],
+        )
+
+        self.medium.refresh_from_db()
+        self.large.refresh_from_db()
+        self.product.refresh_from_db()
+        self.assertEqual((self.medium.stock, self.medium.sold), (3, 2))
+        self.assertEqual((self.large.stock, self.large.sold), (0, 1))
+        self.assertEqual((self.product.stock, self.product.sold), (3, 3))
+        self.assertEqual(
+            [variant['in_stock'] for variant in self.product.listing.variants], [True, False]
+        )
+        self.assertTrue(StockEvent.objects.filter(product=self.product, stock_before=6, stock_after=3).exists())
+        self.assertFalse(Cart.objects.filter(user=self.user).exists())
+
+
+@override_settings(RATE_LIMIT_ENABLED=False)
+class ReservationTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.alice = User.objects.create_user('alice', 'alice@example.com', 'pass12345')
+        self.bob = User.objects.create_user('bob', 'bob@example.com', 'pass12345')
+        self.variant = make_products(Category.objects.create(name='party'), 1)[0].variants.get()
+        self.variant.stock = 3
+        self.variant.save()
+
+    def add(self, user, quantity):
+        self.client.force_authenticate(user)
+        return self.client.post(
+            reverse('add-to-cart'), {'variant_id': self.variant.pk, 'quantity': quantity}, format='json',
+        )
+
+    def past_ttl(self):
+        later = timezone.now() + settings.CART_RESERVATION_TTL + timedelta(seconds=1)
+        return mock.patch('django.utils.timezone.now', return_value=later)
+
+    def test_add_to_cart_holds_stock(self):
+        self.assertEqual(self.add(self.alice, 2).status_code, 201)
+        hold = StockReservation.objects.get()
+        self.assertEqual((hold.variant_id, hold.quantity), (self.variant.pk, 2))
+        self.assertEqual(available_stock(self.variant), 1)
+        # A shopper's own hold does not count against them
+        self.assertEqual(available_stock(self.variant, exclude_user=self.alice), 3)
+
+        response = self.add(self.bob, 2)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['error'], 'Only 1 items available in stock')
+        self.assertEqual(self.add(self.bob, 1).status_code, 201)
+        self.assertEqual(available_stock(self.variant), 0)
+
+    def test_holds_lapse_after_ttl(self):
+        self.add(self.alice, 3)
+        self.assertEqual(self.add(self.bob, 1).status_code, 400)
+        with self.past_ttl():
+            self.assertEqual(available_stock(self.variant), 3)
+            self.assertEqual(self.add(self.bob, 1).status_code, 201)
+            self.assertEqual(available_stock(self.variant), 2)
+
+    def test_reaper_is_idempotent(self):
+        self.add(self.alice, 1)
+        self.add(self.bob, 1)
+        StockReservation.objects.filter(cart__user=self.alice).update(expires_at=timezone.now())
+        for expected in ['Expired 1 stock reservations', 'Expired 0 stock reservations']:
+            out = StringIO()
+            call_command('expire_reservations', batch_size=1, stdout=out)
+            self.assertIn(expected, out.getvalue())
+        self.assertEqual(list(StockReservation.objects.values_list('cart__user', flat=True)), [self.bob.pk])
+        # The cart item itself stays, only its hold is gone
+        self.assertEqual(Cart.objects.count(), 2)
+
+    def checkout(self, user):
+        self.client.force_authenticate(user)
+        return self.client.post(reverse('create-order'), {
+            'full_name': 'Test Shopper', 'email': 'shopper@example.com', 'phone': '9999999999',
+            'address': '1 Main Road', 'city': 'Chennai', 'state': 'Tamil Nadu',
+            'pincode': '600001', 'payment_method': 'cod',
+        }, format='json')
+
+    def test_checkout_converts_holds_without_double_counting(self):
+        self.add(self.alice, 2)
+        self.add(self.bob, 1)
+        self.assertEqual(self.checkout(self.alice).status_code, 201)
+        self.variant.refresh_from_db()
+        self.assertEqual((self.variant.stock, self.variant.sold), (1, 2))
+        # Alice's hold became the sale; only Bob's is left against the stock
+        self.assertEqual(list(StockReservation.objects.values_list('cart__user', flat=True)), [self.bob.pk])
+        self.assertEqual(available_stock(self.variant), 0)
+        self.assertEqual(self.checkout(self.bob).status_code, 201)
+        self.variant.refresh_from_db()
+        self.assertEqual((self.variant.stock, self.variant.sold), (0, 3))
+
+    def test_checkout_after_a_lapsed_hold_rechecks_stock(self):
+        self.add(self.alice, 2)
+        with self.past_ttl():
+            # Alice's hold ran out and Bob now holds 2 of the 3
+            self.assertEqual(self.add(self.bob, 2).status_code, 201)
+            response = self.checkout(self.alice)
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('Insufficient stock', response.data['error'])
+        self.assertEqual(Order.objects.count(), 0)
+
+
+@override_settings(RATE_LIMIT_ENABLED=False)
+class IdempotencyTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('shopper', 'shopper@example.com', 'pass12345')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.variant = make_products(Category.objects.create(name='party'), 1)[0].variants.get()
+        self.variant.stock = 5
+        self.variant.save()
+
+    def add(self, key='cart-1', quantity=1):
+        return self.client.post(
+            reverse('add-to-cart'), {'variant_id': self.variant.pk, 'quantity': quantity},
+            format='json', HTTP_IDEMPOTENCY_KEY=key,
+        )
+
+    def held(self):
+        return Cart.objects.get(user=self.user).quantity
+
+    def test_retry_replays_the_stored_response(self):
+        first = self.add()
+        self.assertEqual(first.status_code, 201)
+        self.assertNotIn(REPLAYED_HEADER, first)
+        retry = self.add()
+        self.assertEqual((retry.status_code, retry.data), (201, first.data))
+        self.assertEqual(retry[REPLAYED_HEADER], 'true')
+        self.assertEqual(self.held(), 1)
+
+    def test_key_reused_for_a_different_request(self):
+        self.add()
+        self.assertEqual(self.add(quantity=2).status_code, 422)
+        self.assertEqual(self.held(), 1)
+
+    def test_in_flight_claim_conflicts_until_its_lease_runs_out(self):
+        self.add()
+        records = IdempotencyKey.objects.filter(user=self.user, key='cart-1')
+        records.update(status_code=None, response_body=None)
+        response = self.add()
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response['Retry-After'], '1')
+        # The first request's worker died: the retry takes the claim over
+        records.update(created_at=timezone.now() - IN_FLIGHT_LEASE - timedelta(seconds=1))
+        response = self.add()
+        self.assertLess(response.status_code, 300)
+        self.assertNotIn(REPLAYED_HEADER, response)
+        self.assertIsNotNone(records.get().status_code)
+
+    @override_settings(IDEMPOTENCY_KEY_TTL=timedelta(hours=1))
+    def test_expired_keys_are_not_replayed(self):
+        self.add()
+        IdempotencyKey.objects.update(created_at=timezone.now() - timedelta(hours=2))
+        response = self.add()
+        self.assertNotIn(REPLAYED_HEADER, response)
+        self.assertEqual(self.held(), 2)
+        self.assertEqual(self.add()[REPLAYED_HEADER], 'true')
+
+    @override_settings(IDEMPOTENCY_KEY_TTL=timedelta(hours=1))
+    def test_purge_deletes_expired_keys(self):
+        for key in ['cart-1', 'cart-2', 'cart-3']:
+            self.add(key)
+        IdempotencyKey.objects.exclude(key='cart-3').update(created_at=timezone.now() - timedelta(hours=2))
+        call_command('purge_idempotency_keys', batch_size=1, stdout=mock.MagicMock())
+        self.assertEqual(list(IdempotencyKey.objects.values_list('key', flat=True)), ['cart-3'])
+
+
+@override_settings(RATE_LIMIT_ENABLED=False)
+class RecommendationTest(QueryPlanMixin, TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('shopper', 'shopper@example.com', 'pass12345')
+        self.shirt, self.jeans, self.belt, self.socks = make_products(Category.objects.create(name='daily'), 4)
+
+    def place_order(self, *products):
+        order = Order.objects.create(
+            user=self.user, full_name='Test Shopper', email='shopper@example.com',
+            phone='9999999999', address='1 Main Road', city='Chennai',
+            state='Tamil Nadu', pincode='600001', total_amount=Decimal('1.00'),
+            payment_method='cod',
+        )
+        for product in products:
+            OrderItem.objects.create(
+                order=order, product=product, product_name=product.name,
+                product_price=product.price, quantity=1, subtotal=product.price,
+            )
+        return order
+
+    def recommended(self, product):
+        return list(product.recommendations.values_list('recommended_id', flat=True))
+
+    def test_rebuild_ranks_neighbors(self):
+        self.place_order(self.shirt, self.jeans, self.belt)
+        self.place_order(self.shirt, self.jeans)
+        Favorite.objects.create(user=self.user, product=self.shirt)
+        Favorite.objects.create(user=self.user, product=self.socks)
+
+        self.assertEqual(rebuild(), 4)
+        self.assertEqual(self.recommended(self.shirt), [self.jeans.pk, self.belt.pk, self.socks.pk])
+        self.assertEqual(self.recommended(self.socks), [self.shirt.pk])
+        self.assertEqual(
+            list(self.shirt.recommendations.values_list('rank', 'score')), [(1, 4), (2, 2), (3, 1)]
+        )
+
+        response = self.assertNoFullScans(
+            self.client.get, reverse('product-recommendations', args=[self.shirt.pk]),
+            tables=['product_recommendations'],
+        )
+        self.assertEqual([card['id'] for card in response.data['results']], [self.jeans.pk, self.belt.pk, self.socks.pk])
+
+    def test_new_orders_update_incrementally(self):
+        self.place_order(self.shirt, self.belt)
+        rebuild()
+        for variant in ProductVariant.objects.all():
+            variant.stock = 5
+            variant.save()
+
+        client = APIClient()
+        client.force_authenticate(self.user)
+        for product in [self.shirt, self.jeans]:
+            client.post(reverse('add-to-cart'), {'product_id': product.pk}, format='json')
+        with self.captureOnCommitCallbacks(execute=True):
+            response = client.post(reverse('create-order'), {
+                'full_name': 'Test Shopper', 'email': 'shopper@example.com', 'phone': '9999999999',
+                'address': '1 Main Road', 'city': 'Chennai', 'state': 'Tamil Nadu',
+                'pincode': '600001', 'payment_method': 'cod',
+            }, format='json')
+        self.assertEqual(response.status_code, 201, response.data)
+
+        self.assertEqual(self.recommended(self.jeans), [self.shirt.pk])
+        # Ties go to the lower product id
+        self.assertEqual(self.recommended(self.shirt), [self.jeans.pk, self.belt.pk])
+        self.assertEqual(self.recommended(self.belt), [self.shirt.pk])
+        self.assertEqual(ProductRecommendation.objects.count(), 4)
+
+    def test_overlapping_baskets_rerank_in_place(self):
+        first = self.place_order(self.shirt, self.jeans, self.belt)
+        record_basket([self.shirt.pk, self.jeans.pk, self.belt.pk])
+        rows = dict(self.shirt.recommendations.values_list('rank', 'pk'))
+
+        # Shares the shirt and jeans: their existing ranks are updated in
+        # place instead of deleted and inserted again
+        second = self.place_order(self.shirt, self.jeans, self.socks)
+        record_basket([self.shirt.pk, self.jeans.pk, self.socks.pk])
+        self.assertEqual(self.recommended(self.shirt), [self.jeans.pk, self.belt.pk, self.socks.pk])
+        self.assertEqual(
+            list(self.shirt.recommendations.values_list('rank', 'score')), [(1, 4), (2, 2), (3, 2)]
+        )
+        after = dict(self.shirt.recommendations.values_list('rank', 'pk'))
+        self.assertEqual({rank: after[rank] for rank in rows}, rows)
+
+        # Cancelling takes the first basket back out, and the belt drops off
+        with self.captureOnCommitCallbacks(execute=True):
+            transition(first.pk, 'cancelled')
+        self.assertEqual(self.recommended(self.shirt), [self.jeans.pk, self.socks.pk])
+        self.assertEqual(self.recommended(self.belt), [])
+        self.assertEqual(
+            list(self.shirt.recommendations.values_list('rank', 'score')), [(1, 2), (2, 2)]
+        )
+        # A rebuild agrees, as it skips cancelled orders
+        rebuild()
+        self.assertEqual(self.recommended(self.shirt), [self.jeans.pk, self.socks.pk])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            bulk_transition([second.pk], 'cancelled')
+        self.assertFalse(ProductRecommendation.objects.exists())
+        self.assertFalse(ProductCooccurrence.objects.filter(score__gt=0).exists())
+
+
+@override_settings(RATE_LIMIT_ENABLED=False)
+class RankingTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('shopper', 'shopper@example.com', 'pass12345')
+        daily, party = Category.objects.create(name='daily'), Category.objects.create(name='party')
+        self.tee, self.polo = make_products(daily, 2)
+        self.gown = make_products(party, 1)[0]
+
+    def order(self, product, quantity, days_ago=0, order_status='delivered'):
+        order = Order.objects.create(
+            user=self.user, full_name='Test Shopper', email='shopper@example.com',
+            phone='9999999999', address='1 Main Road', city='Chennai',
+            state='Tamil Nadu', pincode='600001', total_amount=Decimal('1.00'),
+            payment_method='cod', order_status=order_status,
+        )
+        Order.objects.filter(pk=order.pk).update(created_at=timezone.now() - timedelta(days=days_ago))
+        OrderItem.objects.create(
+            order=order, product=product, product_name=product.name,
+            product_price=product.price, quantity=quantity, subtotal=product.price * quantity,
+        )
+
+    def ranking(self, kind, category=None):
+        rankings = ProductRanking.objects.filter(kind=kind)
+        rankings = rankings.filter(category__name=category) if category else rankings.filter(category__isnull=True)
+        return list(rankings.order_by('rank').values_list('product_id', flat=True))
+
+    def test_trending_decays_with_age(self):
+        self.order(self.tee, 10, days_ago=9)
+        self.order(self.polo, 3, days_ago=0)
+        self.order(self.gown, 50, days_ago=20)
+        self.order(self.gown, 50, days_ago=0, order_status='cancelled')
+        compute('trending')
+        # 3 today beats 10 from nine days (three half-lives) ago
+        self.assertEqual(self.ranking('trending'), [self.polo.pk, self.tee.pk])
+        self.assertEqual(self.ranking('trending', 'party'), [])
+
+    def test_top_rated_is_bayesian(self):
+        reviewers = [User.objects.create_user(f'r{i}', f'r{i}@example.com', 'pass12345') for i in range(8)]
+        Review.objects.create(product=self.tee, user=reviewers[0], rating=5, comment='Great')
+        for reviewer in reviewers:
+            Review.objects.create(product=self.polo, user=reviewer, rating=5 if reviewer.pk % 4 else 4, comment='Good')
+        Review.objects.create(product=self.gown, user=reviewers[0], rating=1, comment='Bad')
+        compute('top_rated')
+        self.assertEqual(self.ranking('top_rated'), [self.polo.pk, self.tee.pk, self.gown.pk])
+        self.assertEqual(self.ranking('top_rated', 'daily'), [self.polo.pk, self.tee.pk])
+
+    def test_endpoint_is_cached_until_recomputed(self):
+        for product, sold in [(self.tee, 5), (self.polo, 9), (self.gown, 7)]:
+            product.sold = sold
+            product.save()
+        compute('best_sellers')
+        url = reverse('product-rankings', args=['best_sellers'])
+        response = self.client.get(url)
+        self.assertEqual([card['id'] for card in response.data['results']], [self.polo.pk, self.gown.pk, self.tee.pk])
+        response = self.client.get(url, {'category': 'daily'})
+        self.assertEqual([card['id'] for card in response.data['results']], [self.polo.pk, self.tee.pk])
+
+        self.tee.sold = 20
+        self.tee.save()
+        # Only the version lookup
+        with self.assertNumQueries(1):
+            self.assertEqual(self.client.get(url).data['results'][0]['id'], self.polo.pk)
+        compute('best_sellers')
+        self.assertEqual(self.client.get(url).data['results'][0]['id'], self.tee.pk)
+        self.assertEqual(self.client.get(reverse('product-rankings', args=['cheapest'])).status_code, 404)
+
+    def test_recompute_reaches_every_worker(self):
+        # compute_rankings runs in its own process, and each gunicorn worker
+        # has its own LocMemCache
+        workers = [LocMemCache('worker-1', {}), LocMemCache('worker-2', {})]
+        url = reverse('product-rankings', args=['best_sellers'])
+
+        def leaders():
+            results = []
+            for worker in workers:
+                with mock.patch.object(product_views, 'cache', worker):
+                    results.append(self.client.get(url).data['results'][0]['id'])
+            return results
+
+        self.tee.sold, self.polo.sold = 5, 9
+        self.tee.save()
+        self.polo.save()
+        compute('best_sellers')
+        self.assertEqual(leaders(), [self.polo.pk, self.polo.pk])
+        self.tee.sold = 20
+        self.tee.save()
+        compute('best_sellers')
+        self.assertEqual(leaders(), [self.tee.pk, self.tee.pk])
+
+
+class OrderNumberTest(TestCase):
+    def generate_concurrently(self, generate, threads=8, per_thread=500):
+        results = [[] for _ in range(threads)]
+
+        def worker(index):
+            for _ in range(per_thread):
+                results[index].append(generate())
+
+        workers = [Thread(target=worker, args=(i,)) for i in range(threads)]
+        for thread in workers:
+            thread.start()
+        for thread in workers:
+            thread.join()
+        return results
+
+    def test_snowflake_numbers_are_unique_under_concurrency(self):
+        generator = SnowflakeGenerator(worker_id=7)
+        results = self.generate_concurrently(generator)
+        numbers = [number for result in results for number in result]
+        self.assertEqual(len(numbers), len(set(numbers)))
+        # Each thread sees strictly increasing, equally long numbers
+        for result in results:
+            self.assertEqual(result, sorted(result))
+            self.assertEqual(len(set(map(len, result))), 1)
+
+    def test_snowflake_survives_clock_going_backwards(self):
+        ticks = iter([1_800_000_000.000, 1_800_000_000.005, 1_799_999_999.000, 1_800_000_000.001])
+        generator = SnowflakeGenerator(worker_id=1, clock=lambda: next(ticks))
+        ids = [generator.next_id() for _ in range(4)]
+        self.assertEqual(ids, sorted(set(ids)))
+
+    def test_snowflake_sequence_overflow_moves_to_next_millisecond(self):
+        generator = SnowflakeGenerator(worker_id=1, clock=lambda: 1_800_000_000.0)
+        ids = [generator.next_id() for _ in range(5000)]
+        self.assertEqual(ids, sorted(set(ids)))
+
+    def test_daily_sequence(self):
+        generator = DailySequenceGenerator()
+        numbers = [generator() for _ in range(3)]
+        prefix = f'ORD-{timezone.localdate():%Y%m%d}-'
+        self.assertEqual(numbers, [f'{prefix}000001', f'{prefix}000002', f'{prefix}000003'])
+
+    def test_orders_get_generated_numbers(self):
+        user = User.objects.create_user('shopper', 'shopper@example.com', 'pass12345')
+        order = Order.objects.create(
+            user=user, full_name='Test Shopper', email='shopper@example.com',
+            phone='9999999999', address='1 Main Road', city='Chennai',
+            state='Tamil Nadu', pincode='600001', total_amount=Decimal('1.00'),
+            payment_method='cod',
+        )
+        self.assertRegex(order.order_number, r'^ORD-[0-9A-Z]{13}$')
+
+    def create_order(self, user):
+        return Order.objects.create(
+            user=user, full_name='Test Shopper', email='shopper@example.com',
+            phone='9999999999', address='1 Main Road', city='Chennai',
+            state='Tamil Nadu', pincode='600001', total_amount=Decimal('1.00'),
+            payment_method='cod',
+        )
+
+    def test_duplicate_worker_ids_collide_and_save_retries(self):
+        # Two processes that ended up with the same worker id
+        first = SnowflakeGenerator(worker_id=3, clock=lambda: 1_800_000_000.0)
+        second = SnowflakeGenerator(worker_id=3, clock=lambda: 1_800_000_000.0)
+        self.assertEqual(first(), second())
+
+        user = User.objects.create_user('shopper', 'shopper@example.com', 'pass12345')
+        with mock.patch('orders.order_numbers._generator', first):
+            placed = self.create_order(user)
+        with mock.patch('orders.order_numbers._generator', second):
+            retried = self.create_order(user)
+        self.assertNotEqual(placed.order_number, retried.order_number)
+        self.assertEqual(Order.objects.count(), 2)
+
+    @override_settings(ORDER_NUMBER_WORKER_ID=None, ORDER_NUMBER_INSTANCE_ID=2)
+    def test_gunicorn_workers_get_distinct_worker_ids(self):
+        worker_ids = set()
+        for slot in range(WORKER_SLOTS):
+            with mock.patch.dict(os.environ, {'GUNICORN_WORKER_SLOT': str(slot)}):
+                worker_ids.add(default_worker_id())
+        self.assertEqual(worker_ids, set(range(2 * WORKER_SLOTS, 3 * WORKER_SLOTS)))
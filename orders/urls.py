@@ -18,4 +18,5 @@ urlpatterns = [
     # Admin Order URLs
     path('admin/all/', views.admin_orders_view, name='admin-orders'),
     path('admin/<int:order_id>/update/', views.update_order_status_view, name='update-order-status'),
+    path('admin/bulk-update/', views.bulk_update_order_status_view, name='bulk-update-order-status'),
 ]
\ No newline at end of file
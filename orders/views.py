@@ -4,8 +4,14 @@ from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated, IsAdminUser
 from django.db import transaction
 from .models import Cart, Order, OrderItem
-from products.models import Product
+from products.models import Product, ProductVariant
+from products.stock import take_stock
 from .serializers import CartSerializer, OrderSerializer, CreateOrderSerializer
+from .fast_serializers import FastCartSerializer, FastOrderSerializer
+from .idempotency import idempotent
+from .recommendations import record_basket
+from .reservations import available_stock, covers, reserve
+from .state_machine import InvalidTransition, transition, bulk_transition
 
 # Cart Views
 @api_view(['GET'])
@@ -14,52 +20,75 @@ def cart_list_view(request):
     """
     Get user's cart items
     """
-    cart_items = Cart.objects.filter(user=request.user)
-    serializer = CartSerializer(cart_items, many=True)
+    serializer = FastCartSerializer(Cart.objects.filter(user=request.user))
+    cart_items = serializer.data
     
     # Calculate total
-    total = sum([item.subtotal for item in cart_items])
+    total = sum([row['product__price'] * row['quantity'] for row in serializer.rows])
     
     return Response({
-        'cart_items': serializer.data,
+        'cart_items': cart_items,
         'total': total,
-        'count': cart_items.count()
+        'count': len(cart_items)
     }, status=status.HTTP_200_OK)
 
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
+@idempotent
 def add_to_cart_view(request):
     """
-    Add product to cart
+    Add a product variant to cart
+
+    Takes variant_id, or product_id for products with a single variant
     """
+    variant_id = request.data.get('variant_id')
     product_id = request.data.get('product_id')
     quantity = request.data.get('quantity', 1)
     
-    try:
-        product = Product.objects.get(pk=product_id, is_active=True)
-    except Product.DoesNotExist:
-        return Response({'error': 'Product not found'}, status=status.HTTP_404_NOT_FOUND)
-    
-    # Check stock availability
-    if product.stock < int(quantity):
-        return Response({
-            'error': f'Only {product.stock} items available in stock'
-        }, status=status.HTTP_400_BAD_REQUEST)
-    
-    # Add or update cart item
-    cart_item, created = Cart.objects.get_or_create(
-        user=request.user,
-        product=product,
-        defaults={'quantity': quantity}
-    )
-    
-    if not created:
-        cart_item.quantity += int(quantity)
-        if cart_item.quantity > product.stock:
+    with transaction.atomic():
+        # Row lock on the variant only: concurrent carts must not both hold
+        # the last units
+        variants = (
+            ProductVariant.objects.select_for_update(of=('self',))
+            .select_related('product')
+            .filter(product__is_active=True)
+        )
+        if variant_id is not None:
+            variants = variants.filter(pk=variant_id)
+        else:
+            variants = variants.filter(product_id=product_id)
+        variants = list(variants[:2])
+        if not variants:
+            return Response({'error': 'Product not found'}, status=status.HTTP_404_NOT_FOUND)
+        if len(variants) > 1:
             return Response({
-                'error': f'Only {product.stock} items available in stock'
+                'error': 'Choose a size and color (variant_id)'
             }, status=status.HTTP_400_BAD_REQUEST)
-        cart_item.save()
+        variant = variants[0]
+        
+        # Check stock availability, net of other shoppers' holds
+        available = available_stock(variant, exclude_user=request.user)
+        if available < int(quantity):
+            return Response({
+                'error': f'Only {available} items available in stock'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        # Add or update cart item
+        cart_item, created = Cart.objects.get_or_create(
+            user=request.user,
+            variant=variant,
+            defaults={'product': variant.product, 'quantity': quantity}
+        )
+        
+        if not created:
+            cart_item.quantity += int(quantity)
+            if cart_item.quantity > available:
+                return Response({
+                    'error': f'Only {available} items available in stock'
+                }, status=status.HTTP_400_BAD_REQUEST)
+            cart_item.save()
+        
+        reserve(cart_item)
     
     serializer = CartSerializer(cart_item)
     message = 'Product added to cart' if created else 'Cart updated'
@@ -71,6 +100,7 @@ def add_to_cart_view(request):
 
 @api_view(['PUT'])
 @permission_classes([IsAuthenticated])
+@idempotent
 def update_cart_view(request, cart_id):
     """
     Update cart item quantity
@@ -86,13 +116,17 @@ def update_cart_view(request, cart_id):
         cart_item.delete()
         return Response({'message': 'Item removed from cart'}, status=status.HTTP_200_OK)
     
-    if int(quantity) > cart_item.product.stock:
-        return Response({
-            'error': f'Only {cart_item.product.stock} items available in stock'
-        }, status=status.HTTP_400_BAD_REQUEST)
-    
-    cart_item.quantity = quantity
-    cart_item.save()
+    with transaction.atomic():
+        variant = ProductVariant.objects.select_for_update().get(pk=cart_item.variant_id)
+        available = available_stock(variant, exclude_user=request.user)
+        if int(quantity) > available:
+            return Response({
+                'error': f'Only {available} items available in stock'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        cart_item.quantity = int(quantity)
+        cart_item.save()
+        reserve(cart_item)
     
     serializer = CartSerializer(cart_item)
     return Response({
@@ -102,6 +136,7 @@ def update_cart_view(request, cart_id):
 
 @api_view(['DELETE'])
 @permission_classes([IsAuthenticated])
+@idempotent
 def remove_from_cart_view(request, cart_id):
     """
     Remove item from cart
@@ -115,6 +150,7 @@ def remove_from_cart_view(request, cart_id):
 
 @api_view(['DELETE'])
 @permission_classes([IsAuthenticated])
+@idempotent
 def clear_cart_view(request):
     """
     Clear all items from cart
@@ -125,6 +161,7 @@ def clear_cart_view(request):
 # Order Views
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
+@idempotent
 def create_order_view(request):
     """
     Create order from cart
@@ -134,12 +171,30 @@ def create_order_view(request):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
     
     # Get cart items
-    cart_items = Cart.objects.filter(user=request.user)
+    cart_items = Cart.objects.filter(user=request.user).select_related('reservation')
     if not cart_items.exists():
         return Response({'error': 'Cart is empty'}, status=status.HTTP_400_BAD_REQUEST)
     
     try:
         with transaction.atomic():
+            # Lock the products, then the variants, in id order so concurrent
+            # checkouts and cancellations cannot interleave
+            products = {
+                product.pk: product
+                for product in Product.objects.select_for_update()
+                .filter(pk__in=cart_items.values('product_id'))
+                .order_by('pk')
+            }
+            variants = {
+                variant.pk: variant
+                for variant in ProductVariant.objects.select_for_update()
+                .filter(pk__in=cart_items.values('variant_id'))
+                .order_by('pk')
+            }
+            for cart_item in cart_items:
+                cart_item.product = products[cart_item.product_id]
+                cart_item.variant = variants[cart_item.variant_id]
+            
             # Calculate total
             total_amount = sum([item.subtotal for item in cart_items])
             
@@ -159,30 +214,39 @@ def create_order_view(request):
                 payment_status='paid' if serializer.validated_data['payment_method'] != 'cod' else 'pending'
             )
             
-            # Create order items and update product stock
+            # Create order items
             for cart_item in cart_items:
                 product = cart_item.product
+                variant = cart_item.variant
                 
-                # Check stock
-                if product.stock < cart_item.quantity:
-                    raise Exception(f'Insufficient stock for {product.name}')
+                # A live hold already claimed the stock; otherwise check what
+                # is left after other shoppers' holds
+                if not covers(cart_item):
+                    if available_stock(variant, exclude_user=request.user) < cart_item.quantity:
+                        raise Exception(f'Insufficient stock for {product.name} ({variant.size}, {variant.color})')
                 
                 # Create order item
                 OrderItem.objects.create(
                     order=order,
                     product=product,
+                    variant=variant,
                     product_name=product.name,
+                    size=variant.size,
+                    color=variant.color,
                     product_price=product.price,
                     quantity=cart_item.quantity,
                     subtotal=cart_item.subtotal
                 )
-                
-                # Update product stock and sold count
-                product.stock -= cart_item.quantity
-                product.sold += cart_item.quantity
-                product.save()
             
-            # Clear cart
+            # Update variant and product stock and sold counts in one go
+            take_stock({cart_item.variant_id: cart_item.quantity for cart_item in cart_items})
+            
+            # Count the basket into "customers also bought" once it is saved;
+            # robust so a failure there cannot turn a placed order into a 400
+            product_ids = [cart_item.product_id for cart_item in cart_items]
+            transaction.on_commit(lambda: record_basket(product_ids), robust=True)
+            
+            # Clear cart (and with it the converted holds)
             cart_items.delete()
             
             order_serializer = OrderSerializer(order)
@@ -201,7 +265,7 @@ def orders_list_view(request):
     Get user's orders
     """
     orders = Order.objects.filter(user=request.user)
-    serializer = OrderSerializer(orders, many=True)
+    serializer = FastOrderSerializer(orders)
     return Response(serializer.data, status=status.HTTP_200_OK)
 
 @api_view(['GET'])
@@ -224,26 +288,17 @@ def cancel_order_view(request, order_id):
     Cancel order
     """
     try:
-        order = Order.objects.get(pk=order_id, user=request.user)
-        
-        if order.order_status in ['delivered', 'cancelled']:
-            return Response({
-                'error': 'Cannot cancel this order'
-            }, status=status.HTTP_400_BAD_REQUEST)
-        
-        order.order_status = 'cancelled'
-        order.save()
-        
-        # Restore product stock
-        for item in order.items.all():
-            if item.product:
-                item.product.stock += item.quantity
-                item.product.sold -= item.quantity
-                item.product.save()
-        
-        return Response({'message': 'Order cancelled successfully'}, status=status.HTTP_200_OK)
+        # Compare-and-set transition: a double cancel cannot restore stock twice
+        transition(order_id, 'cancelled', changed_by=request.user,
+                   queryset=Order.objects.filter(user=request.user))
     except Order.DoesNotExist:
         return Response({'error': 'Order not found'}, status=status.HTTP_404_NOT_FOUND)
+    except InvalidTransition:
+        return Response({
+            'error': 'Cannot cancel this order'
+        }, status=status.HTTP_400_BAD_REQUEST)
+    
+    return Response({'message': 'Order cancelled successfully'}, status=status.HTTP_200_OK)
 
 # Admin Order Views
 @api_view(['GET'])
@@ -253,7 +308,7 @@ def admin_orders_view(request):
     Get all orders (Admin only)
     """
     orders = Order.objects.all()
-    serializer = OrderSerializer(orders, many=True)
+    serializer = FastOrderSerializer(orders)
     return Response(serializer.data, status=status.HTTP_200_OK)
 
 @api_view(['PUT'])
@@ -262,20 +317,52 @@ def update_order_status_view(request, order_id):
     """
     Update order status (Admin only)
     """
+    order_status = request.data.get('order_status')
+    
+    if order_status not in dict(Order.ORDER_STATUS):
+        return Response({'error': 'Invalid order status'}, status=status.HTTP_400_BAD_REQUEST)
+    
     try:
-        order = Order.objects.get(pk=order_id)
-        order_status = request.data.get('order_status')
-        
-        if order_status not in dict(Order.ORDER_STATUS):
-            return Response({'error': 'Invalid order status'}, status=status.HTTP_400_BAD_REQUEST)
-        
-        order.order_status = order_status
-        order.save()
-        
-        serializer = OrderSerializer(order)
-        return Response({
-            'message': 'Order status updated successfully',
-            'order': serializer.data
-        }, status=status.HTTP_200_OK)
+        transition(order_id, order_status, changed_by=request.user)
     except Order.DoesNotExist:
-        return Response({'error': 'Order not found'}, status=status.HTTP_404_NOT_FOUND)
\ No newline at end of file
+        return Response({'error': 'Order not found'}, status=status.HTTP_404_NOT_FOUND)
+    except InvalidTransition as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    
+    serializer = OrderSerializer(Order.objects.get(pk=order_id))
+    return Response({
+        'message': 'Order status updated successfully',
+        'order': serializer.data
+    }, status=status.HTTP_200_OK)
+
+# Upper bound on orders per bulk status update call
+BULK_STATUS_UPDATE_LIMIT = 1000
+
+@api_view(['POST'])
+@permission_classes([IsAdminUser])
+def bulk_update_order_status_view(request):
+    """
+    Update the status of many orders at once (Admin only)
+    """
+    order_status = request.data.get('order_status')
+    order_ids = request.data.get('order_ids')
+    
+    if order_status not in dict(Order.ORDER_STATUS):
+        return Response({'error': 'Invalid order status'}, status=status.HTTP_400_BAD_REQUEST)
+    
+    try:
+        order_ids = [int(order_id) for order_id in order_ids]
+    except (TypeError, ValueError):
+        return Response({'error': 'order_ids must be a list of order ids'}, status=status.HTTP_400_BAD_REQUEST)
+    
+    if len(order_ids) > BULK_STATUS_UPDATE_LIMIT:
+        return Response({
+            'error': f'At most {BULK_STATUS_UPDATE_LIMIT} orders can be updated per call'
+        }, status=status.HTTP_400_BAD_REQUEST)
+    
+    updated, skipped = bulk_transition(order_ids, order_status, changed_by=request.user)
+    return Response({
+        'message': f'{len(updated)} orders updated',
+        'updated': updated,
+        'skipped': [{'id': order_id, 'error': error} for order_id, error in sorted(skipped.items())]
+    }, status=status.HTTP_200_OK)
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Category, Product, Review, Favorite
+from .models import Category, Product, ProductHistory, ProductVariant, Review, Favorite, StockEvent
 
 @admin.register(Category)
 class CategoryAdmin(admin.ModelAdmin):
@@ -7,21 +7,29 @@ class CategoryAdmin(admin.ModelAdmin):
     search_fields = ['name']
     readonly_fields = ['created_at']
 
+class ProductVariantInline(admin.TabularInline):
+    model = ProductVariant
+    extra = 1
+    fields = ['size', 'color', 'stock', 'sold']
+    readonly_fields = ['sold']
+
 @admin.register(Product)
 class ProductAdmin(admin.ModelAdmin):
-    list_display = ['name', 'category', 'price', 'stock', 'sold', 'size', 'color', 'average_rating', 'is_active', 'created_at']
-    list_filter = ['category', 'size', 'is_active', 'created_at']
-    search_fields = ['name', 'description', 'brand']
-    readonly_fields = ['sold', 'average_rating', 'total_reviews', 'created_at', 'updated_at']
+    list_display = ['name', 'category', 'price', 'stock', 'sold', 'average_rating', 'is_active', 'created_at']
+    list_filter = ['category', 'variants__size', 'is_active', 'created_at']
+    search_fields = ['name', 'description', 'brand', 'sku']
+    # Stock and sold are totals over the variants
+    readonly_fields = ['stock', 'sold', 'average_rating', 'total_reviews', 'created_at', 'updated_at']
+    inlines = [ProductVariantInline]
     fieldsets = (
         ('Basic Information', {
-            'fields': ('name', 'description', 'category', 'brand')
+            'fields': ('sku', 'name', 'description', 'category', 'brand')
         }),
         ('Pricing & Stock', {
             'fields': ('price', 'stock', 'sold')
         }),
         ('Product Details', {
-            'fields': ('size', 'color', 'material')
+            'fields': ('material',)
         }),
         ('Images', {
             'fields': ('image', 'image2', 'image3')
@@ -49,4 +57,18 @@ class FavoriteAdmin(admin.ModelAdmin):
     list_display = ['user', 'product', 'created_at']
     list_filter = ['created_at']
     search_fields = ['user__username', 'product__name']
-    readonly_fields = ['created_at']
\ No newline at end of file
+    readonly_fields = ['created_at']
+
+@admin.register(StockEvent)
+class StockEventAdmin(admin.ModelAdmin):
+    list_display = ['product', 'level', 'stock_before', 'stock_after', 'created_at']
+    list_filter = ['level', 'created_at']
+    search_fields = ['product__name']
+    readonly_fields = ['product', 'level', 'stock_before', 'stock_after', 'created_at']
+
+@admin.register(ProductHistory)
+class ProductHistoryAdmin(admin.ModelAdmin):
+    list_display = ['product', 'price', 'stock', 'recorded_at']
+    list_filter = ['recorded_at']
+    search_fields = ['product__name']
+    readonly_fields = ['product', 'price', 'stock', 'recorded_at']
@@ -0,0 +1,195 @@
+"""
+Catalog import and export.
+
+Files are CSV (with a header row) or JSONL (one object per line) holding
+the CATALOG_FIELDS columns, one row per variant: the product columns are
+repeated on every size/color row of a product and matched on its SKU,
+variants on (product, size, color). Rows are read lazily, validated and
+then upserted a batch at a time with one INSERT ... ON CONFLICT DO UPDATE
+per table, so a seasonal catalog costs a few queries per batch instead of
+several per product. Categories come from an in-memory map built once per
+import.
+
+Exports stream the same columns, so an exported file imports unchanged.
+"""
+
+import csv
+import json
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from rest_framework.exceptions import ValidationError
+from ecommerce_backend.db import bulk_upsert
+from .models import Category, Product, ProductVariant
+from .serializers import CatalogRowSerializer
+from .stock import sync_totals
+
+FORMATS = ['csv', 'jsonl']
+CONTENT_TYPES = {'csv': 'text/csv', 'jsonl': 'application/x-ndjson'}
+
+CATALOG_FIELDS = [
+    'sku', 'name', 'description', 'price', 'category', 'stock', 'size', 'color',
+    'material', 'brand', 'image', 'image2', 'image3', 'is_active',
+]
+
+VARIANT_FIELDS = ['size', 'color', 'stock']
+
+# Overwritten when the SKU already exists; created_at, the stock totals and
+# sold are kept
+UPDATE_FIELDS = [name for name in CATALOG_FIELDS if name not in ('sku', *VARIANT_FIELDS)] + ['updated_at']
+
+BATCH_SIZE = 500
+MAX_REPORTED_ERRORS = 100
+
+
+class CatalogError(Exception):
+    pass
+
+
+def detect_format(filename, requested=None):
+    """
+    ``requested`` if given, otherwise from the file extension
+    """
+    file_format = (requested or filename.rsplit('.', 1)[-1]).lower()
+    if file_format == 'ndjson':
+        file_format = 'jsonl'
+    if file_format not in FORMATS:
+        raise CatalogError(f'Unsupported catalog format "{file_format}", expected one of {", ".join(FORMATS)}')
+    return file_format
+
+
+def read_rows(lines, file_format):
+    """
+    Yield (line number, row) from an iterable of text lines. Empty CSV cells
+    are dropped so that optional columns fall back to their defaults.
+    """
+    if file_format == 'csv':
+        reader = csv.DictReader(lines)
+        for row in reader:
+            yield reader.line_num, {key: value for key, value in row.items() if key and value not in ('', None)}
+        return
+    for number, line in enumerate(lines, 1):
+        if not line.strip():
+            continue
+        try:
+            yield number, json.loads(line)
+        except ValueError:
+            yield number, 'Invalid JSON'
+
+
+def category_map():
+    """
+    Lower-cased category code and display name -> id
+    """
+    categories = {}
+    for category in Category.objects.all():
+        categories[category.name.lower()] = category.pk
+        categories[str(category.get_name_display()).lower()] = category.pk
+    return categories
+
+
+class CatalogImporter:
+    """
+    Validates and upserts catalog rows in batches. Invalid rows are skipped
+    and reported with their line number; the valid ones are still imported.
+    """
+
+    def __init__(self, batch_size=BATCH_SIZE, dry_run=False):
+        self.batch_size = batch_size
+        self.dry_run = dry_run
+        # One bound serializer reused for every row
+        self.row_serializer = CatalogRowSerializer(context={'categories': category_map()})
+        self.result = {'created': 0, 'updated': 0, 'variants': 0, 'invalid': 0, 'errors': []}
+
+    def validate(self, row):
+        if not isinstance(row, dict):
+            raise ValidationError({'non_field_errors': [row if isinstance(row, str) else 'Expected an object']})
+        return self.row_serializer.run_validation(row)
+
+    def reject(self, number, detail):
+        self.result['invalid'] += 1
+        if len(self.result['errors']) < MAX_REPORTED_ERRORS:
+            self.result['errors'].append({'line': number, 'errors': detail})
+
+    def run(self, rows):
+        batch = []
+        for number, row in rows:
+            try:
+                batch.append(self.validate(row))
+            except ValidationError as exc:
+                self.reject(number, exc.detail)
+                continue
+            if len(batch) >= self.batch_size:
+                self.flush(batch)
+                batch = []
+        if batch:
+            self.flush(batch)
+        return self.result
+
+    def flush(self, batch):
+        # A key repeated within the batch would hit the same row twice in one
+        # statement, which PostgreSQL rejects; the last row wins
+        products = {row['sku']: row for row in batch}
+        variants = {(row['sku'], row['size'], row['color']): row for row in batch}
+        with transaction.atomic():
+            existing = Product.objects.filter(sku__in=products).count()
+            self.result['created'] += len(products) - existing
+            self.result['updated'] += existing
+            self.result['variants'] += len(variants)
+            if self.dry_run:
+                return
+
+            bulk_upsert(Product, [
+                Product(
+                    category_id=row['category'],
+                    **{name: row[name] for name in CATALOG_FIELDS if name not in ('category', *VARIANT_FIELDS)}
+                )
+                for row in products.values()
+            ], ['sku'], UPDATE_FIELDS)
+            ids = dict(Product.objects.filter(sku__in=products).values_list('sku', 'id'))
+            bulk_upsert(ProductVariant, [
+                ProductVariant(product_id=ids[sku], size=size, color=color, stock=row['stock'])
+                for (sku, size, color), row in variants.items()
+            ], ['product', 'size', 'color'], ['stock'])
+
+            # bulk_create skips post_save, so sync what the signals would have
+            # (stock events included)
+            sync_totals(ids.values())
+
+
+def export_rows(queryset=None):
+    """
+    One catalog row per variant of the ``queryset`` products (all by
+    default), read in chunks
+    """
+    queryset = Product.objects.all() if queryset is None else queryset
+    lookups = [
+        name if name in VARIANT_FIELDS else 'product__category__name' if name == 'category' else f'product__{name}'
+        for name in CATALOG_FIELDS
+    ]
+    variants = ProductVariant.objects.filter(product__in=queryset).order_by('product_id', 'pk')
+    for row in variants.values_list(*lookups).iterator(chunk_size=2000):
+        yield dict(zip(CATALOG_FIELDS, row))
+
+
+class Echo:
+    """
+    File-like object handing back whatever csv.writer writes to it
+    """
+
+    def write(self, value):
+        return value
+
+
+def stream_csv(rows):
+    writer = csv.writer(Echo())
+    yield writer.writerow(CATALOG_FIELDS)
+    for row in rows:
+        yield writer.writerow([row[name] for name in CATALOG_FIELDS])
+
+
+def stream_jsonl(rows):
+    for row in rows:
+        yield json.dumps(row, cls=DjangoJSONEncoder) + '\n'
+
+
+STREAMERS = {'csv': stream_csv, 'jsonl': stream_jsonl}
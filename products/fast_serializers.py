@@ -0,0 +1,199 @@
+"""
+Serializer-bypass fast path for list endpoints.
+
+A ValuesSerializer declares its output as an ordered list of field specs.
+The specs are compiled once per class into (key, getter) pairs plus the
+list of .values() lookups they need, so rendering a page is one query and
+one dict comprehension per row, with no model instances and no DRF field
+traversal. Decimal and datetime columns reuse the DRF field's
+to_representation so the JSON stays byte-identical to the ModelSerializer.
+"""
+
+from operator import itemgetter
+from django.db.models import QuerySet
+from rest_framework import serializers
+from .models import Category
+
+
+class Column:
+    """
+    A single .values() column, optionally converted for output
+    """
+
+    def __init__(self, lookup, to_representation=None):
+        self.lookup = lookup
+        self.to_representation = to_representation
+
+    def compile(self, prefix):
+        lookup = prefix + self.lookup
+        convert = self.to_representation
+        if convert is None:
+            return [lookup], itemgetter(lookup)
+
+        def getter(row):
+            value = row[lookup]
+            return None if value is None else convert(value)
+
+        return [lookup], getter
+
+
+class Computed:
+    """
+    A value derived from one or more .values() columns
+    """
+
+    def __init__(self, function, *lookups):
+        self.function = function
+        self.lookups = lookups
+
+    def compile(self, prefix):
+        lookups = [prefix + lookup for lookup in self.lookups]
+        function = self.function
+
+        def getter(row):
+            return function(*[row[lookup] for lookup in lookups])
+
+        return lookups, getter
+
+
+class Nested:
+    """
+    A forward relation rendered with another ValuesSerializer
+    """
+
+    def __init__(self, serializer_class, lookup):
+        self.serializer_class = serializer_class
+        self.lookup = lookup
+
+    def compile(self, prefix):
+        lookups, plan = self.serializer_class.compile(prefix + self.lookup + '__')
+
+        def getter(row):
+            return {key: get(row) for key, get in plan}
+
+        return lookups, getter
+
+
+class ValuesSerializer:
+    """
+    Base class for the fast serializers; subclasses set ``fields`` to a list
+    of (output key, spec) pairs in the same order as the DRF serializer.
+    """
+
+    fields = []
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls.lookups, cls.plan = cls.compile('')
+
+    @classmethod
+    def compile(cls, prefix):
+        lookups = []
+        plan = []
+        for key, spec in cls.fields:
+            spec_lookups, getter = spec.compile(prefix)
+            for lookup in spec_lookups:
+                if lookup not in lookups:
+                    lookups.append(lookup)
+            plan.append((key, getter))
+        return lookups, plan
+
+    def __init__(self, queryset):
+        # A queryset, or rows already fetched with .values() (e.g. a page)
+        self.queryset = queryset
+        self.rows = None
+
+    @classmethod
+    def render(cls, row):
+        return {key: get(row) for key, get in cls.plan}
+
+    @property
+    def data(self):
+        if isinstance(self.queryset, QuerySet):
+            self.rows = list(self.queryset.values(*self.lookups))
+        else:
+            self.rows = list(self.queryset)
+        return [self.render(row) for row in self.rows]
+
+
+CATEGORY_DISPLAY = dict(Category.CATEGORY_CHOICES)
+
+price_field = serializers.DecimalField(max_digits=10, decimal_places=2)
+rating_field = serializers.DecimalField(max_digits=3, decimal_places=2)
+datetime_field = serializers.DateTimeField()
+
+
+def category_display(code):
+    return str(CATEGORY_DISPLAY.get(code, code))
+
+
+def display_image(image, image2, image3):
+    if image:
+        return str(image)
+    if image2:
+        return str(image2)
+    if image3:
+        return str(image3)
+    return None
+
+
+def in_stock(stock):
+    return stock > 0
+
+
+class FastProductListSerializer(ValuesSerializer):
+    """
+    Fast equivalent of ProductListSerializer
+    """
+
+    fields = [
+        ('id', Column('id')),
+        ('name', Column('name')),
+        ('price', Column('price', price_field.to_representation)),
+        ('category', Column('category_id')),
+        ('category_name', Computed(category_display, 'category__name')),
+        ('category_code', Column('category__name')),
+        ('variants', Column('listing__variants')),
+        ('brand', Column('brand')),
+        ('display_image', Computed(display_image, 'image', 'image2', 'image3')),
+        ('average_rating', Column('average_rating', rating_field.to_representation)),
+        ('total_reviews', Column('total_reviews')),
+        ('in_stock', Computed(in_stock, 'stock')),
+    ]
+
+
+class FastProductListingSerializer(ValuesSerializer):
+    """
+    Fast equivalent of ProductListingSerializer, for product_listings rows
+    fetched with .values(*ProductListingSerializer.VALUES_FIELDS,
+    id=F('product_id'))
+    """
+
+    fields = [
+        ('id', Column('id')),
+        ('name', Column('name')),
+        ('price', Column('price', price_field.to_representation)),
+        ('category', Column('category')),
+        ('category_name', Column('category_name')),
+        ('category_code', Column('category_code')),
+        ('variants', Column('variants')),
+        ('brand', Column('brand')),
+        ('display_image', Column('display_image')),
+        ('average_rating', Column('average_rating', rating_field.to_representation)),
+        ('total_reviews', Column('total_reviews')),
+        ('in_stock', Column('in_stock')),
+    ]
+
+
+class FastFavoriteSerializer(ValuesSerializer):
+    """
+    Fast equivalent of FavoriteSerializer
+    """
+
+    fields = [
+        ('id', Column('id')),
+        ('user', Column('user_id')),
+        ('product', Column('product_id')),
+        ('product_details', Nested(FastProductListSerializer, 'product')),
+        ('created_at', Column('created_at', datetime_field.to_representation)),
+    ]
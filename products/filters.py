@@ -0,0 +1,34 @@
+from django.db.models import Exists, OuterRef
+from django_filters import rest_framework as filters
+from .models import ProductListing, ProductVariant
+
+
+class ProductListingFilter(filters.FilterSet):
+    """
+    ``size`` and ``color`` match products with a variant of that size and
+    color (the same variant when both are given), as one EXISTS on the
+    product_variants indexes
+    """
+
+    size = filters.ChoiceFilter(choices=ProductVariant.SIZE_CHOICES, method='filter_variant')
+    color = filters.CharFilter(method='filter_variant')
+
+    class Meta:
+        model = ProductListing
+        fields = ['category', 'size', 'color']
+
+    def filter_variant(self, queryset, name, value):
+        # Both variant filters are applied together in filter_queryset
+        return queryset
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        variant = {
+            name: self.form.cleaned_data[name]
+            for name in ('size', 'color')
+            if self.form.cleaned_data.get(name)
+        }
+        if variant:
+            variants = ProductVariant.objects.filter(product=OuterRef('product'), **variant)
+            queryset = queryset.filter(Exists(variants))
+        return queryset
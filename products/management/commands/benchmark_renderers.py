@@ -0,0 +1,91 @@
+import gzip
+from decimal import Decimal
+from timeit import timeit
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIRequestFactory, force_authenticate
+from ecommerce_backend.renderers import FastJSONRenderer, orjson
+from ecommerce_backend.middleware import brotli
+from products.models import Category, Product, ProductVariant, Review
+from products.stock import sync_totals
+from products.views import admin_products_view
+
+User = get_user_model()
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = "Benchmark JSON rendering and compression of a large admin_products_view response (seeded rows are rolled back)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--products", type=int, default=500)
+        parser.add_argument("--reviews", type=int, default=5, help="Reviews per product")
+        parser.add_argument("--repeat", type=int, default=10)
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                self.run(options["products"], options["reviews"], options["repeat"])
+                raise Rollback
+        except Rollback:
+            pass
+
+    def seed(self, products, reviews):
+        admin = User.objects.create_superuser("benchmark-admin", "benchmark-admin@example.com", "benchmark-pass")
+        reviewers = [
+            User.objects.create_user(f"benchmark-{i}", f"benchmark-{i}@example.com", "benchmark-pass")
+            for i in range(reviews)
+        ]
+        category, _ = Category.objects.get_or_create(name="street")
+        for i in range(products):
+            product = Product.objects.create(
+                name=f"Benchmark {i}", description="Heavyweight cotton tee " * 10, price=Decimal("799.00"),
+                category=category, material="Cotton",
+                brand="Bench", image="https://img.example.com/bench.jpg",
+            )
+            ProductVariant.objects.bulk_create([
+                ProductVariant(product=product, size=size, color="White", stock=i % 7)
+                for size in ["S", "M", "L", "XL"]
+            ])
+            sync_totals([product.pk])
+            Review.objects.bulk_create([
+                Review(product=product, user=reviewer, rating=4, comment="Fits well, good fabric.")
+                for reviewer in reviewers
+            ])
+        return admin
+
+    def run(self, products, reviews, repeat):
+        admin = self.seed(products, reviews)
+        request = APIRequestFactory().get("/api/products/admin/all/", {"page_size": 200})
+        force_authenticate(request, user=admin)
+        data = admin_products_view(request).data
+
+        stdlib = JSONRenderer()
+        fast = FastJSONRenderer()
+        body = stdlib.render(data)
+        if body != fast.render(data):
+            raise CommandError("FastJSONRenderer output differs from JSONRenderer")
+
+        stdlib_time = timeit(lambda: stdlib.render(data), number=repeat) / repeat
+        fast_time = timeit(lambda: fast.render(data), number=repeat) / repeat
+        backend = "orjson" if orjson is not None else "stdlib fallback"
+        self.stdout.write(f"{products} products x {reviews} reviews, {len(body) / 1024:.1f} KiB of JSON")
+        self.stdout.write(f"  JSONRenderer      {stdlib_time * 1000:8.2f} ms")
+        self.stdout.write(
+            f"  FastJSONRenderer  {fast_time * 1000:8.2f} ms  ({backend}, {stdlib_time / fast_time:.1f}x)"
+        )
+
+        gzip_time = timeit(lambda: gzip.compress(body, 6), number=repeat) / repeat
+        self.stdout.write(
+            f"  gzip              {gzip_time * 1000:8.2f} ms  {len(gzip.compress(body, 6)) / 1024:8.1f} KiB"
+        )
+        if brotli is not None:
+            br_time = timeit(lambda: brotli.compress(body, quality=5), number=repeat) / repeat
+            self.stdout.write(
+                f"  brotli (q=5)      {br_time * 1000:8.2f} ms  {len(brotli.compress(body, quality=5)) / 1024:8.1f} KiB"
+            )
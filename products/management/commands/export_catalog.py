@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+from products.catalog import STREAMERS, export_rows
+
+
+class Command(BaseCommand):
+    help = "Stream every product to a CSV or JSONL catalog file (stdout by default)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--output", "-o")
+        parser.add_argument("--format", dest="file_format", choices=["csv", "jsonl"], default="csv")
+
+    def handle(self, *args, **options):
+        chunks = STREAMERS[options["file_format"]](export_rows())
+        if options["output"]:
+            with open(options["output"], "w", encoding="utf-8", newline="") as output:
+                output.writelines(chunks)
+        else:
+            for chunk in chunks:
+                self.stdout.write(chunk, ending="")
@@ -0,0 +1,36 @@
+import json
+from django.core.management.base import BaseCommand, CommandError
+from products.catalog import BATCH_SIZE, CatalogError, CatalogImporter, detect_format, read_rows
+
+
+class Command(BaseCommand):
+    help = "Upsert products by SKU from a CSV or JSONL catalog file"
+
+    def add_arguments(self, parser):
+        parser.add_argument("path")
+        parser.add_argument("--format", dest="file_format", choices=["csv", "jsonl"])
+        parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+        parser.add_argument("--dry-run", action="store_true", help="Only validate the file")
+
+    def handle(self, *args, **options):
+        try:
+            file_format = detect_format(options["path"], options["file_format"])
+        except CatalogError as exc:
+            raise CommandError(str(exc))
+
+        importer = CatalogImporter(batch_size=options["batch_size"], dry_run=options["dry_run"])
+        with open(options["path"], encoding="utf-8-sig", newline="") as lines:
+            result = importer.run(read_rows(lines, file_format))
+
+        for error in result["errors"]:
+            self.stderr.write(f"Line {error['line']}: {json.dumps(error['errors'])}")
+        if result["invalid"] > len(result["errors"]):
+            self.stderr.write(f"... {result['invalid'] - len(result['errors'])} more invalid rows")
+
+        verb = "Would import" if options["dry_run"] else "Imported"
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{verb} {result['created']} new and {result['updated']} existing products, "
+                f"skipped {result['invalid']} invalid rows"
+            )
+        )
@@ -1,7 +1,6 @@
 from django.core.management.base import BaseCommand
 from django.conf import settings
 from products.models import Product
-import cloudinary.uploader
 import os
 
 
@@ -9,6 +8,8 @@ class Command(BaseCommand):
     help = "Migrate local product images to Cloudinary"
 
     def handle(self, *args, **kwargs):
+        import cloudinary.uploader
+
         migrated_count = 0
 
         # BASE_DIR points to backend/
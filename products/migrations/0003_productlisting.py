@@ -0,0 +1,90 @@
+# Generated by Django 6.0 on 2026-10-19 06:21
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def backfill_listings(apps, schema_editor):
+    Product = apps.get_model("products", "Product")
+    ProductListing = apps.get_model("products", "ProductListing")
+    db = schema_editor.connection.alias
+
+    listings = []
+    for product in Product.objects.using(db).select_related("category").iterator():
+        listings.append(
+            ProductListing(
+                product_id=product.pk,
+                name=product.name,
+                price=product.price,
+                category_id=product.category_id,
+                category_code=product.category.name,
+                category_name=product.category.get_name_display(),
+                size=product.size,
+                color=product.color,
+                brand=product.brand,
+                display_image=product.image or product.image2 or product.image3 or None,
+                average_rating=product.average_rating,
+                total_reviews=product.total_reviews,
+                in_stock=product.stock > 0,
+                is_active=product.is_active,
+                created_at=product.created_at,
+            )
+        )
+    ProductListing.objects.using(db).bulk_create(listings, batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("products", "0002_alter_product_image_alter_product_image2_and_more"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ProductListing",
+            fields=[
+                (
+                    "product",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="listing",
+                        serialize=False,
+                        to="products.product",
+                    ),
+                ),
+                ("name", models.CharField(max_length=255)),
+                ("price", models.DecimalField(decimal_places=2, max_digits=10)),
+                ("category_code", models.CharField(max_length=100)),
+                ("category_name", models.CharField(max_length=100)),
+                ("size", models.CharField(max_length=10)),
+                ("color", models.CharField(max_length=50)),
+                ("brand", models.CharField(max_length=100)),
+                (
+                    "display_image",
+                    models.URLField(blank=True, max_length=500, null=True),
+                ),
+                (
+                    "average_rating",
+                    models.DecimalField(decimal_places=2, default=0.0, max_digits=3),
+                ),
+                ("total_reviews", models.PositiveIntegerField(default=0)),
+                ("in_stock", models.BooleanField(default=False)),
+                ("is_active", models.BooleanField(default=True)),
+                ("created_at", models.DateTimeField()),
+                (
+                    "category",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="listings",
+                        to="products.category",
+                    ),
+                ),
+            ],
+            options={
+                "db_table": "product_listings",
+                "ordering": ["-created_at"],
+            },
+        ),
+        migrations.RunPython(backfill_listings, migrations.RunPython.noop),
+    ]
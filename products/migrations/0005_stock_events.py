@@ -0,0 +1,63 @@
+# Generated by Django 6.0 on 2026-10-19 06:26
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("products", "0004_admin_product_indexes"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="StockEvent",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "level",
+                    models.CharField(
+                        choices=[
+                            ("in_stock", "In Stock"),
+                            ("low_stock", "Low Stock"),
+                            ("out_of_stock", "Out of Stock"),
+                        ],
+                        max_length=20,
+                    ),
+                ),
+                ("stock_before", models.PositiveIntegerField()),
+                ("stock_after", models.PositiveIntegerField()),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                "db_table": "stock_events",
+                "ordering": ["id"],
+            },
+        ),
+        migrations.AddIndex(
+            model_name="product",
+            index=models.Index(
+                condition=models.Q(("is_active", True), ("stock__lte", 5)),
+                fields=["stock"],
+                name="products_low_stock_idx",
+            ),
+        ),
+        migrations.AddField(
+            model_name="stockevent",
+            name="product",
+            field=models.ForeignKey(
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="stock_events",
+                to="products.product",
+            ),
+        ),
+    ]
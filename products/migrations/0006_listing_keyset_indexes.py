@@ -0,0 +1,34 @@
+# Generated by Django 6.0 on 2026-10-19 06:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("products", "0005_stock_events"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="productlisting",
+            index=models.Index(
+                fields=["is_active", "created_at", "product"],
+                name="listings_active_created_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="productlisting",
+            index=models.Index(
+                fields=["is_active", "price", "product"],
+                name="listings_active_price_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="productlisting",
+            index=models.Index(
+                fields=["is_active", "average_rating", "product"],
+                name="listings_active_rating_idx",
+            ),
+        ),
+    ]
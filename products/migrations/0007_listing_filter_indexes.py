@@ -0,0 +1,89 @@
+# Generated by Django 6.0 on 2026-10-19 06:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("products", "0006_listing_keyset_indexes"),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name="productlisting",
+            name="listings_active_created_idx",
+        ),
+        migrations.RemoveIndex(
+            model_name="productlisting",
+            name="listings_active_price_idx",
+        ),
+        migrations.RemoveIndex(
+            model_name="productlisting",
+            name="listings_active_rating_idx",
+        ),
+        migrations.AddIndex(
+            model_name="productlisting",
+            index=models.Index(
+                condition=models.Q(("is_active", True)),
+                fields=["created_at", "product"],
+                name="listings_active_created_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="productlisting",
+            index=models.Index(
+                condition=models.Q(("is_active", True)),
+                fields=["price", "product"],
+                name="listings_active_price_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="productlisting",
+            index=models.Index(
+                condition=models.Q(("is_active", True)),
+                fields=["average_rating", "product"],
+                name="listings_active_rating_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="productlisting",
+            index=models.Index(
+                condition=models.Q(("is_active", True)),
+                fields=["category", "created_at", "product"],
+                name="listings_cat_created_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="productlisting",
+            index=models.Index(
+                condition=models.Q(("is_active", True)),
+                fields=["category", "price", "product"],
+                name="listings_cat_price_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="productlisting",
+            index=models.Index(
+                condition=models.Q(("is_active", True)),
+                fields=["category", "average_rating", "product"],
+                name="listings_cat_rating_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="productlisting",
+            index=models.Index(
+                condition=models.Q(("is_active", True)),
+                fields=["size", "color", "created_at", "product"],
+                name="listings_size_color_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="productlisting",
+            index=models.Index(
+                condition=models.Q(("is_active", True)),
+                fields=["color", "created_at", "product"],
+                name="listings_color_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,77 @@
+# Generated by Django 6.0 on 2026-10-19 06:39
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("products", "0008_product_sku"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="productlisting",
+            name="variants",
+            field=models.JSONField(default=list),
+        ),
+        migrations.CreateModel(
+            name="ProductVariant",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "size",
+                    models.CharField(
+                        choices=[
+                            ("XS", "Extra Small"),
+                            ("S", "Small"),
+                            ("M", "Medium"),
+                            ("L", "Large"),
+                            ("XL", "Extra Large"),
+                            ("XXL", "Double Extra Large"),
+                        ],
+                        max_length=10,
+                    ),
+                ),
+                ("color", models.CharField(max_length=50)),
+                ("stock", models.PositiveIntegerField(default=0)),
+                ("sold", models.PositiveIntegerField(default=0)),
+                (
+                    "product",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="variants",
+                        to="products.product",
+                    ),
+                ),
+            ],
+            options={
+                "db_table": "product_variants",
+                "ordering": ["id"],
+                "indexes": [
+                    models.Index(
+                        fields=["size", "color", "product"],
+                        name="variants_size_color_idx",
+                    ),
+                    models.Index(
+                        fields=["color", "product"], name="variants_color_idx"
+                    ),
+                ],
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("product", "size", "color"),
+                        name="variants_product_size_color_uniq",
+                    )
+                ],
+            },
+        ),
+    ]
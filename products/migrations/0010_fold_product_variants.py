@@ -0,0 +1,155 @@
+from collections import defaultdict
+from django.db import migrations
+from django.db.models import Avg, Count
+
+
+def fold_key(product):
+    """
+    Products that only differ in size, color and stock are one garment
+    """
+    return (
+        product.category_id,
+        product.name.strip().lower(),
+        product.brand.strip().lower(),
+        product.material.strip().lower(),
+        product.price,
+        product.is_active,
+    )
+
+
+def fold_product_variants(apps, schema_editor):
+    Product = apps.get_model("products", "Product")
+    ProductVariant = apps.get_model("products", "ProductVariant")
+    ProductListing = apps.get_model("products", "ProductListing")
+    Review = apps.get_model("products", "Review")
+    Favorite = apps.get_model("products", "Favorite")
+    StockEvent = apps.get_model("products", "StockEvent")
+    Cart = apps.get_model("orders", "Cart")
+    OrderItem = apps.get_model("orders", "OrderItem")
+    StockReservation = apps.get_model("orders", "StockReservation")
+    db = schema_editor.connection.alias
+
+    # Holds only last a few minutes; checkout falls back to a stock check
+    StockReservation.objects.using(db).all().delete()
+
+    groups = defaultdict(list)
+    for product in Product.objects.using(db).order_by("pk").iterator():
+        groups[fold_key(product)].append(product)
+
+    for products in groups.values():
+        # The oldest row survives as the parent and keeps its id
+        parent, duplicates = products[0], products[1:]
+        duplicate_ids = [product.pk for product in duplicates]
+
+        variants = {}
+        for product in products:
+            variant = variants.get((product.size, product.color))
+            if variant is None:
+                variant = variants[(product.size, product.color)] = ProductVariant(
+                    product=parent, size=product.size, color=product.color
+                )
+            variant.stock += product.stock
+            variant.sold += product.sold
+        for variant in variants.values():
+            variant.save(using=db)
+
+        for product in products:
+            variant = variants[(product.size, product.color)]
+            OrderItem.objects.using(db).filter(product=product).update(
+                product=parent, variant=variant, size=product.size, color=product.color
+            )
+            for cart_item in Cart.objects.using(db).filter(product=product):
+                existing = (
+                    Cart.objects.using(db)
+                    .filter(user_id=cart_item.user_id, variant=variant)
+                    .first()
+                )
+                if existing is None:
+                    cart_item.product = parent
+                    cart_item.variant = variant
+                    cart_item.save(using=db, update_fields=["product", "variant"])
+                else:
+                    existing.quantity += cart_item.quantity
+                    existing.save(using=db, update_fields=["quantity"])
+                    cart_item.delete(using=db)
+
+        if duplicates:
+            # One review and one favorite per user. A review already on the
+            # parent is kept; otherwise the user's newest review among the
+            # duplicates moves over
+            reviewers = set(
+                Review.objects.using(db)
+                .filter(product=parent)
+                .values_list("user_id", flat=True)
+            )
+            for review in (
+                Review.objects.using(db)
+                .filter(product_id__in=duplicate_ids)
+                .order_by("-updated_at", "-pk")
+            ):
+                if review.user_id in reviewers:
+                    review.delete(using=db)
+                else:
+                    reviewers.add(review.user_id)
+                    Review.objects.using(db).filter(pk=review.pk).update(product=parent)
+            favorited = set(
+                Favorite.objects.using(db)
+                .filter(product=parent)
+                .values_list("user_id", flat=True)
+            )
+            for favorite in (
+                Favorite.objects.using(db)
+                .filter(product_id__in=duplicate_ids)
+                .order_by("pk")
+            ):
+                if favorite.user_id in favorited:
+                    favorite.delete(using=db)
+                else:
+                    favorited.add(favorite.user_id)
+                    Favorite.objects.using(db).filter(pk=favorite.pk).update(
+                        product=parent
+                    )
+            StockEvent.objects.using(db).filter(product_id__in=duplicate_ids).update(
+                product=parent
+            )
+            Product.objects.using(db).filter(pk__in=duplicate_ids).delete()
+
+        ratings = (
+            Review.objects.using(db)
+            .filter(product=parent)
+            .aggregate(average=Avg("rating"), total=Count("pk"))
+        )
+        parent.stock = sum(variant.stock for variant in variants.values())
+        parent.sold = sum(variant.sold for variant in variants.values())
+        parent.total_reviews = ratings["total"]
+        parent.average_rating = round(ratings["average"] or 0, 2)
+        parent.save(
+            using=db, update_fields=["stock", "sold", "total_reviews", "average_rating"]
+        )
+
+        ProductListing.objects.using(db).filter(pk=parent.pk).update(
+            variants=[
+                {
+                    "id": variant.pk,
+                    "size": variant.size,
+                    "color": variant.color,
+                    "in_stock": variant.stock > 0,
+                }
+                for variant in sorted(variants.values(), key=lambda variant: variant.pk)
+            ],
+            in_stock=parent.stock > 0,
+            average_rating=parent.average_rating,
+            total_reviews=parent.total_reviews,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("products", "0009_product_variants"),
+        ("orders", "0006_variants"),
+    ]
+
+    operations = [
+        migrations.RunPython(fold_product_variants, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 6.0 on 2026-10-19 06:40
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("products", "0010_fold_product_variants"),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name="productlisting",
+            name="listings_size_color_idx",
+        ),
+        migrations.RemoveIndex(
+            model_name="productlisting",
+            name="listings_color_idx",
+        ),
+        migrations.RemoveField(
+            model_name="product",
+            name="color",
+        ),
+        migrations.RemoveField(
+            model_name="product",
+            name="size",
+        ),
+        migrations.RemoveField(
+            model_name="productlisting",
+            name="color",
+        ),
+        migrations.RemoveField(
+            model_name="productlisting",
+            name="size",
+        ),
+    ]
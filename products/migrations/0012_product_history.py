@@ -0,0 +1,74 @@
+# Generated by Django 6.0 on 2026-10-19 06:45
+
+import itertools
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+def seed_product_history(apps, schema_editor):
+    """
+    Start every product's history at its current price and stock
+    """
+    Product = apps.get_model("products", "Product")
+    ProductHistory = apps.get_model("products", "ProductHistory")
+    db = schema_editor.connection.alias
+    now = django.utils.timezone.now()
+    rows = (
+        ProductHistory(product_id=pk, price=price, stock=stock, recorded_at=now)
+        for pk, price, stock in Product.objects.using(db)
+        .values_list("pk", "price", "stock")
+        .iterator()
+    )
+    while batch := list(itertools.islice(rows, 500)):
+        ProductHistory.objects.using(db).bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("products", "0011_remove_product_size_color"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ProductHistory",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("price", models.DecimalField(decimal_places=2, max_digits=10)),
+                ("stock", models.PositiveIntegerField()),
+                (
+                    "recorded_at",
+                    models.DateTimeField(default=django.utils.timezone.now),
+                ),
+                (
+                    "product",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="history",
+                        to="products.product",
+                    ),
+                ),
+            ],
+            options={
+                "db_table": "product_history",
+                "ordering": ["-recorded_at", "-id"],
+                "indexes": [
+                    models.Index(
+                        fields=["product", "recorded_at", "id"],
+                        name="history_product_recorded_idx",
+                    )
+                ],
+            },
+        ),
+        migrations.RunPython(seed_product_history, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,69 @@
+# Generated by Django 6.0 on 2026-10-19 06:49
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("products", "0013_recommendations"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ProductRanking",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "kind",
+                    models.CharField(
+                        choices=[
+                            ("best_sellers", "Best Sellers"),
+                            ("trending", "Trending"),
+                            ("top_rated", "Top Rated"),
+                        ],
+                        max_length=20,
+                    ),
+                ),
+                ("rank", models.PositiveSmallIntegerField()),
+                ("score", models.FloatField()),
+                (
+                    "category",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="rankings",
+                        to="products.category",
+                    ),
+                ),
+                (
+                    "product",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="rankings",
+                        to="products.product",
+                    ),
+                ),
+            ],
+            options={
+                "db_table": "product_rankings",
+                "ordering": ["kind", "category", "rank"],
+                "indexes": [
+                    models.Index(
+                        fields=["kind", "category", "rank"],
+                        name="rankings_kind_category_idx",
+                    )
+                ],
+            },
+        ),
+    ]
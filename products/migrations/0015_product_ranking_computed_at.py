@@ -0,0 +1,19 @@
+# Generated by Django 6.0 on 2026-10-19 07:18
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("products", "0014_rankings"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="productranking",
+            name="computed_at",
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+    ]
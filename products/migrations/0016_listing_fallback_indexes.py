@@ -0,0 +1,42 @@
+from django.db import migrations, models
+
+# Plain twins of the partial ProductListing indexes. Backends without
+# partial indexes (MySQL, MariaDB) skip every index declared with a
+# condition, and 0007 dropped the plain 0006 ones, so there the list
+# endpoint had no index at all. These lead with is_active instead and
+# are only created where the partial ones are skipped.
+FALLBACK_INDEXES = [
+    models.Index(fields=["is_active", "created_at", "product"], name="listings_all_created_idx"),
+    models.Index(fields=["is_active", "price", "product"], name="listings_all_price_idx"),
+    models.Index(fields=["is_active", "average_rating", "product"], name="listings_all_rating_idx"),
+    models.Index(fields=["category", "is_active", "created_at", "product"], name="listings_all_cat_created_idx"),
+    models.Index(fields=["category", "is_active", "price", "product"], name="listings_all_cat_price_idx"),
+    models.Index(fields=["category", "is_active", "average_rating", "product"], name="listings_all_cat_rating_idx"),
+]
+
+
+def add_fallback_indexes(apps, schema_editor):
+    if schema_editor.connection.features.supports_partial_indexes:
+        return
+    ProductListing = apps.get_model("products", "ProductListing")
+    for index in FALLBACK_INDEXES:
+        schema_editor.add_index(ProductListing, index)
+
+
+def remove_fallback_indexes(apps, schema_editor):
+    if schema_editor.connection.features.supports_partial_indexes:
+        return
+    ProductListing = apps.get_model("products", "ProductListing")
+    for index in FALLBACK_INDEXES:
+        schema_editor.remove_index(ProductListing, index)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("products", "0015_product_ranking_computed_at"),
+    ]
+
+    operations = [
+        migrations.RunPython(add_fallback_indexes, remove_fallback_indexes),
+    ]
@@ -1,9 +1,17 @@
 from django.db import models
+from django.db.models import OuterRef, Subquery
+from django.utils import timezone
 from django.contrib.auth import get_user_model
-from cloudinary.models import CloudinaryField
+from ecommerce_backend.db import bulk_upsert
 
 User = get_user_model()
 
+# Stock at or below this is "low"; also baked into products_low_stock_idx
+LOW_STOCK_THRESHOLD = 5
+
+# Predicate of the partial product_listings indexes
+ACTIVE_LISTING = models.Q(is_active=True)
+
 class Category(models.Model):
     CATEGORY_CHOICES = [
         ('professional', 'Professional Wear'),
@@ -26,27 +34,20 @@ class Category(models.Model):
         return self.get_name_display()
 
 class Product(models.Model):
-    SIZE_CHOICES = [
-        ('XS', 'Extra Small'),
-        ('S', 'Small'),
-        ('M', 'Medium'),
-        ('L', 'Large'),
-        ('XL', 'Extra Large'),
-        ('XXL', 'Double Extra Large'),
-    ]
+    LOW_STOCK_THRESHOLD = LOW_STOCK_THRESHOLD
     
+    # Natural key for catalog imports; optional for products created by hand
+    sku = models.CharField(max_length=64, unique=True, null=True, blank=True)
     name = models.CharField(max_length=255)
     description = models.TextField()
     price = models.DecimalField(max_digits=10, decimal_places=2)
     category = models.ForeignKey(Category, on_delete=models.CASCADE, related_name='products')
     
-    # Stock management
+    # Stock management: totals over the variants, kept in step by stock.py
     stock = models.PositiveIntegerField(default=0)
     sold = models.PositiveIntegerField(default=0)
     
-    # Product details
-    size = models.CharField(max_length=10, choices=SIZE_CHOICES)
-    color = models.CharField(max_length=50)
+    # Product details (size and color live on ProductVariant)
     material = models.CharField(max_length=100)
     brand = models.CharField(max_length=100)
     
@@ -71,6 +72,18 @@ class Product(models.Model):
     class Meta:
         db_table = 'products'
         ordering = ['-created_at']
+        indexes = [
+            # Admin product list: filter by active state, sort/filter by stock level
+            models.Index(fields=['is_active', 'stock'], name='products_active_stock_idx'),
+            models.Index(fields=['stock'], name='products_stock_idx'),
+            models.Index(fields=['created_at'], name='products_created_idx'),
+            # Low-stock admin list; partial where the backend supports it (not MySQL)
+            models.Index(
+                fields=['stock'],
+                name='products_low_stock_idx',
+                condition=models.Q(is_active=True, stock__lte=LOW_STOCK_THRESHOLD),
+            ),
+        ]
     
     def __str__(self):
         return self.name
@@ -79,6 +92,244 @@ class Product(models.Model):
     def in_stock(self):
         return self.stock > 0
 
+class ProductVariant(models.Model):
+    """
+    One size and color of a product, with its own stock. Product.stock and
+    Product.sold hold the totals over the variants (see stock.py).
+    """
+    SIZE_CHOICES = [
+        ('XS', 'Extra Small'),
+        ('S', 'Small'),
+        ('M', 'Medium'),
+        ('L', 'Large'),
+        ('XL', 'Extra Large'),
+        ('XXL', 'Double Extra Large'),
+    ]
+    
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='variants')
+    size = models.CharField(max_length=10, choices=SIZE_CHOICES)
+    color = models.CharField(max_length=50)
+    stock = models.PositiveIntegerField(default=0)
+    sold = models.PositiveIntegerField(default=0)
+    
+    class Meta:
+        db_table = 'product_variants'
+        ordering = ['id']
+        constraints = [
+            # Also the conflict target of catalog imports
+            models.UniqueConstraint(fields=['product', 'size', 'color'], name='variants_product_size_color_uniq'),
+        ]
+        indexes = [
+            # Size/color filters of the product list (EXISTS per listing row)
+            models.Index(fields=['size', 'color', 'product'], name='variants_size_color_idx'),
+            models.Index(fields=['color', 'product'], name='variants_color_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.product.name} ({self.size}, {self.color})"
+    
+    @property
+    def in_stock(self):
+        return self.stock > 0
+
+class StockEvent(models.Model):
+    """
+    Append-only feed of stock level crossings (in stock -> low -> out of stock
+    and back), polled by admins with an id cursor.
+    """
+    LEVEL_CHOICES = [
+        ('in_stock', 'In Stock'),
+        ('low_stock', 'Low Stock'),
+        ('out_of_stock', 'Out of Stock'),
+    ]
+    
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='stock_events')
+    level = models.CharField(max_length=20, choices=LEVEL_CHOICES)
+    stock_before = models.PositiveIntegerField()
+    stock_after = models.PositiveIntegerField()
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        db_table = 'stock_events'
+        ordering = ['id']
+    
+    def __str__(self):
+        return f"{self.product_id}: {self.stock_before} -> {self.stock_after} ({self.level})"
+    
+    @staticmethod
+    def level_for(stock):
+        if stock == 0:
+            return 'out_of_stock'
+        if stock <= Product.LOW_STOCK_THRESHOLD:
+            return 'low_stock'
+        return 'in_stock'
+    
+    @classmethod
+    def record(cls, changes):
+        """
+        Store an event for every (product_id, stock_before, stock_after)
+        change that moves the product to another stock level
+        """
+        events = [
+            cls(product_id=product_id, level=cls.level_for(after), stock_before=before, stock_after=after)
+            for product_id, before, after in changes
+            if cls.level_for(before) != cls.level_for(after)
+        ]
+        if events:
+            cls.objects.bulk_create(events)
+        return events
+
+class ProductHistory(models.Model):
+    """
+    Append-only log of product price and stock. A row is only written when
+    either value differs from the product's previous row, so the price or
+    stock at any moment is the newest row recorded at or before it.
+    """
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='history')
+    price = models.DecimalField(max_digits=10, decimal_places=2)
+    stock = models.PositiveIntegerField()
+    recorded_at = models.DateTimeField(default=timezone.now)
+    
+    class Meta:
+        db_table = 'product_history'
+        ordering = ['-recorded_at', '-id']
+        indexes = [
+            # as_of(): one backwards seek per product
+            models.Index(fields=['product', 'recorded_at', 'id'], name='history_product_recorded_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.product_id} @ {self.recorded_at}: {self.price} / {self.stock}"
+    
+    @classmethod
+    def snapshot(cls, product_ids, now=None):
+        """
+        Append a row for each of the given products whose price or stock
+        changed since its last row. One SELECT and one batched INSERT,
+        whatever the number of products.
+        """
+        now = now or timezone.now()
+        latest = cls.objects.filter(product=OuterRef('pk')).order_by('-recorded_at', '-id')
+        products = (
+            Product.objects.filter(pk__in=list(product_ids))
+            .annotate(
+                last_price=Subquery(latest.values('price')[:1]),
+                last_stock=Subquery(latest.values('stock')[:1]),
+            )
+            .values_list('pk', 'price', 'stock', 'last_price', 'last_stock')
+        )
+        rows = [
+            cls(product_id=pk, price=price, stock=stock, recorded_at=now)
+            for pk, price, stock, last_price, last_stock in products
+            if (price, stock) != (last_price, last_stock)
+        ]
+        if rows:
+            cls.objects.bulk_create(rows, batch_size=500)
+        return rows
+    
+    @classmethod
+    def as_of(cls, product_id, when):
+        """
+        The row in effect for ``product_id`` at ``when``, or None if the
+        history starts later
+        """
+        return (
+            cls.objects.filter(product_id=product_id, recorded_at__lte=when)
+            .order_by('-recorded_at', '-id')
+            .first()
+        )
+
+class ProductCooccurrence(models.Model):
+    """
+    Sparse item-item matrix of how often two products were bought in the same
+    order or favorited by the same user (weighted, see
+    orders/recommendations.py). Each pair is stored in both directions so a
+    product's row of the matrix is one index range.
+    """
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='+')
+    other = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='+')
+    score = models.PositiveIntegerField(default=0)
+    
+    class Meta:
+        db_table = 'product_cooccurrence'
+        constraints = [
+            models.UniqueConstraint(fields=['product', 'other'], name='cooccurrence_pair_uniq'),
+        ]
+        indexes = [
+            # Top-K ranking of one product's neighbours
+            models.Index(fields=['product', '-score', 'other'], name='cooccurrence_rank_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.product_id} ~ {self.other_id}: {self.score}"
+
+class ProductRecommendation(models.Model):
+    """
+    Top-K "customers also bought" neighbours of a product, materialized from
+    ProductCooccurrence so the detail page reads them in one index range.
+    """
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='recommendations')
+    recommended = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='recommended_in')
+    rank = models.PositiveSmallIntegerField()
+    score = models.PositiveIntegerField()
+    
+    class Meta:
+        db_table = 'product_recommendations'
+        ordering = ['product', 'rank']
+        constraints = [
+            models.UniqueConstraint(fields=['product', 'rank'], name='recommendations_product_rank_uniq'),
+        ]
+    
+    def __str__(self):
+        return f"{self.product_id} #{self.rank}: {self.recommended_id}"
+
+class ProductRanking(models.Model):
+    """
+    Materialized best-seller, trending and top-rated lists, overall
+    (category null) and per category, rebuilt by the compute_rankings
+    command (see orders/rankings.py).
+    """
+    KIND_CHOICES = [
+        ('best_sellers', 'Best Sellers'),
+        ('trending', 'Trending'),
+        ('top_rated', 'Top Rated'),
+    ]
+    
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    category = models.ForeignKey(Category, on_delete=models.CASCADE, null=True, blank=True, related_name='rankings')
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='rankings')
+    rank = models.PositiveSmallIntegerField()
+    score = models.FloatField()
+    # Shared by all rows of one compute; the cache version of the kind
+    computed_at = models.DateTimeField(default=timezone.now)
+    
+    class Meta:
+        db_table = 'product_rankings'
+        ordering = ['kind', 'category', 'rank']
+        indexes = [
+            models.Index(fields=['kind', 'category', 'rank'], name='rankings_kind_category_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.kind} #{self.rank}: {self.product_id}"
+    
+    @staticmethod
+    def cache_key(kind, category):
+        """
+        Cache key of one ranking list. Its version is the kind's
+        computed_at, read from the database (a few dozen rows per kind),
+        so a recompute in any process moves every worker to a new key
+        whatever cache each one uses.
+        """
+        version = (
+            ProductRanking.objects.filter(kind=kind)
+            .order_by('-computed_at')
+            .values_list('computed_at', flat=True)
+            .first()
+        )
+        version = version.timestamp() if version else 0
+        return f"product_rankings:{version}:{kind}:{category or 'all'}"
+
 class Review(models.Model):
     product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='reviews')
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='reviews')
@@ -100,6 +351,12 @@ class Review(models.Model):
         # Update product average rating
         self.update_product_rating()
     
+    def delete(self, *args, **kwargs):
+        deleted = super().delete(*args, **kwargs)
+        # Take the review back out of the rating (and the listing row)
+        self.update_product_rating()
+        return deleted
+    
     def update_product_rating(self):
         product = self.product
         reviews = product.reviews.all()
@@ -118,4 +375,104 @@ class Favorite(models.Model):
         unique_together = ['user', 'product']
     
     def __str__(self):
-        return f"{self.user.username} - {self.product.name}"
\ No newline at end of file
+        return f"{self.user.username} - {self.product.name}"
+
+
+class ProductListing(models.Model):
+    """
+    Flat read model holding exactly the fields rendered on a product list card,
+    variants included. Kept in sync with Product, ProductVariant and Category
+    through signals (see signals.py) and refresh() after bulk writes.
+    """
+    product = models.OneToOneField(Product, on_delete=models.CASCADE, primary_key=True, related_name='listing')
+    name = models.CharField(max_length=255)
+    price = models.DecimalField(max_digits=10, decimal_places=2)
+    category = models.ForeignKey(Category, on_delete=models.CASCADE, related_name='listings')
+    category_code = models.CharField(max_length=100)
+    category_name = models.CharField(max_length=100)
+    brand = models.CharField(max_length=100)
+    display_image = models.URLField(max_length=500, blank=True, null=True)
+    average_rating = models.DecimalField(max_digits=3, decimal_places=2, default=0.0)
+    total_reviews = models.PositiveIntegerField(default=0)
+    # [{"id", "size", "color", "in_stock"}] for every variant, in id order
+    variants = models.JSONField(default=list)
+    in_stock = models.BooleanField(default=False)
+    is_active = models.BooleanField(default=True)
+    created_at = models.DateTimeField()
+
+    # Columns copied from the product by sync() and refresh()
+    SYNCED_FIELDS = [
+        'name', 'price', 'category', 'category_code', 'category_name', 'brand', 'display_image',
+        'average_rating', 'total_reviews', 'variants', 'in_stock', 'is_active', 'created_at',
+    ]
+
+    class Meta:
+        db_table = 'product_listings'
+        ordering = ['-created_at']
+        indexes = [
+            # ProductListView category x ordering matrix, with the pk as keyset
+            # tiebreaker (size and color are matched on product_variants). All
+            # partial on active rows, which also matches the bare "WHERE
+            # is_active" Django emits for filter(is_active=True). MySQL has no
+            # partial indexes and skips these; migration 0016 gives it plain
+            # ones leading with is_active instead.
+            models.Index(fields=['created_at', 'product'], name='listings_active_created_idx', condition=ACTIVE_LISTING),
+            models.Index(fields=['price', 'product'], name='listings_active_price_idx', condition=ACTIVE_LISTING),
+            models.Index(fields=['average_rating', 'product'], name='listings_active_rating_idx', condition=ACTIVE_LISTING),
+            models.Index(fields=['category', 'created_at', 'product'], name='listings_cat_created_idx', condition=ACTIVE_LISTING),
+            models.Index(fields=['category', 'price', 'product'], name='listings_cat_price_idx', condition=ACTIVE_LISTING),
+            models.Index(fields=['category', 'average_rating', 'product'], name='listings_cat_rating_idx', condition=ACTIVE_LISTING),
+        ]
+
+    def __str__(self):
+        return self.name
+
+    @staticmethod
+    def values_from_product(product):
+        """
+        Column values of the listing row for ``product``
+        """
+        category = product.category
+        return {
+            'name': product.name,
+            'price': product.price,
+            'category_id': category.pk,
+            'category_code': category.name,
+            'category_name': category.get_name_display(),
+            'brand': product.brand,
+            'display_image': str(product.image or product.image2 or product.image3 or '') or None,
+            'average_rating': product.average_rating,
+            'total_reviews': product.total_reviews,
+            'variants': [
+                {'id': variant.pk, 'size': variant.size, 'color': variant.color, 'in_stock': variant.in_stock}
+                for variant in product.variants.all()
+            ],
+            'in_stock': product.in_stock,
+            'is_active': product.is_active,
+            'created_at': product.created_at,
+        }
+
+    @classmethod
+    def refresh(cls, product_ids):
+        """
+        Rebuild the listing rows for the given products, e.g. after
+        queryset.update() calls that bypass the post_save signal
+        """
+        products = (
+            Product.objects.filter(pk__in=list(product_ids))
+            .select_related('category')
+            .prefetch_related('variants')
+        )
+        listings = [cls(product=product, **cls.values_from_product(product)) for product in products]
+        if listings:
+            bulk_upsert(cls, listings, ['product'], cls.SYNCED_FIELDS, batch_size=500)
+
+    @classmethod
+    def sync(cls, product):
+        """
+        Upsert the listing row for a single product
+        """
+        values = cls.values_from_product(product)
+        if not cls.objects.filter(pk=product.pk).update(**values):
+            cls.objects.create(product=product, **values)
+
@@ -1,5 +1,8 @@
 from rest_framework import serializers
-from .models import Category, Product, Review, Favorite
+from django.db import transaction
+from .models import Category, Product, ProductHistory, ProductVariant, Review, Favorite, StockEvent
+from .stock import sync_totals
+from ecommerce_backend.db import bulk_upsert
 from django.contrib.auth import get_user_model
 
 User = get_user_model()
@@ -33,25 +36,39 @@ class ReviewSerializer(serializers.ModelSerializer):
         read_only_fields = ["id", "user", "created_at", "updated_at"]
 
 
+class ProductVariantSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = ProductVariant
+        fields = ["id", "size", "color", "stock", "sold", "in_stock"]
+        read_only_fields = ["id", "sold"]
+
+
 class ProductSerializer(serializers.ModelSerializer):
+    """
+    Product with its variants. ``variants`` is required on create; on update
+    the given variants are upserted by size and color and the others kept.
+    ``stock`` and ``sold`` are the totals over the variants.
+    """
+
     category_name = serializers.CharField(
         source="category.get_name_display", read_only=True
     )
+    variants = ProductVariantSerializer(many=True, required=False)
     reviews = ReviewSerializer(many=True, read_only=True)
 
     class Meta:
         model = Product
         fields = [
             "id",
+            "sku",
             "name",
             "description",
             "price",
             "category",
             "category_name",
+            "variants",
             "stock",
             "sold",
-            "size",
-            "color",
             "material",
             "brand",
             "image",
@@ -67,6 +84,7 @@ class ProductSerializer(serializers.ModelSerializer):
         ]
         read_only_fields = [
             "id",
+            "stock",
             "sold",
             "average_rating",
             "total_reviews",
@@ -74,12 +92,105 @@ class ProductSerializer(serializers.ModelSerializer):
             "updated_at",
         ]
 
+    def validate_sku(self, value):
+        # Store "no SKU" as NULL so the unique index allows many of them
+        return value or None
+
+    def validate_variants(self, value):
+        keys = [(variant["size"], variant["color"]) for variant in value]
+        if len(set(keys)) != len(keys):
+            raise serializers.ValidationError("Each size and color may only be listed once.")
+        return value
+
+    def validate(self, attrs):
+        if self.instance is None and not attrs.get("variants"):
+            raise serializers.ValidationError({"variants": "At least one variant is required."})
+        return attrs
+
+    def create(self, validated_data):
+        variants = validated_data.pop("variants")
+        with transaction.atomic():
+            # Inserted with its stock total already, so the history row the
+            # post_save signal writes is the product's only one
+            validated_data["stock"] = sum(variant.get("stock", 0) for variant in variants)
+            product = super().create(validated_data)
+            ProductVariant.objects.bulk_create(
+                [ProductVariant(product=product, **variant) for variant in variants]
+            )
+            sync_totals([product.pk])
+        product.refresh_from_db()
+        return product
+
+    def update(self, instance, validated_data):
+        variants = validated_data.pop("variants", None)
+        with transaction.atomic():
+            product = super().update(instance, validated_data)
+            if variants is not None:
+                bulk_upsert(
+                    ProductVariant,
+                    [ProductVariant(product=product, **variant) for variant in variants],
+                    ["product", "size", "color"],
+                    ["stock"],
+                )
+                sync_totals([product.pk])
+                product.refresh_from_db()
+        return product
+
+
+class SparseFieldsMixin:
+    """
+    Lets the caller pass ``fields=[...]`` to keep only a subset of the
+    serializer fields (sparse fieldsets); unknown names are ignored.
+    """
+
+    def __init__(self, *args, **kwargs):
+        fields = kwargs.pop("fields", None)
+        super().__init__(*args, **kwargs)
+        if fields:
+            for field_name in set(self.fields) - set(fields):
+                self.fields.pop(field_name)
+
+
+class AdminProductListSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    """
+    Lightweight product row for the admin product list, without nested reviews
+    (prefetch ``variants`` when listing)
+    """
+
+    category_name = serializers.CharField(
+        source="category.get_name_display", read_only=True
+    )
+    variants = ProductVariantSerializer(many=True, read_only=True)
+
+    class Meta:
+        model = Product
+        fields = [
+            "id",
+            "sku",
+            "name",
+            "price",
+            "category",
+            "category_name",
+            "variants",
+            "stock",
+            "sold",
+            "brand",
+            "image",
+            "average_rating",
+            "total_reviews",
+            "in_stock",
+            "is_active",
+            "created_at",
+            "updated_at",
+        ]
+
 
 class ProductListSerializer(serializers.ModelSerializer):
     category_name = serializers.CharField(
         source="category.get_name_display", read_only=True
     )
     category_code = serializers.CharField(source="category.name", read_only=True)
+    variants = serializers.JSONField(source="listing.variants", read_only=True)
 
     display_image = serializers.SerializerMethodField()
 
@@ -92,8 +203,7 @@ class ProductListSerializer(serializers.ModelSerializer):
             "category",
             "category_name",
             "category_code",
-            "size",
-            "color",
+            "variants",
             "brand",
             "display_image",
             "average_rating",
@@ -111,6 +221,33 @@ class ProductListSerializer(serializers.ModelSerializer):
         return None
 
 
+class ProductListingSerializer(serializers.Serializer):
+    """
+    Renders ProductListing rows fetched with .values(); output matches
+    ProductListSerializer field for field.
+    """
+
+    id = serializers.IntegerField(read_only=True)
+    name = serializers.CharField(read_only=True)
+    price = serializers.DecimalField(max_digits=10, decimal_places=2, read_only=True)
+    category = serializers.IntegerField(read_only=True)
+    category_name = serializers.CharField(read_only=True)
+    category_code = serializers.CharField(read_only=True)
+    variants = serializers.JSONField(read_only=True)
+    brand = serializers.CharField(read_only=True)
+    display_image = serializers.CharField(read_only=True)
+    average_rating = serializers.DecimalField(max_digits=3, decimal_places=2, read_only=True)
+    total_reviews = serializers.IntegerField(read_only=True)
+    in_stock = serializers.BooleanField(read_only=True)
+
+    # Columns read from the product_listings table
+    VALUES_FIELDS = [
+        "name", "price", "category", "category_name", "category_code",
+        "variants", "brand", "display_image",
+        "average_rating", "total_reviews", "in_stock",
+    ]
+
+
 class FavoriteSerializer(serializers.ModelSerializer):
     product_details = ProductListSerializer(source="product", read_only=True)
 
@@ -118,3 +255,55 @@ class FavoriteSerializer(serializers.ModelSerializer):
         model = Favorite
         fields = ["id", "user", "product", "product_details", "created_at"]
         read_only_fields = ["id", "user", "created_at"]
+
+
+class StockEventSerializer(serializers.ModelSerializer):
+    product_name = serializers.CharField(source="product.name", read_only=True)
+
+    class Meta:
+        model = StockEvent
+        fields = [
+            "id",
+            "product",
+            "product_name",
+            "level",
+            "stock_before",
+            "stock_after",
+            "created_at",
+        ]
+
+
+class ProductHistorySerializer(serializers.ModelSerializer):
+    class Meta:
+        model = ProductHistory
+        fields = ["product", "price", "stock", "recorded_at"]
+
+
+class CatalogRowSerializer(serializers.Serializer):
+    """
+    One row of a catalog import file, i.e. one variant. ``category`` may be
+    the category code or its display name and is resolved through
+    ``context["categories"]`` (lower-cased name -> id), so validating a row
+    never queries.
+    """
+
+    sku = serializers.CharField(max_length=64)
+    name = serializers.CharField(max_length=255)
+    description = serializers.CharField(allow_blank=True, default="")
+    price = serializers.DecimalField(max_digits=10, decimal_places=2, min_value=0)
+    category = serializers.CharField()
+    stock = serializers.IntegerField(min_value=0, default=0)
+    size = serializers.ChoiceField(choices=ProductVariant.SIZE_CHOICES)
+    color = serializers.CharField(max_length=50)
+    material = serializers.CharField(max_length=100, allow_blank=True, default="")
+    brand = serializers.CharField(max_length=100)
+    image = serializers.URLField(max_length=500)
+    image2 = serializers.URLField(max_length=500, allow_null=True, default=None)
+    image3 = serializers.URLField(max_length=500, allow_null=True, default=None)
+    is_active = serializers.BooleanField(default=True)
+
+    def validate_category(self, value):
+        try:
+            return self.context["categories"][value.strip().lower()]
+        except KeyError:
+            raise serializers.ValidationError(f'Unknown category "{value}".')
@@ -0,0 +1,51 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from .models import Category, Product, ProductHistory, ProductListing, ProductVariant
+from .stock import sync_totals
+
+
+@receiver(post_save, sender=Product)
+def sync_product_listing(sender, instance, raw=False, **kwargs):
+    """
+    Mirror every product write into the list-card read model
+    """
+    if raw:
+        return
+    ProductListing.sync(instance)
+
+
+@receiver(post_save, sender=Product)
+def record_product_history(sender, instance, raw=False, **kwargs):
+    """
+    Append price and stock edits to the product history
+    """
+    if raw:
+        return
+    ProductHistory.snapshot([instance.pk])
+
+
+@receiver(post_save, sender=ProductVariant)
+@receiver(post_delete, sender=ProductVariant)
+def sync_variant_totals(sender, instance, raw=False, origin=None, **kwargs):
+    """
+    Keep the product stock totals and listing variants in step with
+    single-variant edits (admin inline, shell); bulk paths call
+    sync_totals() themselves
+    """
+    if raw or isinstance(origin, Product):
+        # Deleting the product removes its listing row anyway
+        return
+    sync_totals([instance.product_id])
+
+
+@receiver(post_save, sender=Category)
+def sync_category_listings(sender, instance, raw=False, **kwargs):
+    """
+    Propagate category code and display name to the listing rows
+    """
+    if raw:
+        return
+    ProductListing.objects.filter(category=instance).update(
+        category_code=instance.name,
+        category_name=instance.get_name_display(),
+    )
@@ -0,0 +1,103 @@
+from collections import defaultdict
+from django.db import transaction
+from django.db.models import Case, F, IntegerField, OuterRef, Subquery, Sum, Value, When
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from .models import Product, ProductHistory, ProductListing, ProductVariant, StockEvent
+
+
+def per_row(quantities):
+    """
+    CASE WHEN pk = ... THEN quantity ... END for a ``{pk: quantity}`` dict
+    """
+    return Case(
+        *[When(pk=pk, then=Value(quantity)) for pk, quantity in quantities.items()],
+        default=Value(0),
+        output_field=IntegerField(),
+    )
+
+
+def restore_stock(quantities):
+    """
+    Put ``{variant_id: quantity}`` back into stock and take it off ``sold``
+    (negative quantities take stock out and add to ``sold``), on the
+    variants and on their products' totals, in one UPDATE per table with
+    F() expressions.
+
+    Must run inside a transaction. The product rows and then the variant
+    rows are locked, each in id order to avoid deadlocks with concurrent
+    checkouts, to read the stock levels for the StockEvent feed; the history
+    and listing rows are written here since queryset.update() skips the
+    post_save signal.
+    """
+    if not quantities:
+        return
+
+    variant_products = dict(ProductVariant.objects.filter(pk__in=list(quantities)).values_list('pk', 'product_id'))
+    product_quantities = defaultdict(int)
+    for variant_id, product_id in variant_products.items():
+        product_quantities[product_id] += quantities[variant_id]
+    quantities = {variant_id: quantities[variant_id] for variant_id in variant_products}
+
+    stock_before = dict(
+        Product.objects.select_for_update()
+        .filter(pk__in=list(product_quantities))
+        .order_by('pk')
+        .values_list('pk', 'stock')
+    )
+    list(ProductVariant.objects.select_for_update().filter(pk__in=list(quantities)).order_by('pk').values_list('pk'))
+
+    variant_quantity = per_row(quantities)
+    ProductVariant.objects.filter(pk__in=list(quantities)).update(
+        stock=F('stock') + variant_quantity,
+        sold=F('sold') - variant_quantity,
+    )
+    product_quantity = per_row(product_quantities)
+    Product.objects.filter(pk__in=list(product_quantities)).update(
+        stock=F('stock') + product_quantity,
+        sold=F('sold') - product_quantity,
+        updated_at=timezone.now(),
+    )
+
+    StockEvent.record([
+        (product_id, stock, stock + product_quantities[product_id])
+        for product_id, stock in stock_before.items()
+    ])
+    ProductHistory.snapshot(stock_before)
+    ProductListing.refresh(stock_before)
+
+
+def take_stock(quantities):
+    """
+    Move ``{variant_id: quantity}`` from stock to ``sold`` (see restore_stock)
+    """
+    restore_stock({variant_id: -quantity for variant_id, quantity in quantities.items()})
+
+
+def sync_totals(product_ids):
+    """
+    Recompute Product.stock and Product.sold from the variants, record the
+    stock level crossings, append the changed totals to the history and
+    refresh the listing rows, after variant writes that do not go through
+    restore_stock (admin edits, catalog imports)
+    """
+    product_ids = list(product_ids)
+    variants = ProductVariant.objects.filter(product=OuterRef('pk')).order_by().values('product')
+    with transaction.atomic():
+        # Locked like restore_stock does, so the levels read here are the
+        # ones the update replaces
+        stock_before = dict(
+            Product.objects.select_for_update()
+            .filter(pk__in=product_ids)
+            .order_by('pk')
+            .values_list('pk', 'stock')
+        )
+        Product.objects.filter(pk__in=product_ids).update(
+            stock=Coalesce(Subquery(variants.annotate(total=Sum('stock')).values('total')), 0),
+            sold=Coalesce(Subquery(variants.annotate(total=Sum('sold')).values('total')), 0),
+            updated_at=timezone.now(),
+        )
+        stock_after = dict(Product.objects.filter(pk__in=product_ids).values_list('pk', 'stock'))
+        StockEvent.record([(pk, stock, stock_after[pk]) for pk, stock in stock_before.items()])
+        ProductHistory.snapshot(product_ids)
+        ProductListing.refresh(product_ids)
@@ -1,3 +1,861 @@
-from django.test import TestCase
+import gzip
+import json
+import uuid
+from base64 import urlsafe_b64encode
+from datetime import timedelta
+from decimal import Decimal
+from urllib.parse import parse_qs, urlsplit
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import transaction
+from threading import Thread
+from unittest import mock, skipUnless
+from django.conf import settings
+from django.core.signals import request_finished, request_started
+from django.db import IntegrityError, connections, router
+from django.db.models import F
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.urls import resolve, reverse
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+from ecommerce_backend.db import connection_metrics
+from ecommerce_backend import middleware, renderers
+from ecommerce_backend.middleware import ApiCompressionMiddleware, ReadReplicaMiddleware
+from ecommerce_backend.renderers import FastJSONRenderer
+from ecommerce_backend.query_plans import QueryPlanMixin, analyze
+from .models import Category, Product, ProductHistory, ProductVariant, Favorite, ProductListing, Review, StockEvent
+from .serializers import ProductListSerializer, ProductListingSerializer, FavoriteSerializer
+from .fast_serializers import FastProductListSerializer, FastProductListingSerializer, FastFavoriteSerializer
+from .stock import take_stock
 
-# Create your tests here.
+User = get_user_model()
+
+
+def make_products(category, count):
+    images = [
+        ('https://img.example.com/a.jpg', None, None),
+        ('', 'https://img.example.com/b.jpg', None),
+        ('', '', 'https://img.example.com/c.jpg'),
+        ('', None, None),
+    ]
+    products = []
+    for i in range(count):
+        image, image2, image3 = images[i % len(images)]
+        product = Product.objects.create(
+            name=f'Shirt {i}',
+            description='Cotton shirt',
+            price=Decimal('499.50') + i,
+            category=category,
+            material='Cotton',
+            brand='Acme',
+            image=image,
+            image2=image2,
+            image3=image3,
+            average_rating=Decimal('4.25'),
+        )
+        ProductVariant.objects.create(product=product, size='M', color='Blue', stock=i % 3)
+        product.refresh_from_db()
+        products.append(product)
+    return products
+
+
+class FastSerializerEquivalenceTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('shopper', 'shopper@example.com', 'pass12345')
+        self.category = Category.objects.create(name='party')
+        self.products = make_products(self.category, 8)
+
+    def assertSameJSON(self, slow, fast):
+        renderer = JSONRenderer()
+        self.assertEqual(renderer.render(slow), renderer.render(fast))
+
+    def test_product_list_matches_model_serializer(self):
+        queryset = Product.objects.all()
+        self.assertSameJSON(
+            ProductListSerializer(queryset, many=True).data,
+            FastProductListSerializer(queryset).data,
+        )
+
+    def test_listing_rows_match_listing_serializer(self):
+        Review.objects.create(product=self.products[0], user=self.user, rating=4, comment='Fits well')
+        self.products[1].variants.create(size='L', color='Red', stock=0)
+        rows = ProductListing.objects.values(*ProductListingSerializer.VALUES_FIELDS, id=F('product_id'))
+        self.assertSameJSON(ProductListingSerializer(rows, many=True).data, FastProductListingSerializer(rows).data)
+        # A fetched page, as ProductListView hands it over
+        page = list(rows)[:5]
+        self.assertSameJSON(ProductListingSerializer(page, many=True).data, FastProductListingSerializer(page).data)
+
+    def test_favorites_match_model_serializer(self):
+        for product in self.products[:5]:
+            Favorite.objects.create(user=self.user, product=product)
+        queryset = Favorite.objects.filter(user=self.user).order_by('pk')
+        self.assertSameJSON(
+            FavoriteSerializer(queryset, many=True).data,
+            FastFavoriteSerializer(queryset).data,
+        )
+
+
+@override_settings(RATE_LIMIT_ENABLED=False)
+class ProductListingSyncTest(TestCase):
+    def setUp(self):
+        self.category = Category.objects.create(name='party')
+        self.product = make_products(self.category, 1)[0]
+        self.user = User.objects.create_user('shopper', 'shopper@example.com', 'pass12345')
+
+    def listing(self, *fields):
+        return ProductListing.objects.filter(pk=self.product.pk).values_list(*fields).get()
+
+    def test_product_edits(self):
+        self.product.name = 'Silk Kurta'
+        self.product.price = Decimal('1299.00')
+        self.product.image = ''
+        self.product.image2 = 'https://img.example.com/kurta.jpg'
+        self.product.save()
+        self.assertEqual(
+            self.listing('name', 'price', 'display_image'),
+            ('Silk Kurta', Decimal('1299.00'), 'https://img.example.com/kurta.jpg'),
+        )
+        self.product.is_active = False
+        self.product.save()
+        self.assertEqual(self.listing('is_active'), (False,))
+
+    def test_category_edits(self):
+        self.category.name = 'street'
+        self.category.save()
+        self.assertEqual(self.listing('category_code', 'category_name'), ('street', 'Street Wear'))
+
+        other = Category.objects.create(name='daily')
+        self.product.category = other
+        self.product.save()
+        self.assertEqual(self.listing('category', 'category_code'), (other.pk, 'daily'))
+
+    def test_variant_edits(self):
+        medium = self.product.variants.get()
+        medium.stock = 0
+        medium.save()
+        self.assertEqual(self.listing('in_stock'), (False,))
+
+        large = ProductVariant.objects.create(product=self.product, size='L', color='Red', stock=2)
+        variants, in_stock = self.listing('variants', 'in_stock')
+        self.assertEqual(
+            [(variant['id'], variant['size'], variant['in_stock']) for variant in variants],
+            [(medium.pk, 'M', False), (large.pk, 'L', True)],
+        )
+        self.assertTrue(in_stock)
+
+        large.delete()
+        self.assertEqual([variant['id'] for variant in self.listing('variants')[0]], [medium.pk])
+        self.assertEqual(self.listing('in_stock'), (False,))
+
+    def test_review_edits(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        response = client.post(
+            reverse('create-review', args=[self.product.pk]), {'rating': 3, 'comment': 'Runs small'}, format='json',
+        )
+        self.assertEqual(response.status_code, 201, response.data)
+        Review.objects.create(
+            product=self.product, user=User.objects.create_user('other', 'other@example.com', 'pass12345'),
+            rating=4, comment='Lovely',
+        )
+        self.assertEqual(self.listing('average_rating', 'total_reviews'), (Decimal('3.50'), 2))
+
+        review = Review.objects.get(user=self.user)
+        self.assertEqual(client.delete(reverse('delete-review', args=[review.pk])).status_code, 200)
+        self.assertEqual(self.listing('average_rating', 'total_reviews'), (Decimal('4.00'), 1))
+
+
+class StockAdminViewsTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_superuser('admin', 'admin@example.com', 'pass12345'))
+        self.products = make_products(Category.objects.create(name='party'), 6)
+        self.variants = [product.variants.get() for product in self.products]
+        for variant, stock in zip(self.variants, [6, 0, 5, 20, 3, 1]):
+            self.set_stock(variant, stock)
+        inactive = self.products[5]
+        inactive.is_active = False
+        inactive.save()
+
+    def set_stock(self, variant, stock):
+        # As the admin inline saves a variant
+        variant.stock = stock
+        variant.save()
+
+    def low_stock(self, **params):
+        response = self.client.get(reverse('low-stock-products'), params)
+        self.assertEqual(response.status_code, 200)
+        return [(row['id'], row['stock']) for row in response.data['results']]
+
+    def events(self, **params):
+        response = self.client.get(reverse('stock-events'), params)
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_low_stock_lists_active_products_by_stock(self):
+        shirt, sold_out, low, plenty, lower, _ = self.products
+        self.assertEqual(self.low_stock(), [(sold_out.pk, 0), (lower.pk, 3), (low.pk, 5)])
+        self.assertEqual(self.low_stock(threshold=6), [(sold_out.pk, 0), (lower.pk, 3), (low.pk, 5), (shirt.pk, 6)])
+        self.assertEqual(self.low_stock(threshold=0), [(sold_out.pk, 0)])
+
+        response = self.client.get(reverse('low-stock-products'), {'fields': 'id,stock', 'page_size': 1})
+        self.assertEqual(response.data['count'], 3)
+        self.assertEqual(response.data['results'], [{'id': sold_out.pk, 'stock': 0}])
+        self.assertEqual(self.client.get(reverse('low-stock-products'), {'threshold': 'few'}).status_code, 400)
+
+    def test_variant_edits_feed_stock_events(self):
+        cursor = self.events()['cursor']
+        plenty = self.variants[3]
+        self.set_stock(plenty, 12)
+        self.set_stock(plenty, 4)
+        self.set_stock(plenty, 0)
+        self.set_stock(plenty, 9)
+
+        data = self.events(after=cursor)
+        self.assertEqual(
+            [(event['product'], event['level'], event['stock_before'], event['stock_after']) for event in data['events']],
+            [
+                (plenty.product_id, 'low_stock', 12, 4),
+                (plenty.product_id, 'out_of_stock', 4, 0),
+                (plenty.product_id, 'in_stock', 0, 9),
+            ],
+        )
+        self.assertEqual(data['events'][0]['product_name'], plenty.product.name)
+        self.assertEqual(data['cursor'], data['events'][-1]['id'])
+
+        # Polling from the cursor pages forward and then comes back empty
+        self.assertEqual(len(self.events(after=cursor, limit=2)['events']), 2)
+        self.assertEqual(self.events(after=data['cursor']), {'events': [], 'cursor': data['cursor']})
+        self.assertEqual(self.client.get(reverse('stock-events'), {'after': 'latest'}).status_code, 400)
+
+    def test_product_edit_records_one_event(self):
+        cursor = self.events()['cursor']
+        plenty = self.variants[3]
+        response = self.client.patch(
+            reverse('product-update', args=[plenty.product_id]),
+            {'variants': [{'size': plenty.size, 'color': plenty.color, 'stock': 0}]},
+            format='json',
+        )
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertEqual(
+            [(event['product'], event['level'], event['stock_before'], event['stock_after'])
+             for event in self.events(after=cursor)['events']],
+            [(plenty.product_id, 'out_of_stock', 20, 0)],
+        )
+
+    def test_admin_only(self):
+        self.client.force_authenticate(User.objects.create_user('shopper', 'shopper@example.com', 'pass12345'))
+        self.assertEqual(self.client.get(reverse('low-stock-products')).status_code, 403)
+        self.assertEqual(self.client.get(reverse('stock-events')).status_code, 403)
+
+
+class AdminProductsViewTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser('admin', 'admin@example.com', 'pass12345')
+        cls.products = make_products(Category.objects.create(name='party'), 6)
+        cls.hidden = cls.products[5]
+        cls.hidden.is_active = False
+        cls.hidden.save()
+        for product in cls.products:
+            Review.objects.create(product=product, user=cls.admin, rating=5, comment='Great')
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def get(self, status_code=200, **params):
+        response = self.client.get(reverse('admin-products'), params)
+        self.assertEqual(response.status_code, status_code, response.data)
+        return response.data
+
+    def ids(self, **params):
+        return [row['id'] for row in self.get(**params)['results']]
+
+    def test_lists_inactive_products_newest_first(self):
+        data = self.get()
+        self.assertEqual(data['count'], 6)
+        self.assertEqual([row['id'] for row in data['results']], [product.pk for product in reversed(self.products)])
+        self.assertFalse(data['results'][0]['is_active'])
+
+    def test_rows_leave_reviews_out(self):
+        # Count, products with categories, variants: however many rows
+        with self.assertNumQueries(3):
+            rows = self.get()['results']
+        self.assertNotIn('reviews', rows[0])
+        self.assertEqual(rows[0]['total_reviews'], 1)
+        self.assertEqual(rows[0]['category_name'], 'Party Wear')
+        self.assertEqual([variant['size'] for variant in rows[0]['variants']], ['M'])
+
+    def test_sparse_fieldsets(self):
+        rows = self.get(fields='id, stock,unknown')['results']
+        self.assertEqual(rows[0], {'id': self.hidden.pk, 'stock': self.hidden.stock})
+
+    def test_filters(self):
+        self.assertEqual(len(self.ids(is_active='true')), 5)
+        self.assertEqual(self.ids(is_active='false'), [self.hidden.pk])
+        # Anything else leaves the filter off
+        self.assertEqual(len(self.ids(is_active='yes')), 6)
+
+        stocks = {product.pk: product.stock for product in self.products}
+        self.assertEqual(sorted(self.ids(stock_lte=0)), sorted(pk for pk, stock in stocks.items() if stock <= 0))
+        self.assertEqual(
+            sorted(self.ids(stock_gte=1, stock_lte=1)), sorted(pk for pk, stock in stocks.items() if stock == 1),
+        )
+        self.assertEqual(self.get(400, stock_lte='few'), {'error': 'Stock filters must be integers'})
+        self.assertEqual(self.get(400, stock_gte='1.5'), {'error': 'Stock filters must be integers'})
+
+    def test_ordering_whitelist(self):
+        rows = self.get(ordering='stock')['results']
+        self.assertEqual(
+            [(row['stock'], row['id']) for row in rows],
+            sorted(((product.stock, product.pk) for product in self.products), key=lambda row: (row[0], -row[1])),
+        )
+        self.assertEqual(self.ids(ordering='is_active')[0], self.hidden.pk)
+        self.assertEqual(self.ids(ordering='created_at'), [product.pk for product in self.products])
+        for ordering in ('name', 'category__name', 'password'):
+            self.assertEqual(self.get(400, ordering=ordering), {'error': 'Invalid ordering'})
+
+    def test_page_size(self):
+        category = self.products[0].category
+        Product.objects.bulk_create(
+            Product(name=f'Bulk {i}', description='', price=Decimal('100.00'), category=category)
+            for i in range(200)
+        )
+        data = self.get()
+        self.assertEqual((data['count'], len(data['results'])), (206, 50))
+        self.assertEqual(len(self.get(page=5)['results']), 6)
+        self.assertEqual(len(self.get(page_size=10)['results']), 10)
+        # Capped at 200
+        self.assertEqual(len(self.get(page_size=500)['results']), 200)
+        self.get(404, page=6)
+
+    def test_admin_only(self):
+        self.client.force_authenticate(User.objects.create_user('shopper', 'shopper@example.com', 'pass12345'))
+        self.get(403)
+
+
+@override_settings(RATE_LIMIT_ENABLED=False)
+class ListingQueryPlanTest(QueryPlanMixin, TestCase):
+    """
+    The product list filter x ordering matrix is served from indexes
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        categories = [Category.objects.create(name=code) for code, _ in Category.CATEGORY_CHOICES]
+        sizes = [code for code, _ in ProductVariant.SIZE_CHOICES]
+        colors = ['Black', 'White', 'Blue', 'Red', 'Green', 'Grey', 'Beige', 'Navy']
+        products = Product.objects.bulk_create([
+            Product(
+                name=f'Item {i}',
+                description='Seeded for query plans',
+                price=Decimal(199 + i % 700),
+                category=categories[i % len(categories)],
+                stock=i % 40,
+                material='Cotton',
+                brand='Acme',
+                average_rating=Decimal(i % 500) / 100,
+                is_active=i % 10 != 0,
+            )
+            for i in range(3000)
+        ])
+        ProductVariant.objects.bulk_create([
+            ProductVariant(
+                product=product,
+                size=sizes[(i + offset) % len(sizes)],
+                color=colors[(i + offset) % len(colors)],
+                stock=i % 20,
+            )
+            for i, product in enumerate(products)
+            for offset in (0, 3)
+        ])
+        ProductListing.refresh([product.pk for product in products])
+        analyze()
+        cls.category = categories[1]
+
+    def assertListUsesIndexes(self, counts=False, **params):
+        response = self.assertNoFullScans(
+            self.client.get, reverse('product-list'), params, tables=['product_listings', 'product_variants'], counts=counts
+        )
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def test_default_ordering(self):
+        self.assertListUsesIndexes()
+
+    def test_orderings(self):
+        for ordering in ['price', '-price', 'average_rating', '-average_rating', 'created_at']:
+            with self.subTest(ordering=ordering):
+                self.assertListUsesIndexes(ordering=ordering)
+
+    def test_filters(self):
+        # Counting the products with a variant of some size has to look at
+        # every listing, so counts are only checked for the category filter
+        filters = [
+            ({'category': self.category.pk}, True),
+            ({'size': 'M'}, False),
+            ({'color': 'Navy'}, False),
+            ({'size': 'L', 'color': 'Black'}, False),
+        ]
+        for params, counts in filters:
+            for ordering in ['-created_at', 'price', '-average_rating']:
+                with self.subTest(ordering=ordering, **params):
+                    self.assertListUsesIndexes(counts=counts, ordering=ordering, **params)
+
+    def test_keyset_pages(self):
+        response = self.assertListUsesIndexes(pagination='cursor', category=self.category.pk, ordering='-price')
+        cursor = parse_qs(urlsplit(response.data['next']).query)['cursor'][0]
+        self.assertListUsesIndexes(cursor=cursor, category=self.category.pk, ordering='-price')
+
+
+@override_settings(RATE_LIMIT_ENABLED=False)
+class KeysetPaginationTest(TestCase):
+    def setUp(self):
+        self.products = make_products(Category.objects.create(name='party'), 10)
+        # Plenty of ties, so pages have to split runs of equal values
+        created_at = timezone.now()
+        for i, product in enumerate(self.products):
+            ProductListing.objects.filter(pk=product.pk).update(
+                created_at=created_at - timedelta(days=i // 4), price=Decimal(100 * (1 + i % 3)),
+            )
+        self.rows = list(ProductListing.objects.values('product_id', 'created_at', 'price'))
+
+    def get(self, **params):
+        response = self.client.get(reverse('product-list'), {'pagination': 'cursor', 'page_size': 3, **params})
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def walk(self, ordering):
+        response = self.get(ordering=ordering)
+        ids = [card['id'] for card in response.data['results']]
+        while response.data['next']:
+            response = self.client.get(response.data['next'])
+            ids += [card['id'] for card in response.data['results']]
+        return ids
+
+    def test_pages_neither_repeat_nor_skip_ties(self):
+        for ordering in ['-created_at', 'created_at', '-price', 'price']:
+            with self.subTest(ordering=ordering):
+                field = ordering.lstrip('-')
+                expected = sorted(
+                    self.rows, key=lambda row: (row[field], row['product_id']), reverse=ordering.startswith('-'),
+                )
+                self.assertEqual(self.walk(ordering), [row['product_id'] for row in expected])
+
+    def test_every_ordering_field_is_kept(self):
+        for ordering in ['price,-created_at', '-price,created_at', 'price,created_at']:
+            with self.subTest(ordering=ordering):
+                names = ordering.split(',')
+                # The pk tiebreaker follows the last field's direction;
+                # stable sorts from the last key back give the full order
+                expected = sorted(self.rows, key=lambda row: row['product_id'], reverse=names[-1].startswith('-'))
+                for name in reversed(names):
+                    expected = sorted(expected, key=lambda row: row[name.lstrip('-')], reverse=name.startswith('-'))
+                self.assertEqual(self.walk(ordering), [row['product_id'] for row in expected])
+
+    def test_tampered_cursor_is_not_found(self):
+        def cursor(payload):
+            return urlsafe_b64encode(json.dumps(payload).encode()).decode()
+
+        page = self.get(ordering='price')
+        good = parse_qs(urlsplit(page.data['next']).query)['cursor'][0]
+        cursors = [
+            'not-a-cursor',
+            good[:-4],
+            cursor(['price', '100', 1]),
+            cursor({'o': ['-price', '-pk'], 'v': ['100'], 'pk': 1}),
+            cursor({'o': ['price', 'pk'], 'v': ['cheap'], 'pk': 1}),
+            cursor({'o': ['price', 'pk'], 'v': '1', 'pk': 1}),
+            cursor({'o': ['price', 'pk'], 'v': ['100', '200'], 'pk': 1}),
+            cursor({'o': ['price', 'pk'], 'v': ['100'], 'pk': 'first'}),
+            cursor({'o': ['price', 'pk'], 'pk': 1}),
+        ]
+        for value in cursors:
+            with self.subTest(cursor=value):
+                response = self.client.get(reverse('product-list'), {'cursor': value, 'ordering': 'price'})
+                self.assertEqual(response.status_code, 404)
+
+    def test_count_only_when_asked(self):
+        self.assertNotIn('count', self.get().data)
+        for mode in ['exact', 'estimate']:
+            with self.subTest(count=mode):
+                response = self.get(count=mode)
+                self.assertEqual(response.data['count'], 10)
+                # Later pages do not count again
+                self.assertNotIn('count=', response.data['next'])
+                self.assertNotIn('count', self.client.get(response.data['next']).data)
+
+
+CATALOG_CSV = """sku,name,description,price,category,stock,size,color,material,brand,image,image2,image3,is_active
+TS-001,Linen Shirt,Breathable,899.00,party,10,M,White,Linen,Acme,https://img.example.com/1.jpg,,,true
+TS-001,Linen Shirt,Breathable,899.00,party,3,L,White,Linen,Acme,https://img.example.com/1.jpg,,,true
+TS-002,Denim Jacket,,2499.50,Street Wear,0,L,Blue,Denim,Acme,https://img.example.com/2.jpg,,,
+TS-003,Bad Row,,-5,nowhere,1,XXXL,Red,,Acme,not-a-url,,,
+"""
+
+
+class CatalogImportExportTest(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_superuser('admin', 'admin@example.com', 'pass12345')
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+        Category.objects.create(name='party')
+        Category.objects.create(name='street')
+
+    def upload(self, content, name='catalog.csv', **data):
+        return self.client.post(
+            reverse('catalog-import'),
+            {'file': SimpleUploadedFile(name, content.encode()), **data},
+        )
+
+    def test_import_creates_then_updates_by_sku(self):
+        response = self.upload(CATALOG_CSV)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((response.data['created'], response.data['updated'], response.data['invalid']), (2, 0, 1))
+        self.assertEqual(response.data['variants'], 3)
+        self.assertEqual(response.data['errors'][0]['line'], 5)
+        self.assertEqual(
+            set(response.data['errors'][0]['errors']), {'price', 'category', 'size', 'image'}
+        )
+
+        shirt = Product.objects.get(sku='TS-001')
+        self.assertEqual(shirt.stock, 13)
+        self.assertEqual([variant['size'] for variant in shirt.listing.variants], ['M', 'L'])
+
+        jacket = Product.objects.get(sku='TS-002')
+        self.assertEqual(jacket.category.name, 'street')
+        self.assertTrue(jacket.is_active)
+        self.assertFalse(jacket.listing.in_stock)
+
+        rows = '\n'.join([
+            '{"sku": "TS-002", "name": "Denim Jacket", "price": "1999", "category": "street", "stock": 4,'
+            ' "size": "L", "color": "Blue", "brand": "Acme", "image": "https://img.example.com/2.jpg"}',
+            '',
+            'not json',
+        ])
+        response = self.upload(rows, name='update.jsonl')
+        self.assertEqual((response.data['created'], response.data['updated'], response.data['invalid']), (0, 1, 1))
+        jacket.refresh_from_db()
+        self.assertEqual((jacket.price, jacket.stock), (Decimal('1999.00'), 4))
+        self.assertEqual(jacket.listing.price, Decimal('1999.00'))
+        self.assertTrue(ProductListing.objects.get(pk=jacket.pk).in_stock)
+        self.assertTrue(StockEvent.objects.filter(product=jacket, stock_before=0, stock_after=4).exists())
+
+    def test_dry_run_writes_nothing(self):
+        response = self.upload(CATALOG_CSV, dry_run='true')
+        self.assertEqual(response.data['created'], 2)
+        self.assertFalse(Product.objects.exists())
+
+    def test_export_round_trips(self):
+        self.upload(CATALOG_CSV)
+        for file_format in ['csv', 'jsonl']:
+            with self.subTest(file_format=file_format):
+                response = self.client.get(reverse('catalog-export'), {'file_format': file_format})
+                self.assertEqual(response.status_code, 200)
+                content = b''.join(response.streaming_content).decode()
+                result = self.upload(content, name=f'export.{file_format}').data
+                self.assertEqual((result['created'], result['updated'], result['invalid']), (0, 2, 0))
+                self.assertEqual(result['variants'], 3)
+
+
+@override_settings(RATE_LIMIT_ENABLED=False)
+class ProductVariantTest(TestCase):
+    def setUp(self):
+        self.category = Category.objects.create(name='classic')
+        self.admin = User.objects.create_superuser('admin', 'admin@example.com', 'pass12345')
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def create_product(self, variants):
+        return self.client.post(reverse('product-create'), {
+            'name': 'Oxford Shirt', 'description': 'Cotton oxford', 'price': '1299.00',
+            'category': self.category.pk, 'material': 'Cotton', 'brand': 'Acme',
+            'image': 'https://img.example.com/oxford.jpg', 'variants': variants,
+        }, format='json')
+
+    def test_create_is_atomic(self):
+        with mock.patch.object(ProductVariant.objects, 'bulk_create', side_effect=IntegrityError):
+            with self.assertRaises(IntegrityError):
+                self.create_product([{'size': 'M', 'color': 'White', 'stock': 4}])
+        self.assertFalse(Product.objects.exists())
+        self.assertFalse(ProductHistory.objects.exists())
+
+    def test_create_and_update_variants(self):
+        response = self.create_product([
+            {'size': 'M', 'color': 'White', 'stock': 4},
+            {'size': 'L', 'color': 'White', 'stock': 0},
+        ])
+        self.assertEqual(response.status_code, 201, response.data)
+        product = Product.objects.get(pk=response.data['product']['id'])
+        self.assertEqual(product.stock, 4)
+        self.assertEqual(
+            [(variant['size'], variant['in_stock']) for variant in product.listing.variants],
+            [('M', True), ('L', False)],
+        )
+
+        response = self.client.patch(reverse('product-update', args=[product.pk]), {
+            'variants': [{'size': 'L', 'color': 'White', 'stock': 2}, {'size': 'XL', 'color': 'Blue', 'stock': 1}],
+        }, format='json')
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertEqual(response.data['product']['stock'], 7)
+        self.assertEqual(product.variants.count(), 3)
+
+        # Single variant edits (admin inline) keep the totals in step too
+        product.variants.get(size='M').delete()
+        product.refresh_from_db()
+        self.assertEqual(product.stock, 3)
+        self.assertEqual(len(product.listing.variants), 2)
+
+    def test_create_requires_unique_variants(self):
+        self.assertEqual(self.create_product([]).status_code, 400)
+        response = self.create_product([{'size': 'M', 'color': 'White'}, {'size': 'M', 'color': 'White'}])
+        self.assertEqual(response.status_code, 400)
+
+    def test_list_groups_and_filters_variants(self):
+        product = self.create_product([
+            {'size': 'M', 'color': 'White', 'stock': 1},
+            {'size': 'L', 'color': 'Navy', 'stock': 1},
+        ]).data['product']
+        results = self.client.get(reverse('product-list')).data['results']
+        self.assertEqual(len(results), 1)
+        self.assertEqual([variant['color'] for variant in results[0]['variants']], ['White', 'Navy'])
+
+        for params, found in [
+            ({'size': 'M'}, True),
+            ({'size': 'M', 'color': 'White'}, True),
+            ({'size': 'M', 'color': 'Navy'}, False),
+            ({'color': 'Navy'}, True),
+        ]:
+            with self.subTest(**params):
+                results = self.client.get(reverse('product-list'), params).data['results']
+                self.assertEqual([row['id'] for row in results], [product['id']] if found else [])
+
+
+class ProductHistoryTest(QueryPlanMixin, TestCase):
+    def setUp(self):
+        self.category = Category.objects.create(name='street')
+        admin = User.objects.create_superuser('admin', 'admin@example.com', 'pass12345')
+        self.client = APIClient()
+        self.client.force_authenticate(admin)
+        self.product = self.client.post(reverse('product-create'), {
+            'name': 'Hoodie', 'description': 'Fleece hoodie', 'price': '999.00',
+            'category': self.category.pk, 'material': 'Fleece', 'brand': 'Acme',
+            'image': 'https://img.example.com/hoodie.jpg',
+            'variants': [{'size': 'M', 'color': 'Grey', 'stock': 5}],
+        }, format='json').data['product']
+
+    def history(self):
+        return list(
+            ProductHistory.objects.filter(product_id=self.product['id'])
+            .order_by('recorded_at', 'id')
+            .values_list('price', 'stock')
+        )
+
+    def as_of(self, when):
+        return self.client.get(reverse('product-history', args=[self.product['id']]), {'as_of': when.isoformat()})
+
+    def test_records_changes_only(self):
+        # One row for the created product, with its variant stock
+        self.assertEqual(self.history(), [(Decimal('999.00'), 5)])
+        created = len(self.history())
+
+        self.client.patch(reverse('product-update', args=[self.product['id']]), {'price': '799.00'}, format='json')
+        Product.objects.get(pk=self.product['id']).save()
+        variant = ProductVariant.objects.get(product_id=self.product['id'])
+        with transaction.atomic():
+            take_stock({variant.pk: 2})
+
+        self.assertEqual(self.history()[created:], [(Decimal('799.00'), 5), (Decimal('799.00'), 3)])
+
+    def test_as_of(self):
+        before = timezone.now() - timedelta(days=1)
+        first = ProductHistory.objects.filter(product_id=self.product['id']).latest('recorded_at', 'id')
+        self.client.patch(reverse('product-update', args=[self.product['id']]), {'price': '799.00'}, format='json')
+
+        response = self.as_of(first.recorded_at)
+        self.assertEqual((response.data['price'], response.data['stock']), ('999.00', 5))
+        response = self.as_of(timezone.now())
+        self.assertEqual(response.data['price'], '799.00')
+        self.assertEqual(self.as_of(before).status_code, 404)
+        self.assertEqual(
+            self.client.get(reverse('product-history', args=[self.product['id']]), {'as_of': 'yesterday'}).status_code,
+            400,
+        )
+        self.assertEqual(self.assertNoFullScans(self.as_of, timezone.now(), tables=['product_history']).status_code, 200)
+
+
+@override_settings(DATABASE_REPLICAS=['replica_0'])
+class ReadReplicaRoutingTest(SimpleTestCase):
+    def route(self, method, path, **extra):
+        seen = {}
+
+        def view(request):
+            seen['product'] = router.db_for_read(Product)
+            seen['user'] = router.db_for_read(User)
+            return HttpResponse()
+
+        request = getattr(RequestFactory(), method)(path, **extra)
+        response = ReadReplicaMiddleware(view)(request)
+        return seen, response
+
+    def test_catalog_reads_go_to_replica(self):
+        seen, _ = self.route('get', '/api/products/')
+        self.assertEqual(seen, {'product': 'replica_0', 'user': 'default'})
+        seen, _ = self.route('get', '/api/orders/')
+        self.assertEqual(seen['product'], 'default')
+        # The request's routing does not leak into later work
+        self.assertEqual(router.db_for_read(Product), 'default')
+
+    def test_writes_make_the_client_read_from_primary(self):
+        seen, response = self.route('post', '/api/products/favorites/1/add/', HTTP_AUTHORIZATION='Bearer sticky-token')
+        self.assertEqual(seen['product'], 'default')
+        cookie = response.cookies[ReadReplicaMiddleware.COOKIE_NAME]
+        self.assertEqual(cookie['max-age'], settings.READ_REPLICA_STICKY_SECONDS)
+
+        # Either the cookie or the token's cache flag keeps reads on the primary
+        seen, _ = self.route('get', '/api/products/', HTTP_COOKIE=f'{cookie.key}={cookie.value}')
+        self.assertEqual(seen['product'], 'default')
+        seen, _ = self.route('get', '/api/products/', HTTP_AUTHORIZATION='Bearer sticky-token')
+        self.assertEqual(seen['product'], 'default')
+        seen, _ = self.route('get', '/api/products/', HTTP_AUTHORIZATION='Bearer other-token')
+        self.assertEqual(seen['product'], 'replica_0')
+
+
+class FastJSONRendererTest(SimpleTestCase):
+    data = {
+        'price': Decimal('499.50'),
+        'created_at': timezone.now(),
+        'day': timezone.now().date(),
+        'id': uuid.uuid4(),
+        'name': 'Kurta \u2028 line \u2029 breaks, caf\u00e9',
+        'nested': [{'rating': Decimal('4.25'), 'ok': True, 'none': None}],
+        1: 'non-string key',
+    }
+
+    def test_matches_json_renderer(self):
+        self.assertEqual(FastJSONRenderer().render(self.data), JSONRenderer().render(self.data))
+
+    def test_falls_back_without_orjson(self):
+        with mock.patch.object(renderers, 'orjson', None), mock.patch.object(
+            JSONRenderer, 'render', autospec=True, side_effect=JSONRenderer.render,
+        ) as stdlib_render:
+            rendered = FastJSONRenderer().render(self.data)
+        stdlib_render.assert_called_once()
+        self.assertEqual(rendered, JSONRenderer().render(self.data))
+
+
+@override_settings(API_COMPRESSION_MIN_SIZE=1024)
+class ApiCompressionMiddlewareTest(TestCase):
+    body = b'{"name": "Shirt", "price": "499.50"}' * 100
+
+    def respond(self, accept_encoding=None, body=body, path='/api/products/', resolver_match=None):
+        request = RequestFactory().get(path, **({'HTTP_ACCEPT_ENCODING': accept_encoding} if accept_encoding else {}))
+        # Set by URL resolution before the response comes back
+        request.resolver_match = resolver_match
+        return ApiCompressionMiddleware(lambda request: HttpResponse(body, content_type='application/json'))(request)
+
+    def test_negotiates_the_encoding(self):
+        cases = [
+            (None, None),
+            ('gzip, deflate', 'gzip'),
+            ('*', 'gzip'),
+            ('gzip;q=0, identity', None),
+            # brotli is only used when the package is installed
+            ('br', None),
+            ('br, gzip', 'gzip'),
+        ]
+        for header, encoding in cases:
+            with self.subTest(accept_encoding=header):
+                response = self.respond(header)
+                self.assertEqual(response.get('Content-Encoding'), encoding)
+                self.assertIn('Accept-Encoding', response['Vary'])
+                body = gzip.decompress(response.content) if encoding else response.content
+                self.assertEqual(body, self.body)
+
+    def test_brotli_when_available(self):
+        fake_brotli = mock.Mock(compress=mock.Mock(return_value=b'br-body'))
+        with mock.patch.object(middleware, 'brotli', fake_brotli):
+            self.assertEqual(self.respond('gzip, br')['Content-Encoding'], 'br')
+            self.assertEqual(self.respond('gzip, br;q=0')['Content-Encoding'], 'gzip')
+
+    def test_gzip_length_is_randomized(self):
+        lengths = {len(self.respond('gzip').content) for _ in range(10)}
+        self.assertGreater(len(lengths), 1)
+
+    def test_small_and_non_api_responses_are_left_alone(self):
+        response = self.respond('gzip', body=b'{"ok": true}')
+        self.assertFalse(response.has_header('Content-Encoding'))
+        self.assertFalse(response.has_header('Vary'))
+        self.assertFalse(self.respond('gzip', path='/admin/').has_header('Content-Encoding'))
+
+    def test_token_endpoints_are_never_compressed(self):
+        for name, encoding in [('login', None), ('token-refresh', None), ('user-profile', 'gzip')]:
+            with self.subTest(view=name):
+                path = reverse(name)
+                response = self.respond('gzip', path=path, resolver_match=resolve(path))
+                self.assertEqual(response.get('Content-Encoding'), encoding)
+
+
+@skipUnless(settings.DATABASE_REPLICAS, 'set DATABASE_REPLICA_URLS to a second database, e.g. sqlite:///replica.sqlite3')
+@override_settings(RATE_LIMIT_ENABLED=False)
+class ReadReplicaDatabaseTest(TestCase):
+    # Each replica gets its own, empty, test database
+    databases = {'default', *settings.DATABASE_REPLICAS}
+
+    def test_read_your_writes(self):
+        product = make_products(Category.objects.create(name='daily'), 1)[0]
+        user = User.objects.create_user('shopper', 'shopper@example.com', 'pass12345')
+        client = APIClient()
+        client.force_authenticate(user)
+
+        # Nothing was replicated to the replica database
+        self.assertEqual(client.get(reverse('product-list')).data['count'], 0)
+        self.assertEqual(client.post(reverse('add-favorite', args=[product.pk])).status_code, 201)
+        self.assertEqual(client.get(reverse('product-list')).data['count'], 1)
+
+
+class ConnectionReuseSoakTest(TransactionTestCase):
+    """
+    Worker threads serve many simulated requests each; connections must be
+    reused across requests instead of opened per request
+    """
+    THREADS = 8
+    REQUESTS = 50
+
+    def serve(self, errors):
+        try:
+            for _ in range(self.REQUESTS):
+                request_started.send(sender=self.__class__)
+                Product.objects.exists()
+                request_finished.send(sender=self.__class__)
+        except Exception as exc:  # pragma: no cover - reported below
+            errors.append(exc)
+        finally:
+            connections.close_all()
+
+    def soak(self):
+        connection_metrics.reset()
+        errors = []
+        workers = [Thread(target=self.serve, args=(errors,)) for _ in range(self.THREADS)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        self.assertEqual(errors, [])
+        snapshot = connection_metrics.snapshot()
+        self.assertEqual(snapshot['requests'], self.THREADS * self.REQUESTS)
+        return snapshot['databases']['default']
+
+    def test_connections_are_reused(self):
+        pool_options = connections.settings['default'].get('OPTIONS', {}).get('pool')
+        if pool_options:
+            stats = self.soak()['pool']
+            self.assertLessEqual(stats['pool_size'], settings.DATABASE_POOL_OPTIONS['max_size'])
+            return
+        with mock.patch.dict(connections.settings['default'], {'CONN_MAX_AGE': 600, 'CONN_HEALTH_CHECKS': True}):
+            database = self.soak()
+        # One connect per thread, not per request
+        self.assertEqual(database['connects'], self.THREADS)
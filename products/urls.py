@@ -8,6 +8,8 @@ urlpatterns = [
     # Product URLs
     path('', views.ProductListView.as_view(), name='product-list'),
     path('<int:pk>/', views.ProductDetailView.as_view(), name='product-detail'),
+    path('<int:pk>/recommendations/', views.product_recommendations_view, name='product-recommendations'),
+    path('rankings/<slug:kind>/', views.product_rankings_view, name='product-rankings'),
     path('create/', views.create_product_view, name='product-create'),
     path('update/<int:pk>/', views.update_product_view, name='product-update'),
     path('delete/<int:pk>/', views.delete_product_view, name='product-delete'),
@@ -15,6 +17,11 @@ urlpatterns = [
     # Admin URLs
     path('admin/all/', views.admin_products_view, name='admin-products'),
     path('admin/stats/', views.product_stats_view, name='product-stats'),
+    path('admin/low-stock/', views.low_stock_products_view, name='low-stock-products'),
+    path('admin/stock-events/', views.stock_events_view, name='stock-events'),
+    path('admin/<int:pk>/history/', views.product_history_view, name='product-history'),
+    path('admin/catalog/import/', views.import_catalog_view, name='catalog-import'),
+    path('admin/catalog/export/', views.export_catalog_view, name='catalog-export'),
     
     # Review URLs
     path('<int:product_id>/reviews/', views.product_reviews_view, name='product-reviews'),
@@ -1,14 +1,25 @@
 from rest_framework import status, generics, filters
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
+from rest_framework.pagination import PageNumberPagination
 from rest_framework.permissions import IsAuthenticated, IsAdminUser, AllowAny
 from django_filters.rest_framework import DjangoFilterBackend
-from django.db.models import Q
-from .models import Category, Product, Review, Favorite
+from django.db.models import Q, F
+from django.http import StreamingHttpResponse
+import codecs
+from django.core.cache import cache
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from .models import Category, Product, ProductHistory, ProductRanking, Review, Favorite, ProductListing, StockEvent
 from .serializers import (
-    CategorySerializer, ProductSerializer, ProductListSerializer,
+    CategorySerializer, ProductSerializer, ProductListingSerializer,
+    AdminProductListSerializer, StockEventSerializer, ProductHistorySerializer,
     ReviewSerializer, FavoriteSerializer
 )
+from .fast_serializers import FastFavoriteSerializer, FastProductListingSerializer
+from .pagination import KeysetPagination
+from .filters import ProductListingFilter
+from .catalog import CONTENT_TYPES, FORMATS, STREAMERS, CatalogError, CatalogImporter, detect_format, export_rows, read_rows
 
 # Category Views 
 class CategoryListView(generics.ListCreateAPIView):
@@ -23,20 +34,92 @@ class CategoryListView(generics.ListCreateAPIView):
 
 # Product Views
 class ProductListView(generics.ListAPIView):
-    queryset = Product.objects.filter(is_active=True)
-    serializer_class = ProductListSerializer
+    """
+    Page-number pagination by default; ?cursor= or ?pagination=cursor
+    switches to keyset pagination (no OFFSET, optional ?count=exact|estimate)
+    """
+    # Reads the flat product_listings table as plain dicts, no model instances
+    # (created_at is only fetched for the keyset cursor)
+    queryset = ProductListing.objects.filter(is_active=True).values(
+        *ProductListingSerializer.VALUES_FIELDS, 'created_at', id=F('product_id')
+    )
+    serializer_class = ProductListingSerializer
     permission_classes = [AllowAny]
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
-    filterset_fields = ['category', 'size', 'color']
-    search_fields = ['name', 'description', 'brand']
+    filterset_class = ProductListingFilter
+    search_fields = ['name', 'product__description', 'brand']
     ordering_fields = ['price', 'created_at', 'average_rating']
     ordering = ['-created_at']
+    
+    @property
+    def paginator(self):
+        if not hasattr(self, '_paginator'):
+            params = self.request.query_params
+            if 'cursor' in params or params.get('pagination') == 'cursor':
+                self._paginator = KeysetPagination()
+            else:
+                self._paginator = self.pagination_class()
+        return self._paginator
+    
+    def list(self, request, *args, **kwargs):
+        page = self.paginate_queryset(self.filter_queryset(self.get_queryset()))
+        return self.get_paginated_response(FastProductListingSerializer(page).data)
 
 class ProductDetailView(generics.RetrieveAPIView):
     queryset = Product.objects.filter(is_active=True)
     serializer_class = ProductSerializer
     permission_classes = [AllowAny]
 
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def product_recommendations_view(request, pk):
+    """
+    "Customers also bought" list cards for a product, best first, read from
+    the precomputed top-K table (see orders/recommendations.py)
+    """
+    listings = (
+        ProductListing.objects.filter(is_active=True, product__recommended_in__product_id=pk)
+        .order_by('product__recommended_in__rank')
+        .values(*ProductListingSerializer.VALUES_FIELDS, id=F('product_id'))
+    )
+    return Response({
+        'results': FastProductListingSerializer(listings).data
+    }, status=status.HTTP_200_OK)
+
+# A compute_rankings run moves the lists to a new cache key; price or stock
+# edits of ranked products show once a cached list ages out
+RANKINGS_CACHE_TIMEOUT = 60 * 60
+
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def product_rankings_view(request, kind):
+    """
+    Best sellers, trending or top-rated products as list cards, overall or
+    for ?category=<code>, served from the materialized rankings and cached
+    """
+    if kind not in dict(ProductRanking.KIND_CHOICES):
+        return Response({'error': 'Unknown ranking'}, status=status.HTTP_404_NOT_FOUND)
+    category = request.query_params.get('category') or None
+    if category is not None and category not in dict(Category.CATEGORY_CHOICES):
+        return Response({'error': 'Unknown category'}, status=status.HTTP_400_BAD_REQUEST)
+    
+    key = ProductRanking.cache_key(kind, category)
+    results = cache.get(key)
+    if results is None:
+        rankings = {'product__rankings__kind': kind}
+        if category is None:
+            rankings['product__rankings__category__isnull'] = True
+        else:
+            rankings['product__rankings__category__name'] = category
+        listings = (
+            ProductListing.objects.filter(is_active=True, **rankings)
+            .order_by('product__rankings__rank')
+            .values(*ProductListingSerializer.VALUES_FIELDS, id=F('product_id'))
+        )
+        results = FastProductListingSerializer(listings).data
+        cache.set(key, results, RANKINGS_CACHE_TIMEOUT)
+    return Response({'kind': kind, 'category': category, 'results': results}, status=status.HTTP_200_OK)
+
 @api_view(['POST'])
 @permission_classes([IsAdminUser])
 def create_product_view(request):
@@ -88,15 +171,49 @@ def delete_product_view(request, pk):
     except Product.DoesNotExist:
         return Response({'error': 'Product not found'}, status=status.HTTP_404_NOT_FOUND)
 
+class AdminProductPagination(PageNumberPagination):
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 200
+
+# Orderings accepted by admin_products_view, each backed by an index on products
+ADMIN_PRODUCT_ORDERINGS = ['created_at', '-created_at', 'stock', '-stock', 'is_active', '-is_active']
+
 @api_view(['GET'])
 @permission_classes([IsAdminUser])
 def admin_products_view(request):
     """
     Get all products including inactive (Admin only)
+
+    Query params: page, page_size, fields (comma separated), ordering,
+    is_active (true/false), stock_lte, stock_gte
     """
-    products = Product.objects.all().order_by('-created_at')
-    serializer = ProductSerializer(products, many=True)
-    return Response(serializer.data, status=status.HTTP_200_OK)
+    products = Product.objects.select_related('category').prefetch_related('variants')
+    
+    is_active = request.query_params.get('is_active')
+    if is_active in ('true', 'false'):
+        products = products.filter(is_active=is_active == 'true')
+    
+    try:
+        if request.query_params.get('stock_lte') is not None:
+            products = products.filter(stock__lte=int(request.query_params['stock_lte']))
+        if request.query_params.get('stock_gte') is not None:
+            products = products.filter(stock__gte=int(request.query_params['stock_gte']))
+    except ValueError:
+        return Response({'error': 'Stock filters must be integers'}, status=status.HTTP_400_BAD_REQUEST)
+    
+    ordering = request.query_params.get('ordering', '-created_at')
+    if ordering not in ADMIN_PRODUCT_ORDERINGS:
+        return Response({'error': 'Invalid ordering'}, status=status.HTTP_400_BAD_REQUEST)
+    products = products.order_by(ordering, '-id')
+    
+    fields = request.query_params.get('fields')
+    fields = [name.strip() for name in fields.split(',') if name.strip()] if fields else None
+    
+    paginator = AdminProductPagination()
+    page = paginator.paginate_queryset(products, request)
+    serializer = AdminProductListSerializer(page, many=True, fields=fields)
+    return paginator.get_paginated_response(serializer.data)
 
 @api_view(['GET'])
 @permission_classes([IsAdminUser])
@@ -117,6 +234,128 @@ def product_stats_view(request):
         'out_of_stock': out_of_stock
     }, status=status.HTTP_200_OK)
 
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def low_stock_products_view(request):
+    """
+    Get active products at or below the low-stock threshold (Admin only)
+
+    Query params: page, page_size, fields, threshold (defaults to and is
+    served from the partial index for Product.LOW_STOCK_THRESHOLD)
+    """
+    try:
+        threshold = int(request.query_params.get('threshold', Product.LOW_STOCK_THRESHOLD))
+    except ValueError:
+        return Response({'error': 'Threshold must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
+    
+    products = (
+        Product.objects.select_related('category')
+        .prefetch_related('variants')
+        .filter(is_active=True, stock__lte=threshold)
+    )
+    if threshold <= Product.LOW_STOCK_THRESHOLD:
+        # Repeat the index predicate so the planner can pick the partial index
+        products = products.filter(stock__lte=Product.LOW_STOCK_THRESHOLD)
+    products = products.order_by('stock', 'id')
+    
+    fields = request.query_params.get('fields')
+    fields = [name.strip() for name in fields.split(',') if name.strip()] if fields else None
+    
+    paginator = AdminProductPagination()
+    page = paginator.paginate_queryset(products, request)
+    serializer = AdminProductListSerializer(page, many=True, fields=fields)
+    return paginator.get_paginated_response(serializer.data)
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def stock_events_view(request):
+    """
+    Poll stock level crossings newer than ?after=<cursor> (Admin only)
+    """
+    try:
+        after = int(request.query_params.get('after', 0))
+        limit = min(int(request.query_params.get('limit', 100)), 500)
+    except ValueError:
+        return Response({'error': 'after and limit must be integers'}, status=status.HTTP_400_BAD_REQUEST)
+    
+    events = list(StockEvent.objects.select_related('product').filter(id__gt=after).order_by('id')[:limit])
+    return Response({
+        'events': StockEventSerializer(events, many=True).data,
+        'cursor': events[-1].id if events else after
+    }, status=status.HTTP_200_OK)
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def product_history_view(request, pk):
+    """
+    Price and stock of a product (Admin only)
+
+    ?as_of=<ISO datetime> answers the price and stock at that moment;
+    without it the latest changes are listed, newest first (?limit=)
+    """
+    as_of = request.query_params.get('as_of')
+    if as_of is not None:
+        when = parse_datetime(as_of)
+        if when is None:
+            return Response({'error': 'as_of must be an ISO 8601 datetime'}, status=status.HTTP_400_BAD_REQUEST)
+        if timezone.is_naive(when):
+            when = timezone.make_aware(when)
+        row = ProductHistory.as_of(pk, when)
+        if row is None:
+            return Response({'error': 'No history for this product at that time'}, status=status.HTTP_404_NOT_FOUND)
+        return Response({'as_of': when, **ProductHistorySerializer(row).data}, status=status.HTTP_200_OK)
+    
+    try:
+        limit = min(int(request.query_params.get('limit', 100)), 500)
+    except ValueError:
+        return Response({'error': 'limit must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
+    rows = ProductHistory.objects.filter(product_id=pk).order_by('-recorded_at', '-id')[:limit]
+    return Response({
+        'history': ProductHistorySerializer(rows, many=True).data
+    }, status=status.HTTP_200_OK)
+
+@api_view(['POST'])
+@permission_classes([IsAdminUser])
+def import_catalog_view(request):
+    """
+    Upsert products by SKU from an uploaded CSV or JSONL file (Admin only)
+
+    Form fields: file, file_format (csv/jsonl, defaults to the file
+    extension), dry_run (true to only validate)
+    """
+    upload = request.FILES.get('file')
+    if upload is None:
+        return Response({'error': 'No file uploaded'}, status=status.HTTP_400_BAD_REQUEST)
+    try:
+        file_format = detect_format(upload.name, request.data.get('file_format'))
+    except CatalogError as exc:
+        return Response({'error': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+    
+    dry_run = str(request.data.get('dry_run', '')).lower() in ('1', 'true', 'yes')
+    importer = CatalogImporter(dry_run=dry_run)
+    try:
+        result = importer.run(read_rows(codecs.iterdecode(upload, 'utf-8-sig'), file_format))
+    except UnicodeDecodeError:
+        return Response({
+            'error': 'File must be UTF-8 encoded',
+            **importer.result
+        }, status=status.HTTP_400_BAD_REQUEST)
+    return Response({'dry_run': dry_run, **result}, status=status.HTTP_200_OK)
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def export_catalog_view(request):
+    """
+    Stream every product as CSV or JSONL (?file_format=, default csv) (Admin only)
+    """
+    file_format = request.query_params.get('file_format', 'csv')
+    if file_format not in FORMATS:
+        return Response({'error': 'Unsupported catalog format'}, status=status.HTTP_400_BAD_REQUEST)
+    
+    response = StreamingHttpResponse(STREAMERS[file_format](export_rows()), content_type=CONTENT_TYPES[file_format])
+    response['Content-Disposition'] = f'attachment; filename="catalog.{file_format}"'
+    return response
+
 # Review Views
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
@@ -178,7 +417,7 @@ def favorites_list_view(request):
     Get user's favorite products
     """
     favorites = Favorite.objects.filter(user=request.user)
-    serializer = FavoriteSerializer(favorites, many=True)
+    serializer = FastFavoriteSerializer(favorites)
     return Response(serializer.data, status=status.HTTP_200_OK)
 
 @api_view(['POST'])